@@ -0,0 +1,78 @@
+# Per-frame cost of drawing the lyric highlight: previous create_rectangle() vs HighlightRectangle.
+# Needs a display (run under Xvfb on Linux) and Pillow.
+# Run from the repository root: python benchmarks/bench_highlight.py
+import os
+import sys
+import time
+import tkinter as tk
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from PIL import Image, ImageTk
+
+from ui.highlight import HighlightRectangle
+
+
+def legacy_draw(root, canvas, images, x1, y1, x2, y2):  # Previous create_rectangle(), a new image and canvas item every frame
+    canvas.delete("rectangle")
+    images.clear()
+    fill = root.winfo_rgb("#000000") + (int(.3 * 255),)
+    image = Image.new("RGBA", (max(int(x2) - int(x1), 0), max(int(y2) - int(y1), 0)), fill)
+    images.append(ImageTk.PhotoImage(image))
+    rectangle = canvas.create_image(int(x1), int(y1), image=images[-1], anchor="nw", tags="rectangle")
+    root.update()
+    return rectangle
+
+
+def animation_frames(frame_count):
+    # Rectangle moving down one line while its width changes, as during a lyric line transition
+    for frame in range(frame_count):
+        progress = (frame % 60) / 59
+        y1 = 20 + progress * 18
+        yield 5, y1, 5 + 120 + progress * 80, y1 + 16
+
+
+def measure(name, draw, root, canvas, frame_count):
+    frames = list(animation_frames(frame_count))
+    first_item = canvas.create_line(0, 0, 0, 0)
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    for frame in frames:
+        draw(*frame)
+    elapsed = time.perf_counter() - start_time
+    _, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocations = sum(stat.count for stat in snapshot.statistics("filename"))
+    items_created = canvas.create_line(0, 0, 0, 0) - first_item - 1
+    print(f"{name:>10}: {elapsed / frame_count * 1e6:8.1f} us/frame  {items_created / frame_count:5.2f} canvas items/frame  {allocations} live blocks  {peak / 1024:.1f} KiB peak")
+
+
+def main(frame_count=2000):
+    root = tk.Tk()
+    canvas = tk.Canvas(root, width=300, height=200)
+    canvas.pack()
+    root.update()
+
+    images = []
+    measure("legacy", lambda *bounds: legacy_draw(root, canvas, images, *bounds), root, canvas, frame_count)
+    canvas.delete("all")
+
+    highlight = HighlightRectangle(canvas)
+
+    def draw(*bounds):
+        highlight.draw(*bounds)
+        root.update_idletasks()  # The legacy draw forced a full root.update() every frame
+
+    measure("persistent", draw, root, canvas, frame_count)
+    for bounds in animation_frames(60):  # The persistent image must follow every drawn size
+        highlight.draw(*bounds)
+        x1, y1, x2, y2 = highlight.bounds
+        assert (highlight.image.width(), highlight.image.height()) == (x2 - x1, y2 - y1), f"Highlight image is {highlight.image.width()}x{highlight.image.height()}, drawn {x2 - x1}x{y2 - y1}"
+    print(f"HighlightRectangle counters: {highlight.counters}")
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
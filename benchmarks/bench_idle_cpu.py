@@ -0,0 +1,45 @@
+# Idle CPU cost of the updater loop during steady playback: previous fixed 15 ms root.after loop vs FrameScheduler deadlines.
+# Both replay the same synthetic trace through the updater() steps of core.replay on the virtual clock, as the updater_frame
+# benchmark does, once woken every 15 ms and once at the deadlines the steps registered.
+# CPU is the process time of the replayed frames per replayed second, the Tk redraws of the window are not included.
+# Run from the repository root: python benchmarks/bench_idle_cpu.py
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from core.replay import ReplaySession
+from run_benchmarks import quiet, write_synthetic_trace
+
+
+class FixedIntervalSession(ReplaySession):  # Runs the same frame, but the next one always comes after frame_interval
+    def frame(self):
+        super().frame()
+        return self.frame_scheduler.frame_interval * 1000
+
+
+def run_loop(session_class, path):
+    # Returns (CPU seconds, frames, replayed seconds) of one replay of the trace
+    session = session_class(path)
+    cpu_start = time.process_time()
+    session.run()
+    cpu_time = time.process_time() - cpu_start
+    session.close()
+    stats = session.get_stats()
+    return cpu_time, stats["frames"], stats["replayed_seconds"]
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "trace.jsonl.gz")
+        quiet(write_synthetic_trace, path)
+        results = {"fixed 15 ms": run_loop(FixedIntervalSession, path), "scheduler": run_loop(ReplaySession, path)}
+
+    for name, (cpu_time, frames, seconds) in results.items():
+        print(f"{name:>12}: {cpu_time / seconds * 100:6.3f} % CPU  {frames / seconds:6.1f} wakeups/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# Throughput benchmark: parse a generated corpus of large LRC files with the single-pass parser
+# and the previous split-based parser.
+# Run from the repository root: python benchmarks/bench_lrc_parser.py [corpus directory]
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from core.lrc_parser import parse_lrc
+
+
+def generate_lrc(line_count, seed):
+    rng = random.Random(seed)
+    words = ["love", "night", "fire", "heart", "dance", "sky", "run", "home", "light", "rain", "gold", "away"]
+    lines = ["[ar:Benchmark Artist]", "[ti:Benchmark Track]", "[by:bench]"]
+    epoch = 0
+    for index in range(line_count):
+        epoch += rng.randint(800, 6000)
+        minutes, remainder = divmod(epoch, 60000)
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(1 if index == 0 else 0, 9)))  # Empty text is an instrumental section, the legacy parser fails on an empty first line
+        lines.append(f"[{minutes:02d}:{remainder // 1000:02d}.{remainder % 1000 // 10:02d}] {text}")  # Musixmatch subtitle format
+    return "\n".join(lines), epoch + 5000
+
+
+def legacy_parse(subtitle_body, duration):  # Previous get_synced_lyrics() parsing, kept for comparison
+    old_lyric_lines = [line for line in subtitle_body.split("\n") if line[1:3].isdigit()]  # Skip metadata tags it could not handle
+
+    previous_line_lyrics = None
+    lyric_lines = []
+    for line in old_lyric_lines:
+        if line.split("]")[1].strip() == "" and previous_line_lyrics == "":
+            pass
+        else:
+            lyric_lines.append(line.strip())
+            previous_line_lyrics = line.split("]")[1].strip()
+
+    def timestamp_to_epoch(timestamp):
+        epoch = 0
+        epoch += int(timestamp.split(":")[0]) * 60000
+        epoch += int(timestamp.split(":")[1].split(".")[0]) * 1000
+        epoch += int(timestamp.split(".")[1]) * 10
+        return epoch
+
+    synced_lyrics = []
+    first_line_epoch = timestamp_to_epoch(lyric_lines[0].split("] ")[0].replace("[", "").strip())
+    if first_line_epoch != 0:
+        synced_lyrics.append([[0, first_line_epoch], ""])
+    for index, line in enumerate(lyric_lines):
+        lyric_start = timestamp_to_epoch(line.split("]")[0].replace("[", ""))
+        if index + 1 == len(lyric_lines):
+            lyric_end = duration
+        else:
+            lyric_end = timestamp_to_epoch(lyric_lines[index + 1].split("]")[0].replace("[", ""))
+        if line.split("]")[1] == "":
+            lyric = ""
+        else:
+            lyric = line.split("] ")[1]
+        synced_lyrics.append([[lyric_start, lyric_end], lyric])
+    if synced_lyrics[-1][1] != "":
+        synced_lyrics.append([[synced_lyrics[-1][0][1], duration], ""])
+    return synced_lyrics
+
+
+def load_corpus(directory):
+    corpus = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".lrc"):
+            with open(os.path.join(directory, name), encoding="utf-8") as file:
+                corpus.append((file.read(), None))
+    return corpus
+
+
+def measure(parser, corpus, repeats=5):
+    best = None
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        for subtitle_body, duration in corpus:
+            parser(subtitle_body, duration or 0)
+        elapsed = time.perf_counter() - start_time
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    if len(sys.argv) > 1:
+        corpus = load_corpus(sys.argv[1])
+    else:
+        corpus = [generate_lrc(line_count, seed) for seed, line_count in enumerate([500, 1000, 2000, 5000, 10000] * 4)]
+
+    total_lines = sum(subtitle_body.count("\n") + 1 for subtitle_body, _ in corpus)
+    total_bytes = sum(len(subtitle_body.encode()) for subtitle_body, _ in corpus)
+    print(f"Corpus: {len(corpus)} files, {total_lines} lines, {total_bytes / 1e6:.2f} MB")
+
+    for name, parser in [("parse_lrc", parse_lrc), ("legacy", legacy_parse)]:
+        elapsed = measure(parser, corpus)
+        print(f"{name:>10}: {elapsed * 1000:8.2f} ms  {total_lines / elapsed / 1e6:6.2f} M lines/s  {total_bytes / elapsed / 1e6:6.2f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
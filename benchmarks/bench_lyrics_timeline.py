@@ -0,0 +1,47 @@
+# Micro-benchmark: current lyric line lookup cost for growing line counts.
+# Run from the repository root: python benchmarks/bench_lyrics_timeline.py
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from core.lrc_parser import SyncedLyrics
+from core.lyrics_timeline import LyricsTimeline
+
+
+def make_synced_lyrics(line_count, line_length=3000):
+    return SyncedLyrics([index * line_length for index in range(line_count)], [(index + 1) * line_length for index in range(line_count)], [f"Line {index}" for index in range(line_count)])
+
+
+def linear_find(synced_lyrics, duration):  # Previous lookup, loops through every line each frame
+    for index, (start, end, text) in enumerate(synced_lyrics):
+        if start <= duration <= end:
+            return index
+    return None
+
+
+def main():
+    frame_step = 15  # ms between frames
+    print(f"{'lines':>8} {'linear (us)':>12} {'playback (us)':>14} {'seek (us)':>10}")
+    for line_count in [10, 100, 1000, 10000]:
+        synced_lyrics = make_synced_lyrics(line_count)
+        total_duration = synced_lyrics.ends[-1]
+        frames = list(range(0, total_duration, frame_step))[:20000]  # Normal playback, one lookup per frame
+        seeks = [random.randrange(total_duration) for _ in range(len(frames))]
+
+        # Random positions give the average cost of a linear scan over the whole track
+        linear_time = timeit.timeit(lambda: [linear_find(synced_lyrics, duration) for duration in seeks[:2000]], number=1) / 2000
+
+        timeline = LyricsTimeline(synced_lyrics)
+        playback_time = timeit.timeit(lambda: [timeline.find(duration) for duration in frames], number=1) / len(frames)
+
+        timeline = LyricsTimeline(synced_lyrics)
+        seek_time = timeit.timeit(lambda: [timeline.find(duration) for duration in seeks], number=1) / len(seeks)
+
+        print(f"{line_count:>8} {linear_time * 1e6:>12.3f} {playback_time * 1e6:>14.3f} {seek_time * 1e6:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# Continuous resize of a 2,000-line lyric sheet: previous resize() re-wrapping every canvas item vs LyricsView,
+# measuring on a canvas item or with TextLayout.
+# Needs a display (run under Xvfb on Linux).
+# Run from the repository root: python benchmarks/bench_lyrics_view.py
+import os
+import random
+import sys
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from ui.lyrics_view import LyricsView
+from ui.text_layout import TextLayout
+
+words = ["love", "night", "never", "heart", "baby", "dancing", "forever", "tonight", "fire", "light", "the", "you", "me", "we", "down"]
+
+
+def generate_lines(line_count, seed=1):
+    generator = random.Random(seed)
+    return [" ".join(generator.choice(words) for _ in range(generator.randint(0, 12))) for _ in range(line_count)]
+
+
+def legacy_setup(canvas, lines, font):
+    items = []
+    height = 0
+    for text in lines:
+        item = canvas.create_text(5, height, text=text, font=font, anchor=tk.NW, justify=tk.LEFT, width=canvas.winfo_width() - 10)
+        items.append(item)
+        height += canvas.bbox(item)[3] - canvas.bbox(item)[1] + 2
+    return items
+
+
+def legacy_resize(root, canvas, items):  # Previous resize(), on every <Configure> event
+    height = 0
+    for item in items:
+        canvas.itemconfig(item, width=canvas.winfo_width() - 10)
+        canvas.bbox(item)
+        canvas.coords(item, 5, height)
+        height += canvas.bbox(item)[3] - canvas.bbox(item)[1]
+        height += 2
+    root.update()
+    canvas.configure(scrollregion=canvas.bbox("all"))
+
+
+def resize_continuously(root, canvas, steps):
+    # Drags the width between 200 and 400 px, one <Configure> event per step, returns the longest frame in seconds
+    longest_frame = 0
+    for step in range(steps):
+        start_time = time.perf_counter()
+        canvas.configure(width=200 + abs(step % 400 - 200))
+        root.update()
+        longest_frame = max(longest_frame, time.perf_counter() - start_time)
+    return longest_frame
+
+
+def measure(name, root, canvas, steps):
+    start_time = time.perf_counter()
+    longest_frame = resize_continuously(root, canvas, steps)
+    time.sleep(0.1)  # Let a coalesced re-layout run
+    root.update()
+    elapsed = time.perf_counter() - start_time
+    print(f"{name:>11}: {elapsed / steps * 1000:7.2f} ms/resize event  {longest_frame * 1000:7.1f} ms longest frame  {len(canvas.find_all())} canvas items")
+
+
+def main(line_count=2000, steps=200):
+    root = tk.Tk()
+    lines = generate_lines(line_count)
+    font = ("TkDefaultFont", 9)
+
+    canvas = tk.Canvas(root, width=300, height=300)
+    canvas.pack(fill=tk.BOTH, expand=True)
+    root.update()
+    items = legacy_setup(canvas, lines, font)
+    canvas.bind("<Configure>", lambda event: legacy_resize(root, canvas, items))
+    measure("legacy", root, canvas, steps)
+    canvas.destroy()
+
+    canvas = tk.Canvas(root, width=300, height=300)
+    canvas.pack(fill=tk.BOTH, expand=True)
+    root.update()
+    view = LyricsView(canvas)
+    view.set_lines(lines, [font] * len(lines))
+    canvas.bind("<Configure>", lambda event: view.schedule_resize(event.width))
+    measure("virtual", root, canvas, steps)
+    print(f"LyricsView stats: {view.get_stats()}")
+    canvas.destroy()
+
+    canvas = tk.Canvas(root, width=300, height=300)
+    canvas.pack(fill=tk.BOTH, expand=True)
+    root.update()
+    text_layout = TextLayout(root)
+    view = LyricsView(canvas, measure=text_layout.measure)
+    view.set_lines(lines, [font] * len(lines))
+    canvas.bind("<Configure>", lambda event: view.schedule_resize(event.width))
+    measure("text layout", root, canvas, steps)
+    print(f"LyricsView stats: {view.get_stats()}")
+    print(f"TextLayout stats: {text_layout.get_stats()}")
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# Animation length at different frame rates: previous frame-stepped rectangle move vs TweenEngine.
+# Frames are simulated with a virtual clock, no display needed.
+# Run from the repository root: python benchmarks/bench_tween.py
+import math
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from core.tween import AccelerationCurve, TweenEngine
+
+animation_acceleration = {0: 4, 10: 6, 20: 10, 30: 12, 40: 18, 50: 18, 60: 12, 70: 10, 80: 6, 90: 4}
+
+
+def legacy_move_frames(original_y, target_y):
+    # Frames the previous moving branch needed to push y down to target_y
+    y = original_y
+    frames = 0
+    while round(y) < target_y:
+        animation_completion = 1 - (target_y - y) / (target_y - original_y)
+        animation_completion_percentage = int(min(round(animation_completion * 100, -1), 90))
+        y += math.ceil((animation_acceleration[animation_completion_percentage] / 100) / 2 * (target_y - original_y))
+        frames += 1
+    return frames
+
+
+def tween_move_seconds(frame_interval, original_y, target_y, duration=0.2):
+    now = 0
+    engine = TweenEngine(clock=lambda: now)
+    engine.start("rectangle", (original_y,), (target_y,), duration, AccelerationCurve(animation_acceleration))
+    while engine.step():
+        now += frame_interval
+    return now
+
+
+def main():
+    original_y, target_y = 20, 38  # One 18 px lyric line down
+    legacy_frames = legacy_move_frames(original_y, target_y)
+    print(f"{'frame interval':>15} {'legacy':>10} {'tween':>10}")
+    for frame_interval in (0.008, 0.015, 0.033, 0.05):
+        print(f"{frame_interval * 1000:>12.0f} ms {legacy_frames * frame_interval * 1000:>7.0f} ms {tween_move_seconds(frame_interval, original_y, target_y) * 1000:>7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# Stand-in MPRIS player registered as org.mpris.MediaPlayer2.spotify, for running the media session backend on Linux without Spotify.
+# It reports Spotify-style metadata and signals its changes like the Spotify client does. Used by run_benchmarks.py, or on its own:
+#   dbus-run-session -- sh -c "python benchmarks/mpris_player.py & python main.py"
+# Without a session bus dbus-run-session starts a private one. On its own the player skips to the next track every --interval seconds.
+import argparse
+import asyncio
+import queue
+import threading
+import time
+
+from dbus_next import BusType, Variant
+from dbus_next.aio import MessageBus
+from dbus_next.service import PropertyAccess, ServiceInterface, dbus_property, method, signal
+
+player_name = "org.mpris.MediaPlayer2.spotify"
+player_path = "/org/mpris/MediaPlayer2"
+
+
+def make_metadata(index, duration_ms=200000):  # Metadata of the Spotify client for a track
+    return {
+        "mpris:trackid": Variant("o", f"/com/spotify/track/standin{index:06d}"),
+        "mpris:length": Variant("t", duration_ms * 1000),
+        "mpris:artUrl": Variant("s", f"https://i.scdn.co/image/standin{index:06d}"),
+        "xesam:title": Variant("s", f"Track {index}"),
+        "xesam:artist": Variant("as", [f"Artist {index % 7}"]),
+        "xesam:album": Variant("s", f"Album {index // 10}"),
+        "xesam:url": Variant("s", f"https://open.spotify.com/track/standin{index:06d}")
+    }
+
+
+class StandInPlayer(ServiceInterface):
+    # org.mpris.MediaPlayer2.Player with the properties and methods the media session backend uses
+    def __init__(self):
+        super().__init__("org.mpris.MediaPlayer2.Player")
+        self.index = 0
+        self.playing = True
+        self.shuffle = False
+        self.loop_status = "None"
+        self.position_start = time.monotonic()  # Monotonic time position 0 of the current track was at while playing
+        self.paused_position = 0  # Microseconds, while paused
+        self.method_calls = queue.Queue()  # (method, time.perf_counter()) of every Next / Previous / PlayPause call
+
+    def get_position(self):  # Microseconds
+        if self.playing:
+            return int((time.monotonic() - self.position_start) * 1e6)
+        return self.paused_position
+
+    def skip(self, step=1):
+        self.index += step
+        self.position_start = time.monotonic()
+        self.paused_position = 0
+        self.emit_properties_changed({"Metadata": make_metadata(self.index), "PlaybackStatus": self.PlaybackStatus})
+
+    def set_playing(self, playing):
+        if playing == self.playing:
+            return
+        if playing:
+            self.position_start = time.monotonic() - self.paused_position / 1e6
+        else:
+            self.paused_position = self.get_position()
+        self.playing = playing
+        self.emit_properties_changed({"PlaybackStatus": self.PlaybackStatus})
+
+    def seek(self, position):  # Microseconds
+        self.position_start = time.monotonic() - position / 1e6
+        self.paused_position = position
+        self.Seeked(position)
+
+    @dbus_property(access=PropertyAccess.READ)
+    def PlaybackStatus(self) -> "s":
+        return "Playing" if self.playing else "Paused"
+
+    @dbus_property(access=PropertyAccess.READ)
+    def Metadata(self) -> "a{sv}":
+        return make_metadata(self.index)
+
+    @dbus_property(access=PropertyAccess.READ)
+    def Position(self) -> "x":
+        return self.get_position()
+
+    @dbus_property(access=PropertyAccess.READ)
+    def Shuffle(self) -> "b":
+        return self.shuffle
+
+    @dbus_property(access=PropertyAccess.READ)
+    def LoopStatus(self) -> "s":
+        return self.loop_status
+
+    @method()
+    def Next(self):
+        self.method_calls.put(("Next", time.perf_counter()))
+        self.skip(1)
+
+    @method()
+    def Previous(self):
+        self.method_calls.put(("Previous", time.perf_counter()))
+        self.skip(-1)
+
+    @method()
+    def PlayPause(self):
+        self.method_calls.put(("PlayPause", time.perf_counter()))
+        self.set_playing(not self.playing)
+
+    @signal()
+    def Seeked(self, position) -> "x":
+        return position
+
+
+async def export_player(player):  # Returns the bus the player is registered on
+    bus = await MessageBus(bus_type=BusType.SESSION).connect()
+    bus.export(player_path, player)
+    await bus.request_name(player_name)
+    return bus
+
+
+class StandInPlayerThread(object):
+    # Runs a StandInPlayer on its own event loop thread, call() runs a player method on that thread
+    def __init__(self):
+        self.player = StandInPlayer()
+        self.loop = asyncio.new_event_loop()
+        self.bus = None
+        self._thread = threading.Thread(target=self.loop.run_forever, name="StandInPlayer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        self.bus = asyncio.run_coroutine_threadsafe(export_player(self.player), self.loop).result(timeout=5)
+
+    def call(self, function, *args):
+        self.loop.call_soon_threadsafe(function, *args)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.bus.disconnect)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+
+
+async def main(interval):
+    player = StandInPlayer()
+    await export_player(player)
+    print(f"{player_name} on the session bus, next track every {interval} s")
+    while True:
+        await asyncio.sleep(interval)
+        player.skip()
+        print(f"Track {player.index}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stand-in MPRIS player")
+    parser.add_argument("--interval", type=float, default=20, help="Seconds between track changes")
+    asyncio.run(main(parser.parse_args().interval))
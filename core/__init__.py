@@ -0,0 +1,2 @@
+# Headless core: songs, lyric providers and parsers, the Spotify client, playback state and timing.
+# Must not import tkinter, PIL or any platform module, it is used by workers, benchmarks and replays.
@@ -0,0 +1,154 @@
+import collections
+import concurrent.futures
+import threading
+import time
+
+
+class CommandDispatcher(object):
+    # Playback control commands sent off the Tk thread, shown optimistically and reconciled with the polls.
+    # Commands: "playing", "shuffle" and "repeat" set a target state, "skip" moves by a number of tracks (negative for previous).
+    # Clicks less than coalesce_delay apart are merged: a state command sends only its final target (nothing if it ended where
+    # it started), skips are sent as one burst. reconcile() shows the pending targets over every new snapshot until a poll confirms
+    # them. A failed command is dropped right away and take_rollback() tells the updater to show the last snapshot again,
+    # a command no poll confirmed within confirm_timeout of being sent is dropped as well.
+    def __init__(self, send, coalesce_delay=0.2, confirm_timeout=5.0, workers=2, clock=time.perf_counter):
+        self.send = send  # send(command, value) on a worker thread, value is the target state or the skip count. Returns True on success
+        self.coalesce_delay = coalesce_delay  # Seconds without a click before a command is sent
+        self.confirm_timeout = confirm_timeout
+        self.clock = clock  # Also the clock of the click times passed in
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="Commands")
+        self.pending = {}  # Command: pending command dict, until confirmed, failed or expired
+
+        self.visual_latencies = collections.deque(maxlen=100)  # Seconds from a click to the frame showing it
+        self.confirm_latencies = collections.deque(maxlen=100)  # Seconds from the first click of a command to the poll confirming it
+        self.counters = {"clicks": 0, "sent": 0, "coalesced": 0, "failed": 0, "confirmed": 0, "unconfirmed": 0}
+        self._rollback = False
+        self._lock = threading.Lock()
+
+    def set(self, command, value, current, click_time=None):  # current: state shown before the click
+        self._click(command, click_time, value, current)
+
+    def skip(self, steps, current_uri, click_time=None):  # current_uri: track playing before the click, the skip is confirmed once it changes
+        self._click("skip", click_time, steps, current_uri)
+
+    def reconcile(self, state):
+        # Called with the playback state of every new snapshot: {"playing", "shuffle", "repeat", "uri"}.
+        # Returns the state to show, with the targets of unconfirmed commands and "skipping" while a skip is unconfirmed.
+        now = self.clock()
+        state = dict(state, skipping=False)
+        with self._lock:
+            for command, pending in list(self.pending.items()):
+                if command == "skip":
+                    confirmed = state["uri"] is not None and state["uri"] != pending["origin"]
+                else:
+                    confirmed = state[command] == pending["target"]
+                if not pending["in_flight"] and confirmed:
+                    del self.pending[command]
+                    self.counters["confirmed"] += 1
+                    self.confirm_latencies.append(now - pending["click_time"])
+                elif not pending["in_flight"] and now - pending["sent_time"] > self.confirm_timeout:
+                    del self.pending[command]  # The polled state wins
+                    self.counters["unconfirmed"] += 1
+                elif command == "skip":
+                    state["skipping"] = True
+                else:
+                    state[command] = pending["target"]
+        return state
+
+    def mark_rendered(self):  # Called after a frame was committed, measures click to visual
+        now = self.clock()
+        with self._lock:
+            for pending in self.pending.values():
+                for click_time in pending["unrendered_clicks"]:
+                    self.visual_latencies.append(now - click_time)
+                pending["unrendered_clicks"].clear()
+
+    def is_pending(self, command):
+        return command in self.pending
+
+    def is_busy(self):  # True while a command waits to be sent or is being sent
+        with self._lock:
+            return any(pending["in_flight"] for pending in self.pending.values())
+
+    def take_rollback(self):  # True once after a command failed
+        rollback, self._rollback = self._rollback, False
+        return rollback
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                **self.counters,
+                "mean_visual_ms": sum(self.visual_latencies) / len(self.visual_latencies) * 1000 if self.visual_latencies else None,
+                "max_visual_ms": max(self.visual_latencies) * 1000 if self.visual_latencies else None,
+                "mean_confirmed_ms": sum(self.confirm_latencies) / len(self.confirm_latencies) * 1000 if self.confirm_latencies else None,
+                "max_confirmed_ms": max(self.confirm_latencies) * 1000 if self.confirm_latencies else None
+            }
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _click(self, command, click_time, value, current):
+        now = self.clock()
+        click_time = click_time if click_time is not None else now
+        with self._lock:
+            self.counters["clicks"] += 1
+            pending = self.pending.get(command)
+            if pending is None:
+                pending = self.pending[command] = {
+                    "origin": current,  # State or track uri before the first click
+                    "target": current,
+                    "sent": None,  # Last target sent, None if nothing was sent yet
+                    "steps": 0,  # Skips not sent yet
+                    "in_flight": False,  # True while waiting to send or sending
+                    "click_time": click_time,
+                    "last_click": now,
+                    "sent_time": None,
+                    "unrendered_clicks": []
+                }
+            if command == "skip":
+                pending["steps"] += value
+            else:
+                pending["target"] = value
+            pending["last_click"] = now
+            pending["unrendered_clicks"].append(click_time)
+            if pending["in_flight"]:
+                self.counters["coalesced"] += 1
+                return
+            pending["in_flight"] = True
+        self.executor.submit(self._flush, command, pending)
+
+    def _flush(self, command, pending):  # Runs on a worker thread until nothing is left to send for the command
+        while True:
+            with self._lock:
+                wait = pending["last_click"] + self.coalesce_delay - self.clock()
+                if wait <= 0:
+                    if command == "skip":
+                        value, pending["steps"] = pending["steps"], 0
+                        unchanged = value == 0
+                    else:
+                        value = pending["target"]
+                        unchanged = value == (pending["sent"] if pending["sent"] is not None else pending["origin"])
+                    if unchanged:
+                        pending["in_flight"] = False
+                        pending["sent_time"] = self.clock()
+                        if pending["sent"] is None and self.pending.get(command) is pending:
+                            del self.pending[command]  # Clicked back to where it started, nothing to send or confirm
+                        return
+                    pending["sent"] = value
+                    self.counters["sent"] += 1
+            if wait > 0:
+                time.sleep(wait)
+                continue
+
+            try:
+                succeeded = self.send(command, value)
+            except Exception as e:
+                print(f"\033[91m[ERROR] Playback command {command} failed: {e!r}\033[0m")
+                succeeded = False
+            if not succeeded:
+                with self._lock:
+                    self.counters["failed"] += 1
+                    if self.pending.get(command) is pending:
+                        del self.pending[command]
+                    self._rollback = True
+                return
@@ -0,0 +1,50 @@
+import collections
+import time
+
+
+class FrameProfiler(object):
+    # Per-section cost of the updater frames. mark(section) attributes the time since the previous mark (or the start
+    # of the frame) to section, so a frame is split into consecutive sections without nesting.
+    def __init__(self, max_frames=1000, clock=time.perf_counter):
+        self.clock = clock
+        self.max_frames = max_frames
+        self.sections = {}  # Section: recent durations in seconds, in the order sections were first marked
+        self.frames = collections.deque(maxlen=max_frames)  # Recent frame durations in seconds
+        self.frame_start = None
+        self.last_mark = None
+
+    def begin_frame(self):
+        self.frame_start = self.last_mark = self.clock()
+
+    def mark(self, section):
+        if self.last_mark is None:
+            return
+        now = self.clock()
+        durations = self.sections.get(section)
+        if durations is None:
+            durations = self.sections[section] = collections.deque(maxlen=self.max_frames)
+        durations.append(now - self.last_mark)
+        self.last_mark = now
+
+    def end_frame(self, section=None):  # section: Name for the time since the last mark, e.g. the commit
+        if self.frame_start is None:
+            return
+        if section is not None:
+            self.mark(section)
+        self.frames.append(self.clock() - self.frame_start)
+        self.frame_start = self.last_mark = None
+
+    def get_stats(self):  # Section: mean, p95 and max in us over the recent frames
+        stats = {section: summarize(durations) for section, durations in self.sections.items() if durations}
+        if self.frames:
+            stats["frame"] = summarize(self.frames)
+        return stats
+
+
+def summarize(durations):  # Durations in seconds to {"mean_us", "p95_us", "max_us"}
+    ordered = sorted(durations)
+    return {
+        "mean_us": round(sum(ordered) / len(ordered) * 1e6, 2),
+        "p95_us": round(ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] * 1e6, 2),
+        "max_us": round(ordered[-1] * 1e6, 2)
+    }
@@ -0,0 +1,55 @@
+import collections
+import time
+
+
+class FrameScheduler(object):
+    # Picks when the updater runs next from the deadlines registered during the current frame:
+    # animation frames, lyric line boundaries, progress label ticks, marquee steps, polls.
+    # Without any deadline the updater sleeps for idle_interval.
+    def __init__(self, frame_interval=0.015, idle_interval=0.5, clock=time.monotonic):
+        self.frame_interval = frame_interval  # Seconds between frames while animating
+        self.idle_interval = idle_interval  # Longest sleep, bounds the latency of anything not registered as a deadline
+        self.visible = True  # While the window is minimized every deadline is ignored and the updater idles
+        self.clock = clock
+        self.frame_start = clock()
+        self.deadline = None
+        self.reason = None
+
+        self.wakeups = collections.deque(maxlen=1000)  # (time, reason) of every frame
+        self.reasons = collections.Counter()
+
+    def begin_frame(self):
+        self.frame_start = self.clock()
+        self.deadline = None
+        self.reason = None
+
+    def request_frame(self, reason):
+        # Next animation frame, measured from the start of this frame so the frame rate does not drift with the frame cost
+        self.request_at(self.frame_start + self.frame_interval, reason)
+
+    def request_in(self, seconds, reason):
+        self.request_at(self.clock() + max(seconds, 0), reason)
+
+    def request_at(self, deadline, reason):  # deadline: clock() value
+        if not self.visible:
+            return
+        if self.deadline is None or deadline < self.deadline:
+            self.deadline = deadline
+            self.reason = reason
+
+    def next_delay_ms(self):
+        now = self.clock()
+        if self.deadline is None or self.deadline > now + self.idle_interval:
+            deadline, reason = now + self.idle_interval, "idle"
+        else:
+            deadline, reason = self.deadline, self.reason
+        self.wakeups.append((now, reason))
+        self.reasons[reason] += 1
+        return max(0, round((deadline - now) * 1000))
+
+    def get_stats(self):
+        recent_wakeups = [wakeup for wakeup in self.wakeups if wakeup[0] >= self.clock() - 10]
+        return {
+            "wakeups_per_second": len(recent_wakeups) / 10,
+            "reasons": dict(self.reasons)
+        }
@@ -0,0 +1,89 @@
+import collections
+import concurrent.futures
+import queue
+import threading
+import time
+
+
+class JobRunner(object):
+    # Runs one job at a time off the Tk thread. Results are posted to a queue the UI loop drains with get_result().
+    # Submitting a new job cancels the previous one, so a stale result never reaches the UI.
+    def __init__(self, name, workers=2):
+        self.name = name
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)  # Spare worker so a new job never waits on a stale one
+        self.results = queue.Queue()
+        self.current_job_id = None
+        self.current_future = None
+        self.job_id = 0
+
+        self.durations = collections.deque(maxlen=100)  # Seconds taken by completed jobs
+        self.counters = {"submitted": 0, "completed": 0, "cancelled": 0, "discarded": 0, "failed": 0}
+        self._lock = threading.Lock()
+
+    def submit(self, key, function, *args):
+        self.cancel()
+        self.job_id += 1
+        self.current_job_id = self.job_id
+        self.counters["submitted"] += 1
+        self.current_future = self.executor.submit(self._run, self.job_id, key, function, args)
+        return self.job_id
+
+    def cancel(self):
+        # Not started jobs are dropped, running jobs finish in the background and their result is discarded
+        if self.current_job_id is None:
+            return
+        if self.current_future is not None:
+            self.current_future.cancel()
+        self.current_job_id = None
+        self.current_future = None
+        with self._lock:
+            self.counters["cancelled"] += 1
+
+    def is_running(self):
+        return self.current_job_id is not None
+
+    def wait(self, timeout=None):  # Blocks until the current job has posted its result, for replays on a virtual clock
+        future = self.current_future
+        if future is not None:
+            concurrent.futures.wait([future], timeout)
+
+    def get_result(self):
+        # Called from the UI loop. Returns (key, result) of the current job once it finished, otherwise None.
+        while True:
+            try:
+                job_id, key, result, duration = self.results.get_nowait()
+            except queue.Empty:
+                return None
+            if job_id != self.current_job_id:
+                with self._lock:
+                    self.counters["discarded"] += 1
+                continue
+            self.current_job_id = None
+            self.current_future = None
+            with self._lock:
+                self.durations.append(duration)
+                self.counters["completed"] += 1
+            return key, result
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                **self.counters,
+                "mean_duration": sum(self.durations) / len(self.durations) if self.durations else None,
+                "max_duration": max(self.durations) if self.durations else None
+            }
+
+    def close(self):
+        self.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job_id, key, function, args):
+        start_time = time.perf_counter()
+        try:
+            result = function(*args)
+        except Exception as e:  # Report the failure to the UI as an empty result
+            print(f"\033[91m[ERROR] {self.name} job failed: {e!r}\033[0m")
+            with self._lock:
+                self.counters["failed"] += 1
+            result = None
+        self.results.put((job_id, key, result, time.perf_counter() - start_time))
@@ -0,0 +1,101 @@
+import re
+
+# One pass over the whole subtitle body. A line is either timestamped lyrics or a metadata tag such as [ar:Artist] or [offset:+100].
+# The first timestamp is captured directly, further timestamps on the same line are matched separately.
+line_pattern = re.compile(r"^[ \t]*\[(?:(\d+):(\d{1,2})(?:[.:](\d{1,3}))?\]((?:[ \t]*\[\d+:\d{1,2}(?:[.:]\d{1,3})?\])*)([^\r\n]*)|([A-Za-z#]+):([^\]\r\n]*)\][ \t]*$)", re.MULTILINE)
+timestamp_pattern = re.compile(r"\[(\d+):(\d{1,2})(?:[.:](\d{1,3}))?\]")
+fraction_scale = {1: 100, 2: 10, 3: 1}  # Fraction digits to ms multiplier: .5 -> 500 ms, .05 -> 50 ms, .005 -> 5 ms
+
+
+class SyncedLyrics(object):
+    # Immutable synced lyrics timeline stored as parallel tuples. Line i is shown from starts[i] to ends[i] (ms).
+    __slots__ = ("starts", "ends", "texts", "metadata")
+
+    def __init__(self, starts, ends, texts, metadata=None):
+        object.__setattr__(self, "starts", tuple(starts))
+        object.__setattr__(self, "ends", tuple(ends))
+        object.__setattr__(self, "texts", tuple(texts))
+        object.__setattr__(self, "metadata", dict(metadata or {}))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("SyncedLyrics is immutable")
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        return zip(self.starts, self.ends, self.texts)
+
+    def __eq__(self, other):
+        return isinstance(other, SyncedLyrics) and (self.starts, self.ends, self.texts) == (other.starts, other.ends, other.texts)
+
+    def __repr__(self):
+        return f"SyncedLyrics({len(self)} lines)"
+
+    def to_dict(self):
+        return {"starts": list(self.starts), "ends": list(self.ends), "texts": list(self.texts), "metadata": self.metadata}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["starts"], data["ends"], data["texts"], data.get("metadata"))
+
+
+def timestamp_to_epoch(minutes, seconds, fraction):  # Regex groups of [mm:ss.xx] to ms
+    return int(minutes) * 60000 + int(seconds) * 1000 + (int(fraction) * fraction_scale[len(fraction)] if fraction else 0)
+
+
+def parse_lrc(subtitle_body, duration):  # duration: Track length in ms, end of the last line
+    metadata = {}
+    entries = []  # (start, order, text), order keeps lines sharing a timestamp in file order
+    in_order = True
+    previous_start = -1
+    for minutes, seconds, fraction, more_timestamps, text, tag, value in line_pattern.findall(subtitle_body):
+        if tag:
+            metadata[tag.lower()] = value.strip()
+            continue
+        text = text.strip()
+        start = int(minutes) * 60000 + int(seconds) * 1000 + (int(fraction) * fraction_scale[len(fraction)] if fraction else 0)  # Inlined timestamp_to_epoch
+        in_order = in_order and start >= previous_start
+        previous_start = start
+        entries.append((start, len(entries), text))
+        if more_timestamps:  # Same line repeated at several times, e.g. a chorus
+            in_order = False
+            for timestamp in timestamp_pattern.findall(more_timestamps):
+                entries.append((timestamp_to_epoch(*timestamp), len(entries), text))
+
+    if not entries:
+        return None
+    if not in_order:
+        entries.sort()
+
+    # Positive offset shows lyrics earlier
+    offset = 0
+    if metadata.get("offset"):
+        try:
+            offset = int(metadata["offset"])
+        except ValueError:
+            pass
+
+    starts = []
+    texts = []
+    # Add blank line from 0 to first line
+    first_start = max(entries[0][0] - offset, 0)
+    if first_start != 0:
+        starts.append(0)
+        texts.append("")
+
+    for start, _, text in entries:
+        if text == "" and texts and texts[-1] == "":  # Remove double instrumental sections
+            continue
+        starts.append(max(start - offset, 0))
+        texts.append(text)
+
+    ends = starts[1:] + [duration]
+
+    # Add blank line to end if not already existent
+    if texts[-1] != "":
+        starts.append(ends[-1])
+        ends.append(duration)
+        texts.append("")
+
+    return SyncedLyrics(starts, ends, texts, metadata)
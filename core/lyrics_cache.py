@@ -0,0 +1,116 @@
+import json
+import sqlite3
+import threading
+import time
+
+
+class LyricsCache(object):
+    # Persistent lyrics cache keyed by Spotify track URI, with artist/title/duration as a fallback key.
+    # Entries hold the parsed lyrics returned by get_lyrics(), or None for negative results (not found, restricted).
+    def __init__(self, path, ttl=30 * 86400, negative_ttl=86400, max_entries=2000, encode=json.dumps, decode=json.loads):
+        self.path = path
+        self.encode = encode  # Value to text for storage
+        self.decode = decode  # Text to value, an entry that fails to decode is dropped
+        self.ttl = ttl  # Seconds a found entry stays valid
+        self.negative_ttl = negative_ttl  # Seconds a negative entry stays valid
+        self.max_entries = max_entries  # Least recently used keys are evicted past this size (each track stores up to two keys)
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._in_flight = {}  # Key: {"done": threading.Event, "value", "lookup_status"} of the lookup currently fetching it
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS lyrics (key TEXT PRIMARY KEY, value TEXT, negative INTEGER, expires REAL, last_access REAL)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS lyrics_last_access ON lyrics (last_access)")
+        self._connection.commit()
+
+    @staticmethod
+    def get_keys(song):
+        keys = []
+        if song.uri:
+            keys.append(f"uri:{song.uri}")
+        keys.append(f"meta:{song.artist.lower()}|{song.title.lower()}|{round(song.duration / 1000) if song.duration else ''}")
+        return keys
+
+    def get(self, song, keys=None, count=True):
+        # Returns (hit, value). value is None on a negative hit. count: False for a re-check of a lookup that was already counted
+        keys = keys or self.get_keys(song)
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                row = self._connection.execute("SELECT value, negative, expires FROM lyrics WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    continue
+                if row[2] < now:  # Expired
+                    self._connection.execute("DELETE FROM lyrics WHERE key = ?", (key,))
+                    self._connection.commit()
+                    continue
+                try:
+                    value = None if row[1] else self.decode(row[0])
+                except (ValueError, KeyError, TypeError):  # Stored in an older format
+                    self._connection.execute("DELETE FROM lyrics WHERE key = ?", (key,))
+                    self._connection.commit()
+                    continue
+                self._connection.execute("UPDATE lyrics SET last_access = ? WHERE key = ?", (now, key))
+                self._connection.commit()
+                if count:
+                    self.hits += 1
+                return True, value
+            if count:
+                self.misses += 1
+        return False, None
+
+    def put(self, song, value, negative=False, keys=None):
+        keys = keys or self.get_keys(song)
+        now = time.time()
+        expires = now + (self.negative_ttl if negative else self.ttl)
+        data = None if negative else self.encode(value)
+        with self._lock:
+            self._connection.executemany("INSERT OR REPLACE INTO lyrics (key, value, negative, expires, last_access) VALUES (?, ?, ?, ?, ?)",
+                                         [(key, data, int(negative), expires, now) for key in keys])
+            self._connection.execute("DELETE FROM lyrics WHERE key IN (SELECT key FROM lyrics ORDER BY last_access DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+            self._connection.commit()
+
+    def get_or_fetch(self, song, fetch, checked=False):
+        # Single-flight lookup: concurrent lookups for the same track wait for the first fetch instead of repeating it,
+        # and get its result and song.lookup_status.
+        # fetch(song) returns the lyrics, song.lookup_status decides whether a None result is cached as negative.
+        # checked: the caller already counted this lookup with get(), the cache is checked again without counting it twice.
+        keys = self.get_keys(song)
+        hit, value = self.get(song, keys, count=not checked)
+        if hit:
+            return value
+
+        with self._lock:
+            lookup = self._in_flight.get(keys[0])
+            owner = lookup is None
+            if owner:
+                lookup = self._in_flight[keys[0]] = {"done": threading.Event(), "value": None, "lookup_status": "error"}
+
+        if not owner:
+            lookup["done"].wait()
+            song.lookup_status = lookup["lookup_status"]
+            return lookup["value"]
+
+        try:
+            value = fetch(song)
+            lookup["value"], lookup["lookup_status"] = value, song.lookup_status
+            if value is not None:
+                self.put(song, value, keys=keys)
+            elif song.lookup_status in ["not_found", "restricted"]:
+                self.put(song, None, negative=True, keys=keys)
+            return value
+        finally:
+            with self._lock:
+                del self._in_flight[keys[0]]
+            lookup["done"].set()
+
+    def get_stats(self):
+        with self._lock:
+            entries = self._connection.execute("SELECT COUNT(*) FROM lyrics").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,35 @@
+import bisect
+
+
+class LyricsTimeline(object):
+    # Synced lyrics compiled into sorted start/end arrays for constant-time lookups during playback.
+    # A cursor follows normal playback line by line, seeks fall back to a binary search.
+    def __init__(self, synced_lyrics):  # synced_lyrics: SyncedLyrics, times in ms
+        self.starts = synced_lyrics.starts
+        self.ends = synced_lyrics.ends
+        self.cursor = 0
+        self.seeks = 0  # Number of lookups that needed a binary search
+
+    def __len__(self):
+        return len(self.starts)
+
+    def find(self, duration):
+        # Returns the index of the first line whose range contains duration, None if outside of the lyrics
+        if not self.starts:
+            return None
+
+        cursor = self.cursor
+        for index in (cursor, cursor + 1):  # Current line, or the next one during normal playback
+            if index < len(self.starts) and self._contains(index, duration):
+                self.cursor = index
+                return index
+
+        self.seeks += 1
+        index = bisect.bisect_left(self.ends, duration)  # First line ending at or after duration
+        if index < len(self.starts) and self.starts[index] <= duration:
+            self.cursor = index
+            return index
+        return None
+
+    def _contains(self, index, duration):
+        return self.starts[index] <= duration <= self.ends[index] and (index == 0 or self.ends[index - 1] < duration)
@@ -0,0 +1,184 @@
+import contextlib
+import json
+import math
+import urllib.parse
+
+import requests
+
+from .lrc_parser import SyncedLyrics, parse_lrc
+from .request_policy import RequestPolicy, RequestRejected
+
+base_url = "https://apic-desktop.musixmatch.com/ws/1.1/macro.subtitles.get?format=json&namespace=lyrics_richsynched&subtitle_format=musixmatchm&app_id=web-desktop-app-v1.0&"
+# noinspection SpellCheckingInspection
+resource_url = "https://apic-desktop.musixmatch.com/ws/1.1/spotify.resource?app_id=web-desktop-app-v1.0&"
+# noinspection SpellCheckingInspection
+headers = {"authority": "apic-desktop.musixmatch.com", "cookie": "x-musixmatchm-token-guid="}
+# noinspection SpellCheckingInspection
+# If you do not have a musixmatch token, then use the following public token. This may not work 100% of the time.
+public_token = "2203269256ff7abcb649269df00e14c833dbf4ddfb5b36a1aae8b0"
+
+
+class MusixmatchProvider(object):
+    # Lyric lookups with the Musixmatch desktop API, over a shared session and through the shared RequestPolicy
+    def __init__(self, token, session, policy, trace_recorder=None):
+        self.token = token
+        self.session = session  # requests.Session kept alive for Musixmatch
+        self.policy = policy
+        self.trace_recorder = trace_recorder  # TraceRecorder receiving every decoded response, None to not record
+
+    def get_lyrics(self, song, priority="user"):  # Runs on a worker thread, must not touch the UI
+        print(f"Searching song: {song}")
+        try:
+            body = self.find_lyrics(song, priority)
+        except KeyError:  # Unknown cause. API returns invalid?
+            song.lookup_status = "error"
+            body = None
+        if body is None:
+            print("Failed to find song")
+            return None
+        return build_lyrics(song, body)
+
+    def find_lyrics(self, song, priority="user"):  # priority: "background" for prefetches
+        duration = song.duration / 1000 if song.duration else ""
+        params = {
+            "q_album": song.album,
+            "q_artist": song.artist,
+            "q_artists": song.artist,
+            "q_track": song.title,
+            "track_spotify_id": song.uri,
+            "q_duration": duration,
+            "f_subtitle_length": math.floor(duration) if duration else "",
+            "usertoken": self.token,
+        }
+
+        url = base_url + urllib.parse.urlencode(params, quote_via=urllib.parse.quote)
+        try:
+            response = self.policy.execute("musixmatch", lambda: self.session.get(url, headers=headers, timeout=10), priority=priority, classify=self.classify_response)
+            response.raise_for_status()
+            r = response.json()
+            if self.trace_recorder is not None:
+                self.trace_recorder.record("musixmatch", {"uri": song.uri, "response": r})
+        except RequestRejected as e:  # Rate limited, the updater retries once the breaker lets requests through
+            print(repr(e))
+            song.lookup_status = "timed_out"
+            return
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(repr(e))
+            song.lookup_status = "error"
+            return
+
+        return read_musixmatch_response(song, r)
+
+    def send_spotify_resource(self, resource, priority="user"):
+        # PUT a Spotify Web API resource through Musixmatch, e.g. "me/player/play" when Spotify rejects it with a 403.
+        # Returns the response, raises RequestRejected while the breaker is open
+        url = resource_url + urllib.parse.urlencode({"usertoken": self.token, "resource": resource})
+        return self.policy.execute("musixmatch spotify.resource", lambda: self.session.put(url, headers=headers, timeout=10), priority=priority)
+
+    def close(self):
+        self.session.close()
+
+    @staticmethod
+    def classify_response(response):  # RequestPolicy classify hook, a matcher 401 is Musixmatch's rate limit
+        failed, retry_after = RequestPolicy.classify(response)
+        if failed:
+            return failed, retry_after
+        with contextlib.suppress(ValueError, KeyError, TypeError):
+            if response.json()["message"]["body"]["macro_calls"]["matcher.track.get"]["message"]["header"]["status_code"] == 401:
+                return True, None
+        return False, None
+
+
+def read_musixmatch_response(song, r):
+    # r: Decoded macro.subtitles.get response. Sets song.lookup_status, returns the macro calls if the song was found
+    if r["message"]["header"]["status_code"] != 200 and r["message"]["header"].get("hint") == "renew":
+        print("Invalid token")
+        song.lookup_status = "error"
+        return
+    body = r["message"]["body"]["macro_calls"]
+
+    if body["matcher.track.get"]["message"]["header"]["status_code"] != 200:
+        if body["matcher.track.get"]["message"]["header"]["status_code"] == 404:
+            print("Song not found.")
+            song.lookup_status = "not_found"
+        elif body["matcher.track.get"]["message"]["header"]["status_code"] == 401:
+            print("Timed out. Change the token or wait a few minutes before trying again.")
+            song.lookup_status = "timed_out"
+        else:
+            print(f"Requested error: {body['matcher.track.get']['message']['header']}")
+            song.lookup_status = "request_error"
+            song.lookup_error = body["matcher.track.get"]["message"]["header"]
+        return
+
+    elif isinstance(body["track.lyrics.get"]["message"].get("body"), dict):
+        if body["track.lyrics.get"]["message"]["body"]["lyrics"]["restricted"]:
+            print("Restricted lyrics.")
+            song.lookup_status = "restricted"
+            return
+
+    song.lookup_status = "found"
+    return body
+
+
+def build_lyrics(song, body):  # Lyrics of a found song, the get_lyrics() result
+    song.update_info(body)
+    print("Song found")
+
+    print(f"Searching lyrics: {song}")
+    lyrics = get_unsynced_lyrics(song, body)
+    if lyrics is None:
+        print("Failed to find lyrics")
+
+    synced_lyrics = get_synced_lyrics(song, body)
+    if synced_lyrics is None:
+        print("Failed to find synced lyrics")
+
+    return {
+        "synced_lyrics": synced_lyrics,
+        "lyrics": lyrics,
+        "song_info": song.get_info()
+    }
+
+
+def get_unsynced_lyrics(song, body):
+    if song.is_instrumental:
+        lines = ["Instrumental"]
+    elif song.has_unsynced:
+        lyrics_body = body["track.lyrics.get"]["message"].get("body")
+        if lyrics_body is None:
+            return None
+        if lyrics := lyrics_body["lyrics"]["lyrics_body"]:
+            lines = list(filter(None, lyrics.split("\n")))
+        else:
+            return None
+    else:
+        return None
+    return lines
+
+
+def get_synced_lyrics(song, body):
+    if song.is_instrumental:
+        synced_lyrics = SyncedLyrics([0], [song.get_info()["duration"]], ["Instrumental"])
+    elif song.has_synced:
+        subtitle_body = body["track.subtitles.get"]["message"].get("body")
+        if subtitle_body is None:
+            return None
+        subtitle = subtitle_body["subtitle_list"][0]["subtitle"]
+        if not subtitle:
+            return None
+        synced_lyrics = parse_lrc(subtitle["subtitle_body"], song.get_info()["duration"])
+    else:
+        return None
+    return synced_lyrics
+
+
+def encode_lyrics(lyrics):  # get_lyrics() result to JSON for the lyrics cache
+    synced_lyrics = lyrics["synced_lyrics"]
+    return json.dumps({**lyrics, "synced_lyrics": synced_lyrics.to_dict() if synced_lyrics is not None else None})
+
+
+def decode_lyrics(data):
+    lyrics = json.loads(data)
+    if lyrics["synced_lyrics"] is not None:
+        lyrics["synced_lyrics"] = SyncedLyrics.from_dict(lyrics["synced_lyrics"])
+    return lyrics
@@ -0,0 +1,128 @@
+import collections
+import statistics
+import time
+
+
+class PlaybackClock(object):
+    # Track progress extrapolated on the monotonic clock from the polled progress.
+    # Every poll is anchored to the middle of its request (half the round trip). Small differences between the
+    # extrapolated and the polled progress are blended in over smoothing_time instead of snapping, differences over
+    # seek_threshold are treated as seeks and applied immediately. The playback rate is estimated from the polls of
+    # the current track to correct clock skew.
+    def __init__(self, sync_offset=50, seek_threshold=1000, smoothing_time=1.0, max_skew=0.02, max_calibration=250, clock=time.monotonic):
+        self.sync_offset = sync_offset  # ms lyrics are shown earlier than the progress, before calibration
+        self.seek_threshold = seek_threshold  # ms
+        self.smoothing_time = smoothing_time  # Seconds to blend in a correction
+        self.max_skew = max_skew  # Largest accepted playback rate deviation, 0.02 = 2%
+        self.max_calibration = max_calibration  # Largest automatic change of sync_offset in ms
+        self.clock = clock
+
+        self.track_id = None
+        self.playing = False
+        self.duration = None
+        self.anchor_time = None  # Monotonic time of anchor_progress
+        self.anchor_progress = 0  # ms
+        self.correction = 0  # ms blended in from anchor_time over smoothing_time
+        self.rate = 1.0  # Progress ms per local ms
+
+        self.samples = collections.deque(maxlen=30)  # (sample time, progress) of the current track since the last seek
+        self.errors = collections.deque(maxlen=50)  # Polled minus extrapolated progress in ms, after the pending correction
+        self.round_trips = collections.deque(maxlen=50)  # ms
+        self.counters = {"updates": 0, "seeks": 0, "corrections": 0, "track_changes": 0}
+
+    def update(self, progress, playing, request_start, request_end, track_id=None, duration=None):
+        # progress: Polled progress in ms. request_start, request_end: clock() values around the request.
+        sample_time = (request_start + request_end) / 2  # Spotify read the progress about half a round trip after the request
+        self.round_trips.append((request_end - request_start) * 1000)
+        self.counters["updates"] += 1
+        self.duration = duration
+
+        if track_id != self.track_id or self.anchor_time is None:
+            self.counters["track_changes"] += 1
+            self.track_id = track_id
+            self.rate = 1.0
+            self._snap(progress, playing, sample_time)
+            return
+
+        if playing != self.playing:  # Paused or resumed, the previous extrapolation does not apply
+            self._snap(progress, playing, sample_time)
+            return
+
+        error = progress - self.get_progress(sample_time)
+        if abs(error) > self.seek_threshold:
+            self.counters["seeks"] += 1
+            self._snap(progress, playing, sample_time)
+            return
+
+        # Residual error: the part of the previous correction not blended in yet is already being corrected
+        remaining = self.correction * (1 - min(max((sample_time - self.anchor_time) / self.smoothing_time, 0), 1))
+        self.errors.append(error - remaining)
+        if playing:
+            self.samples.append((sample_time, progress))
+            self._estimate_rate()
+
+        # Continue from the currently shown progress and blend in the remaining error
+        now = self.clock()
+        shown_progress = self.get_progress(now)
+        target_progress = progress + (now - sample_time) * 1000 * self.rate * playing
+        self.anchor_time = now
+        self.anchor_progress = shown_progress
+        self.correction = target_progress - shown_progress
+        self.counters["corrections"] += 1
+
+    def get_progress(self, now=None):  # Extrapolated progress in ms
+        if self.anchor_time is None:
+            return 0
+        if now is None:
+            now = self.clock()
+        elapsed = now - self.anchor_time
+        progress = self.anchor_progress + self.correction * min(max(elapsed / self.smoothing_time, 0), 1)
+        if self.playing:
+            progress += elapsed * 1000 * self.rate
+        if self.duration is not None:
+            progress = min(progress, self.duration)
+        return max(progress, 0)
+
+    def get_sync_offset(self):
+        # sync_offset plus the mean residual error of the recent polls: if the extrapolation keeps lagging behind the
+        # polls even after the smoothing correction, lyrics are shown that much earlier
+        if len(self.errors) < 5:
+            return self.sync_offset
+        calibration = min(max(sum(self.errors) / len(self.errors), -self.max_calibration), self.max_calibration)  # Runs every frame, statistics.mean is much slower
+        return self.sync_offset + calibration
+
+    def get_lyrics_progress(self, now=None):
+        return self.get_progress(now) + self.get_sync_offset()
+
+    def get_stats(self):
+        errors = list(self.errors)
+        return {
+            **self.counters,
+            "mean_error_ms": statistics.mean(errors) if errors else None,
+            "mean_abs_error_ms": statistics.mean(abs(error) for error in errors) if errors else None,
+            "error_stdev_ms": statistics.stdev(errors) if len(errors) > 1 else None,
+            "mean_round_trip_ms": statistics.mean(self.round_trips) if self.round_trips else None,
+            "skew_ppm": (self.rate - 1) * 1e6,
+            "sync_offset_ms": self.get_sync_offset()
+        }
+
+    def _snap(self, progress, playing, sample_time):
+        self.playing = playing
+        self.anchor_time = sample_time
+        self.anchor_progress = progress
+        self.correction = 0
+        self.samples.clear()
+        if playing:
+            self.samples.append((sample_time, progress))
+
+    def _estimate_rate(self):
+        # Least squares slope of progress over local time, needs polls over at least 10 s
+        if len(self.samples) < 3 or self.samples[-1][0] - self.samples[0][0] < 10:
+            return
+        times = [sample[0] for sample in self.samples]
+        progresses = [sample[1] for sample in self.samples]
+        mean_time = statistics.mean(times)
+        mean_progress = statistics.mean(progresses)
+        variance = sum((sample_time - mean_time) ** 2 for sample_time in times)
+        slope = sum((sample_time - mean_time) * (progress - mean_progress) for sample_time, progress in self.samples) / variance / 1000
+        self.rate = min(max(slope, 1 - self.max_skew), 1 + self.max_skew)
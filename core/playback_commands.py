@@ -0,0 +1,40 @@
+import contextlib
+import json
+
+import requests
+
+from .request_policy import RequestRejected
+
+
+def send_playback_command(spotify_client, musixmatch_provider, command, value, on_success=None):
+    # CommandDispatcher send() for the Web API, runs on a dispatcher worker thread. Returns True if Spotify accepted the command.
+    # command: "skip" with the signed number of tracks, sent as a burst, or "playing" / "shuffle" / "repeat" with the target state.
+    # A 403 play/pause is retried through Musixmatch unless musixmatch_provider is None. on_success() runs once Spotify accepted it.
+    try:
+        if command == "skip":
+            endpoint = "/me/player/next" if value > 0 else "/me/player/previous"
+            print(f"Sending {abs(value)} request(s) to {endpoint}...")
+            for _ in range(abs(value)):  # Burst of coalesced skips
+                response = spotify_client.post(endpoint)
+                if not response.ok:
+                    break
+        elif command == "playing":
+            print("Starting playback..." if value else "Pausing playback...")
+            response = spotify_client.put("/me/player/play" if value else "/me/player/pause")
+            if response.status_code == 403 and musixmatch_provider is not None:
+                print("403 Forbidden, attempting to retry using Musixmatch API")
+                response = musixmatch_provider.send_spotify_resource("me/player/play" if value else "me/player/pause")
+        else:  # "shuffle" / "repeat"
+            print(f"Setting {command} to {value}...")
+            response = spotify_client.put(f"/me/player/{command}", params={"state": value})
+    except (requests.exceptions.RequestException, RequestRejected) as e:
+        print(f"\033[91m[ERROR] Playback command failed: {e!r}\033[0m")
+        return False
+    print("Posted request with response:")
+    print(f"\033[90mCode {response.status_code}: {response.reason}\033[0m")
+    with contextlib.suppress(json.decoder.JSONDecodeError):
+        print(f"\033[90m{response.json()}\033[0m")
+    # Success code 204
+    if response.ok and on_success is not None:
+        on_success()
+    return response.ok
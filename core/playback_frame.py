@@ -0,0 +1,68 @@
+# Headless steps of an updater() frame, shared by main.updater() and core.replay so a replayed trace runs the same code:
+# snapshot consumption with the command dispatcher overlay, song change detection, lyrics loading through the cache and
+# a JobRunner, and the current lyric line lookup.
+from .song import get_track_info
+
+
+def read_snapshot(snapshot, playback_clock, command_dispatcher=None):
+    # Returns (track_info, playback state) of a poller snapshot and syncs playback_clock to it.
+    # Playback state: {"playing", "shuffle", "repeat", "uri", "skipping"}, with the commands not confirmed by a poll yet shown over it.
+    # Raises TypeError while an advertisement plays (no item) and KeyError if nothing is playing.
+    spotify_playing = snapshot["spotify_playing"]
+    spotify_state = snapshot["spotify_state"]
+    track_info = get_track_info(spotify_playing["item"])
+    state = {"playing": spotify_playing["is_playing"], "shuffle": spotify_state["shuffle_state"], "repeat": spotify_state["repeat_state"], "uri": track_info["uri"]}
+    state = command_dispatcher.reconcile(state) if command_dispatcher is not None else dict(state, skipping=False)
+    # Smoothed into the clock, latency compensated by half the round trip
+    playback_clock.update(spotify_playing["progress_ms"], state["playing"], snapshot["request_start"], snapshot["request_end"], track_info["uri"], track_info["duration_ms"])
+    return track_info, state
+
+
+def is_song_change(track_info, previous_track_info):
+    # Compared by URI, a media session snapshot and the following poll describe the same track with different details
+    return previous_track_info is None or track_info["uri"] != previous_track_info["uri"]
+
+
+def find_lyric_line(lyrics_timeline, progress, frame_scheduler):
+    # Index of the lyric line at progress (ms), None outside of the lyrics. Requests a frame at the end of the line.
+    index = lyrics_timeline.find(progress)
+    if index is not None:
+        frame_scheduler.request_in((lyrics_timeline.ends[index] - progress) / 1000 + 0.001, "lyric_line")  # Next lyric line boundary
+    return index
+
+
+class LyricsLoader(object):
+    # Lyrics of the current song: a cache hit is returned in the same frame, a miss is looked up on the job runner and
+    # taken by a later frame with get_result(). Starting a lookup cancels the previous one.
+    def __init__(self, cache, job_runner, fetch):
+        self.cache = cache  # LyricsCache
+        self.job_runner = job_runner  # JobRunner
+        self.fetch = fetch  # fetch(song) returns the lyrics and sets song.lookup_status, runs on a job worker
+
+    def load(self, song):  # Returns (True, lyrics) on a cache hit, otherwise starts a lookup and returns (False, None)
+        cached, lyrics = self.cache.get(song)
+        if cached:
+            self.job_runner.cancel()
+            return True, lyrics
+        self.job_runner.submit(song.uri, self._lookup, song)
+        return False, None
+
+    def get_result(self, uri):
+        # (song, lyrics) once the lookup for the track uri finished, (None, None) if it failed, None while it runs.
+        # Results for another track are dropped.
+        result = self.job_runner.get_result()
+        if result is None:
+            return None
+        job_uri, lookup_result = result
+        if job_uri != uri:
+            return None
+        return lookup_result if lookup_result is not None else (None, None)
+
+    def cancel(self):
+        self.job_runner.cancel()
+
+    def is_running(self):
+        return self.job_runner.is_running()
+
+    def _lookup(self, song):  # Runs on a job worker
+        return song, self.cache.get_or_fetch(song, self.fetch, checked=True)  # load() counted the miss
@@ -0,0 +1,141 @@
+import gzip
+import json
+import threading
+import time
+
+trace_format = "spotify-surface-trace"
+trace_version = 1
+dropped_keys = {"available_markets"}  # Long country lists in Spotify track and album objects, never read
+
+
+class VirtualClock(object):
+    # Clock for replays, time only moves when advanced. monotonic() starts at 0, time() at epoch
+    def __init__(self, epoch=0.0):
+        self.epoch = epoch
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.epoch + self.now
+
+    def advance(self, seconds):
+        self.now += max(seconds, 0)
+
+    def advance_to(self, now):
+        self.now = max(self.now, now)
+
+
+def compact(value):  # Copy of a decoded JSON value without dropped_keys
+    if isinstance(value, dict):
+        return {key: compact(item) for key, item in value.items() if key not in dropped_keys}
+    if isinstance(value, list):
+        return [compact(item) for item in value]
+    return value
+
+
+class TraceRecorder(object):
+    # Records timestamped events to a gzip compressed JSON lines file: Spotify poll payloads ("playback") and Musixmatch
+    # macro responses ("musixmatch"). Times are seconds since the recording started, on the monotonic clock.
+    # Thread safe, the poller and the lyric workers record concurrently. Every event is flushed, a crash loses nothing.
+    def __init__(self, path, clock=time.monotonic):
+        self.path = path
+        self.clock = clock
+        self.start_time = clock()
+        self.events = 0
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+        self._write({"format": trace_format, "version": trace_version, "epoch": time.time()})
+
+    def relative(self, clock_time):  # clock() value to trace time
+        return round(clock_time - self.start_time, 4)
+
+    def record(self, kind, data, event_time=None):  # event_time: clock() value, now if None
+        event = {"t": self.relative(event_time if event_time is not None else self.clock()), "kind": kind, **compact(data)}
+        with self._lock:
+            if self._file is None:
+                return
+            self._write(event)
+            self.events += 1
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        print(f"Trace saved to {self.path} ({self.events} events)")
+
+    def _write(self, data):
+        self._file.write(json.dumps(data, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+
+def load_trace(path):
+    # Returns (header, events sorted by time). A trace cut off by a crash is read up to its last complete event.
+    lines = []
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        try:
+            for line in file:
+                lines.append(line)
+        except EOFError:  # Missing gzip trailer
+            pass
+    if lines and not lines[-1].endswith("\n"):
+        lines.pop()
+    if not lines:
+        raise ValueError(f"{path} is empty")
+
+    header = json.loads(lines[0])
+    if header.get("format") != trace_format or header.get("version") != trace_version:
+        raise ValueError(f"{path} is not a version {trace_version} trace")
+    events = sorted((json.loads(line) for line in lines[1:]), key=lambda event: event["t"])
+    return header, events
+
+
+class TracePoller(object):
+    # Stands in for PlaybackPoller during a replay: publishes the recorded poll payloads as versioned snapshots once the
+    # virtual clock reaches the time they were received
+    def __init__(self, events, clock):
+        self.clock = clock  # VirtualClock
+        self.polls = [event for event in events if event["kind"] == "playback"]
+        self.end_time = self.polls[-1]["t"] if self.polls else 0  # Trace time of the last poll
+        self.snapshot = None
+        self.version = 0
+        self.fetching = False
+        self.next_poll_time = clock.time()  # Epoch time the next snapshot is published
+        self._index = 0
+        self.publish()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def poke(self):
+        pass
+
+    def publish(self):  # Publishes every poll received up to now
+        now = self.clock.monotonic()
+        while self._index < len(self.polls) and self.polls[self._index]["t"] <= now:
+            poll = self.polls[self._index]
+            self._index += 1
+            self.version += 1
+            self.snapshot = {
+                "api_call_timestamp": self.clock.epoch + poll["t"],
+                "request_start": poll["request_start"],
+                "request_end": poll["request_end"],
+                "spotify_playing": poll["spotify_playing"],
+                "spotify_state": poll["spotify_state"],
+                "version": self.version
+            }
+        if self._index < len(self.polls):
+            self.next_poll_time = self.clock.epoch + self.polls[self._index]["t"]
+        else:
+            self.next_poll_time = float("inf")
+
+    def get_snapshot(self, since_version=None):
+        snapshot = self.snapshot
+        if snapshot is None or snapshot["version"] == since_version:
+            return None
+        return snapshot
@@ -0,0 +1,84 @@
+import collections
+import time
+
+
+class PollScheduler(object):
+    # Picks the delay until the next Spotify poll from the last playback snapshot
+    def __init__(self, playing_interval=3.0, paused_interval=5.0, not_playing_interval=10.0, track_end_window=4.0, track_end_margin=0.3, local_action_delay=0.3, min_interval=0.5, media_session_interval=15.0):
+        self.playing_interval = playing_interval  # Seconds between polls in the middle of a track
+        self.paused_interval = paused_interval  # Seconds between polls while paused
+        self.not_playing_interval = not_playing_interval  # Seconds between polls while Spotify is closed or nothing is playing
+        self.track_end_window = track_end_window  # Seconds before the predicted track end where polling tightens
+        self.track_end_margin = track_end_margin  # Seconds after the predicted track end to poll at
+        self.local_action_delay = local_action_delay  # Seconds to wait after a local control action before polling
+        self.min_interval = min_interval
+        self.media_session_interval = media_session_interval  # Seconds between polls while the local media session reports the playback
+        self.media_session_active = False  # Set while track changes, pauses and seeks arrive as media session events
+
+        self.predicted_end_time = None  # Epoch time the current track is predicted to end
+        self.previous_uri = None
+
+        self.poll_times = collections.deque(maxlen=5000)
+        self.decisions = collections.deque(maxlen=5000)  # (time, interval, reason)
+        self.detection_latencies = collections.deque(maxlen=100)  # Seconds between predicted track end and detected track change
+
+    def notify_local_action(self):
+        # A control button was clicked, poll shortly after so the UI reflects the change
+        return self._decide(time.time(), self.local_action_delay, "local_action")
+
+    def next_interval(self, snapshot):
+        # Called once after every poll
+        now = time.time()
+        self.poll_times.append(now)
+        self._record_track_change(snapshot)
+
+        spotify_playing = snapshot["spotify_playing"] if snapshot is not None else None
+        if not spotify_playing or spotify_playing.get("item") is None:  # Spotify closed, nothing playing or advertisement
+            self.predicted_end_time = None
+            return self._decide(now, self.not_playing_interval, "not_playing")
+
+        if self.media_session_active:  # Changes are seen without polling, the Web API is only the fallback
+            self.predicted_end_time = None
+            return self._decide(now, self.media_session_interval, "media_session")
+
+        if not spotify_playing["is_playing"]:
+            self.predicted_end_time = None
+            return self._decide(now, self.paused_interval, "paused")
+
+        remaining = (spotify_playing["item"]["duration_ms"] - spotify_playing["progress_ms"]) / 1000 - (now - snapshot["api_call_timestamp"])
+        self.predicted_end_time = now + remaining
+
+        if remaining <= self.track_end_window:  # Poll right after the predicted end to catch the track change
+            return self._decide(now, max(self.min_interval, remaining + self.track_end_margin), "track_end")
+        # Wake up in time for the track end window, but never sleep longer than the playing interval
+        return self._decide(now, max(self.min_interval, min(self.playing_interval, remaining - self.track_end_window)), "playing")
+
+    def get_stats(self):
+        now = time.time()
+        recent_polls = [poll_time for poll_time in self.poll_times if poll_time >= now - 3600]
+        reasons = collections.Counter(decision[2] for decision in self.decisions if decision[0] >= now - 3600)
+        if recent_polls:
+            elapsed = max(now - recent_polls[0], 1)
+            calls_per_hour = len(recent_polls) * 3600 / elapsed
+        else:
+            calls_per_hour = 0
+        return {
+            "calls_per_hour": calls_per_hour,
+            "reasons": dict(reasons),
+            "mean_detection_latency": sum(self.detection_latencies) / len(self.detection_latencies) if self.detection_latencies else None,
+            "max_detection_latency": max(self.detection_latencies) if self.detection_latencies else None
+        }
+
+    def _decide(self, now, interval, reason):
+        self.decisions.append((now, interval, reason))
+        return interval
+
+    def _record_track_change(self, snapshot):
+        spotify_playing = snapshot["spotify_playing"] if snapshot is not None else None
+        uri = spotify_playing["item"]["uri"] if spotify_playing and spotify_playing.get("item") else None
+        if uri is not None and self.previous_uri is not None and uri != self.previous_uri and self.predicted_end_time is not None:
+            # Only natural track ends are measured, skips happen before the predicted end
+            if snapshot["api_call_timestamp"] >= self.predicted_end_time:
+                self.detection_latencies.append(snapshot["api_call_timestamp"] - self.predicted_end_time)
+        if uri is not None:
+            self.previous_uri = uri
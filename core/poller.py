@@ -0,0 +1,159 @@
+import threading
+import time
+
+
+class PlaybackPoller(object):
+    # Long-lived background poller that publishes versioned playback snapshots.
+    # The latest snapshot is swapped in with a single reference assignment, so readers never see a partial update.
+    def __init__(self, fetch, scheduler=None, interval=1.5):
+        self.fetch = fetch  # Callable returning a snapshot dict, or None if nothing was received
+        self.scheduler = scheduler  # PollScheduler picking the next poll time, fixed interval if None
+        self.interval = interval  # Time in seconds between API calls without a scheduler
+        self.snapshot = None  # Latest published snapshot
+        self.version = 0  # Incremented on every published snapshot
+        self.last_api_call_time = 0
+        self.next_poll_time = 0  # Epoch time the next poll starts, lets the UI sleep until then
+        self.fetching = False  # True while a poll is in flight
+        self._publish_lock = threading.Lock()  # Snapshots are published by the poller thread and by publish()
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="PlaybackPoller", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake_event.set()
+
+    def poke(self):
+        # Poll shortly after a local control action instead of waiting for the scheduled poll
+        self.next_poll_time = time.time()  # Until the poller thread picks the actual time
+        self._wake_event.set()
+
+    def publish(self, data):
+        # Publishes a snapshot that did not come from a poll, e.g. built from a media session change
+        with self._publish_lock:
+            self.version += 1
+            data["version"] = self.version
+            self.snapshot = data
+
+    def get_snapshot(self, since_version=None):
+        # Returns the latest snapshot, or None if it has not changed since the given version
+        snapshot = self.snapshot
+        if snapshot is None or snapshot["version"] == since_version:
+            return None
+        return snapshot
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self.last_api_call_time = time.time()
+            self.fetching = True
+            try:
+                data = self.fetch()
+            except Exception as e:  # Keep the poller alive, the next poll may succeed
+                print(f"\033[91m[ERROR] Playback poll failed: {e!r}\033[0m")
+                data = None
+            finally:
+                self.fetching = False
+
+            if data is not None:
+                with self._publish_lock:
+                    self.version += 1
+                    data["version"] = self.version
+                    self.snapshot = data  # Single reference swap, safe to read from the UI thread
+
+            self._sleep(data)
+
+    def _sleep(self, data):
+        if self.scheduler is not None:
+            deadline = time.time() + self.scheduler.next_interval(data)
+        else:
+            deadline = self.last_api_call_time + self.interval
+        self.next_poll_time = deadline
+
+        while not self._stop_event.is_set():
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return
+            if self._wake_event.wait(remaining):
+                self._wake_event.clear()
+                if self._stop_event.is_set():
+                    return
+                delay = self.scheduler.notify_local_action() if self.scheduler is not None else 0
+                deadline = min(deadline, time.time() + delay)
+                self.next_poll_time = deadline
+
+
+def fetch_playback_snapshot(spotify_client, trace_recorder=None):  # PlaybackPoller fetch for a SpotifyClient
+    request_start = time.monotonic()
+    spotify_playing, spotify_state = spotify_client.get_playback()  # Both requests are sent concurrently
+    request_end = time.monotonic()
+    # print(f"\033[90m{spotify_playing}\033[0m")
+
+    if spotify_playing is None and spotify_state is None:
+        return None
+    if trace_recorder is not None:  # Replayed by core.replay
+        trace_recorder.record("playback", {
+            "request_start": trace_recorder.relative(request_start),
+            "request_end": trace_recorder.relative(request_end),
+            "spotify_playing": spotify_playing,
+            "spotify_state": spotify_state
+        }, request_end)
+    return {
+        "api_call_timestamp": time.time(),
+        "request_start": request_start,  # Monotonic, the round trip anchors the progress for the playback clock
+        "request_end": request_end,
+        "spotify_playing": spotify_playing,
+        "spotify_state": spotify_state
+    }
+
+
+def snapshot_from_media_info(info, previous=None):
+    # Playback snapshot shaped like a poll from a media session change (media info, see media/__init__.py).
+    # Returns None if the session cannot stand in for a poll: nothing playing or no Spotify track URI.
+    # The previous snapshot's track object is kept while the track is the same, so a following poll does not look like a song change.
+    if info is None or info["uri"] is None or not info["uri"].startswith("spotify:track:") or info["duration_ms"] is None:
+        return None
+    previous_playing = previous["spotify_playing"] if previous is not None else None
+    previous_item = previous_playing.get("item") if previous_playing else None
+    same_track = previous_item is not None and previous_item["uri"] == info["uri"]
+    if same_track:
+        item = previous_item
+    else:
+        item = {
+            "name": info["title"],
+            "artists": [{"name": artist} for artist in info["artists"]],
+            "album": {"name": info["album_title"], "images": [{"url": info["art_url"]}]},
+            "duration_ms": info["duration_ms"],
+            "external_urls": {"spotify": info["url"]},
+            "uri": info["uri"]
+        }
+
+    progress = info["position_ms"]
+    if progress is None:  # Position not reported, carried over from the previous snapshot
+        if same_track:
+            progress = previous_playing["progress_ms"]
+            if previous_playing["is_playing"]:
+                progress += round((info["event_time"] - previous["request_end"]) * 1000)
+            progress = min(progress, item["duration_ms"])
+        else:
+            progress = 0
+
+    spotify_state = dict(previous["spotify_state"]) if previous is not None and previous["spotify_state"] else {"shuffle_state": False, "repeat_state": "off"}
+    if info["shuffle"] is not None:
+        spotify_state["shuffle_state"] = info["shuffle"]
+    if info["repeat"] is not None:
+        spotify_state["repeat_state"] = info["repeat"]
+    return {
+        "api_call_timestamp": time.time(),
+        "request_start": info["event_time"],  # Read locally, no round trip to compensate
+        "request_end": info["event_time"],
+        "spotify_playing": {"item": item, "is_playing": info["playing"], "progress_ms": progress},
+        "spotify_state": spotify_state,
+        "source": "media_session"
+    }
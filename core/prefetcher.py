@@ -0,0 +1,97 @@
+import concurrent.futures
+import json
+import threading
+import time
+
+import requests
+
+
+class LyricsPrefetcher(object):
+    # Resolves lyrics for the next tracks in the Spotify queue in the background,
+    # so the song change path is a cache lookup instead of a Musixmatch request.
+    def __init__(self, spotify_client, prefetch_track, depth=3, workers=2, min_request_interval=1.5):
+        self.spotify_client = spotify_client
+        self.prefetch_track = prefetch_track  # Callable taking a queue track item, fetches and caches its lyrics, returns True if they were cached
+        self.depth = depth  # Number of upcoming tracks to prefetch
+        self.min_request_interval = min_request_interval  # Seconds between prefetch requests, respects Musixmatch rate limits
+
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="LyricsPrefetcher")
+        # Prefetches sleep to space their requests, queue reads get their own worker so they never wait behind them
+        self.queue_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="LyricsPrefetcherQueue")
+        self.generation = 0  # Incremented when the queue changes, older jobs cancel themselves
+        self.queue_uris = []
+        self.prefetched_uris = set()
+        self.futures = []
+
+        self.counters = {"prefetched": 0, "failed": 0, "cancelled": 0, "hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+        self._last_request_time = 0
+
+    def schedule(self):
+        # Re-read the queue in the background and prefetch anything new
+        self.queue_executor.submit(self._refresh_queue)
+
+    def record_song_change(self, uri):
+        # Called on every song change to measure the prefetch hit rate
+        with self._lock:
+            if uri in self.prefetched_uris:
+                self.counters["hits"] += 1
+            else:
+                self.counters["misses"] += 1
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {**self.counters, "hit_rate": self.counters["hits"] / lookups if lookups else None}
+
+    def close(self):
+        self.generation += 1
+        self.queue_executor.shutdown(wait=False, cancel_futures=True)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _refresh_queue(self):
+        try:
+            response = self.spotify_client.get("/me/player/queue")
+            queue = response.json()["queue"]
+        except (requests.exceptions.RequestException, json.decoder.JSONDecodeError, KeyError, TypeError) as e:
+            print(f"\033[91m[ERROR] Failed to read Spotify queue: {e!r}\033[0m")
+            return
+
+        tracks = [track for track in queue if track and track.get("type") == "track"][:self.depth]  # Episodes have no lyrics
+        uris = [track["uri"] for track in tracks]
+        if uris == self.queue_uris:
+            return
+
+        with self._lock:
+            self.queue_uris = uris
+            self.generation += 1
+            generation = self.generation
+            for future in self.futures:
+                if future.cancel():
+                    self.counters["cancelled"] += 1
+            self.futures = [self.executor.submit(self._prefetch, track, generation) for track in tracks if track["uri"] not in self.prefetched_uris]
+
+    def _prefetch(self, track, generation):
+        with self._lock:
+            wait_time = self._last_request_time + self.min_request_interval - time.time()
+            self._last_request_time = max(time.time(), self._last_request_time + self.min_request_interval)
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+        if generation != self.generation:  # Queue changed while waiting
+            with self._lock:
+                self.counters["cancelled"] += 1
+            return
+
+        print(f"Prefetching lyrics: {track['name']}")
+        try:
+            cached = self.prefetch_track(track)
+        except Exception as e:  # A failed prefetch only costs a normal lookup on song change
+            print(f"\033[91m[ERROR] Lyric prefetch failed: {e!r}\033[0m")
+            cached = False
+        with self._lock:
+            if cached:
+                self.prefetched_uris.add(track["uri"])
+                self.counters["prefetched"] += 1
+            else:  # Tried again with the next queue change
+                self.counters["failed"] += 1
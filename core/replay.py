@@ -0,0 +1,220 @@
+# Replays a trace recorded with "python main.py --record-trace trace.jsonl.gz" headless on a virtual clock.
+# The recorded polls go through the same core steps as in updater() (core.playback_frame): snapshot versions, the command
+# dispatcher overlay, PlaybackClock, song changes by URI, lyrics through a LyricsCache and a JobRunner, LyricsTimeline lines,
+# FrameScheduler deadlines and the highlight tweens, with lyrics built from the recorded Musixmatch responses.
+# Lyric lookups take no virtual time: the replay waits for a lookup job, and the next frame takes its result.
+# Every track change and lyric line change is logged with its virtual time, so two runs over the same trace can be
+# diffed, e.g. before and after a timing change.
+# Run from the repository root: python -m core.replay trace.jsonl.gz [--output replay.jsonl] [--speed 0]
+import argparse
+import collections
+import contextlib
+import io
+import json
+import time
+
+from .command_dispatcher import CommandDispatcher
+from .frame_scheduler import FrameScheduler
+from .job_runner import JobRunner
+from .lyrics_cache import LyricsCache
+from .lyrics_timeline import LyricsTimeline
+from .musixmatch import build_lyrics, decode_lyrics, encode_lyrics, read_musixmatch_response
+from .playback_clock import PlaybackClock
+from .playback_frame import LyricsLoader, find_lyric_line, is_song_change, read_snapshot
+from .playback_trace import TracePoller, VirtualClock, load_trace
+from .song import create_song
+from .tween import TweenEngine, ease_in_out
+
+
+class ReplaySession(object):
+    def __init__(self, path, frame_interval=0.015, idle_interval=0.5, animation_duration=0.2, tail=10.0):
+        header, events = load_trace(path)
+        self.clock = VirtualClock(header["epoch"])
+        self.poller = TracePoller(events, self.clock)
+        self.playback_clock = PlaybackClock(clock=self.clock.monotonic)
+        self.frame_scheduler = FrameScheduler(frame_interval, idle_interval, clock=self.clock.monotonic)
+        self.tween_engine = TweenEngine(self.clock.monotonic)
+        self.animation_duration = animation_duration
+        self.tail = tail  # Seconds replayed after the last poll
+
+        self.command_dispatcher = CommandDispatcher(lambda command, value: False, clock=self.clock.monotonic)  # Traces hold no clicks, polls pass through its overlay
+        self.lyrics_cache = LyricsCache(":memory:", encode=encode_lyrics, decode=decode_lyrics)
+        self.lyrics_job_runner = JobRunner("ReplayLyricsJob", workers=1)
+        self.lyrics_loader = LyricsLoader(self.lyrics_cache, self.lyrics_job_runner, self.fetch_recorded_lyrics)
+
+        self.musixmatch_responses = collections.defaultdict(collections.deque)  # Track URI: recorded responses in order
+        for event in events:
+            if event["kind"] == "musixmatch":
+                self.musixmatch_responses[event["uri"]].append(event["response"])
+        self.replayed_last_response = set()  # Track URIs whose last recorded response was used, it is reused from then on
+
+        self.last_snapshot_version = None
+        self.track_info = None
+        self.previous_track_info = None
+        self.playing = False
+        self.lyrics = None
+        self.lyrics_timeline = None
+        self.lyrics_retry_pending = False
+        self.selected_lyric_line = None
+        self.log = []  # Track and lyric line changes: {"t": trace time, "event": ..., ...}
+        self.frames = 0
+        self.elapsed = 0  # Wall time of the last run() in seconds
+
+    def run(self, speed=0):
+        # speed: Multiple of real time, 0 replays as fast as possible. Returns the log.
+        start_time = time.perf_counter()
+        end_time = self.poller.end_time + self.tail
+        while self.clock.monotonic() <= end_time:
+            self.poller.publish()
+            delay = self.frame() / 1000
+            if speed:
+                time.sleep(delay / speed)
+            self.clock.advance(max(delay, 0.001))  # A deadline in the past still moves the clock
+        self.elapsed = time.perf_counter() - start_time
+        return self.log
+
+    def close(self):
+        self.lyrics_job_runner.close()
+        self.command_dispatcher.close()
+        self.lyrics_cache.close()
+
+    def frame(self):  # One updater() run, returns the delay in ms until the next one
+        self.frames += 1
+        frame_scheduler = self.frame_scheduler
+        frame_scheduler.begin_frame()
+
+        if self.playing and self.track_info is not None:
+            track_progress = self.playback_clock.get_progress()
+            frame_scheduler.request_in((1000 - track_progress % 1000) / 1000, "progress")
+
+        if self.playing and self.track_info is not None and self.lyrics_timeline is not None:
+            self.update_synced_lyrics(self.playback_clock.get_lyrics_progress())
+        if self.tween_engine.step():
+            frame_scheduler.request_frame("animation")
+
+        api_data = self.poller.get_snapshot(self.last_snapshot_version)
+        if api_data is not None:
+            self.last_snapshot_version = api_data["version"]
+            self.consume_snapshot(api_data)
+        if self.lyrics_retry_pending and self.track_info is not None:  # Like the updater, retried without waiting for a new snapshot
+            self.load_lyrics()
+
+        lookup_result = self.lyrics_loader.get_result(self.track_info["uri"] if self.track_info is not None else None)
+        if lookup_result is not None:
+            self.show_lyrics(*lookup_result)
+        if self.lyrics_loader.is_running():
+            frame_scheduler.request_in(0.05, "background")
+        else:
+            frame_scheduler.request_in(max(self.poller.next_poll_time - self.clock.time(), 0.05), "poll")
+        return frame_scheduler.next_delay_ms()
+
+    def consume_snapshot(self, api_data):
+        try:
+            self.track_info, playback_state = read_snapshot(api_data, self.playback_clock, self.command_dispatcher)
+            self.playing = playback_state["playing"]
+        except (TypeError, KeyError):  # Advertisement or not playing
+            if self.track_info is not None or self.previous_track_info is not None:
+                self.write_log("not_playing")
+            self.track_info = None
+            self.previous_track_info = None
+            self.playing = False
+            self.lyrics_loader.cancel()
+            self.reset_lyrics()
+            return
+
+        if is_song_change(self.track_info, self.previous_track_info):
+            self.previous_track_info = self.track_info.copy()
+            self.load_lyrics()
+
+    def load_lyrics(self):
+        self.lyrics_retry_pending = False
+        self.reset_lyrics()
+        song = create_song(self.track_info)
+        cached, lyrics = self.lyrics_loader.load(song)
+        if cached:
+            song.lookup_status = "cached"
+            self.show_lyrics(song, lyrics)
+        else:
+            self.lyrics_job_runner.wait()  # The next frame takes the result
+
+    def fetch_recorded_lyrics(self, song):
+        # LyricsLoader fetch on the job worker: the responses recorded for the track in order, the last one is reused for later plays
+        responses = self.musixmatch_responses.get(song.uri)
+        if not responses:
+            song.lookup_status = "not_recorded"
+            return None
+        if len(responses) > 1:
+            response = responses.popleft()
+        else:
+            response = responses[0]
+            self.replayed_last_response.add(song.uri)
+        with contextlib.redirect_stdout(io.StringIO()):  # Lookup progress messages
+            body = read_musixmatch_response(song, response)
+            return build_lyrics(song, body) if body is not None else None
+
+    def show_lyrics(self, song, lyrics):  # song is None if the lookup failed
+        self.lyrics = lyrics
+        # Rate limited, retried with the next recorded response
+        self.lyrics_retry_pending = song is not None and song.lookup_status == "timed_out" and song.uri not in self.replayed_last_response
+        if self.lyrics is not None and self.lyrics["synced_lyrics"] is not None:
+            self.lyrics_timeline = LyricsTimeline(self.lyrics["synced_lyrics"])
+            lyrics_type = "synced"
+        elif self.lyrics is not None and self.lyrics["lyrics"] is not None:
+            lyrics_type = "unsynced"
+        else:
+            lyrics_type = "none"
+        self.write_log("track", uri=self.track_info["uri"], lookup_status=song.lookup_status if song is not None else "error", lyrics=lyrics_type)
+
+    def update_synced_lyrics(self, duration):  # Line lookup and highlight animation of main.update_synced_lyrics()
+        index = find_lyric_line(self.lyrics_timeline, duration, self.frame_scheduler)
+        if index is not None and index != self.selected_lyric_line:
+            # Line positions stand in for the canvas geometry, only the animation timing matters here
+            start = (self.selected_lyric_line if self.selected_lyric_line is not None else index,)
+            self.tween_engine.start("rectangle", start, (index,), self.animation_duration, ease_in_out, lambda values: None)
+            self.write_log("line", index=index, progress=round(duration))
+            self.selected_lyric_line = index
+
+    def reset_lyrics(self):
+        self.lyrics = None
+        self.lyrics_timeline = None
+        self.selected_lyric_line = None
+        self.tween_engine.clear()
+
+    def write_log(self, event, **data):
+        self.log.append({"t": round(self.clock.monotonic(), 3), "event": event, **data})
+
+    def get_stats(self):
+        replayed = self.clock.monotonic()
+        return {
+            "replayed_seconds": round(replayed, 1),
+            "wall_seconds": round(self.elapsed, 3),
+            "speedup": round(replayed / self.elapsed) if self.elapsed else None,
+            "frames": self.frames,
+            "tracks": sum(entry["event"] == "track" for entry in self.log),
+            "line_changes": sum(entry["event"] == "line" for entry in self.log),
+            "wakeups": self.frame_scheduler.get_stats()["reasons"],
+            "playback_clock": self.playback_clock.get_stats()
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded Spotify Surface trace on a virtual clock")
+    parser.add_argument("trace", help="Trace file recorded with main.py --record-trace")
+    parser.add_argument("--output", help="Write the track and lyric line log as JSON lines")
+    parser.add_argument("--speed", type=float, default=0, help="Multiple of real time, 0 replays as fast as possible")
+    arguments = parser.parse_args()
+
+    session = ReplaySession(arguments.trace)
+    log = session.run(arguments.speed)
+    session.close()
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            file.writelines(json.dumps(entry) + "\n" for entry in log)
+    else:
+        for entry in log:
+            print(json.dumps(entry))
+    print(f"Replay stats: {session.get_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import collections
+import email.utils
+import random
+import threading
+import time
+
+import requests
+
+
+class RequestRejected(requests.exceptions.RequestException):
+    # Raised instead of sending a request: the endpoint's circuit breaker is open or the background budget is spent
+    def __init__(self, endpoint, reason, retry_in=None):
+        super().__init__(f"{endpoint}: {reason}" + (f", retry in {retry_in:.1f} s" if retry_in is not None else ""))
+        self.endpoint = endpoint
+        self.reason = reason
+        self.retry_in = retry_in
+
+
+def parse_retry_after(value):  # Retry-After header, seconds or an HTTP date, to seconds
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker(object):
+    # closed: requests pass. open: requests are rejected until the cooldown ends. half_open: one probe request passes,
+    # its success closes the breaker, its failure opens it again with a doubled cooldown.
+    def __init__(self, name, failure_threshold=3, base_delay=1.0, max_delay=300.0, jitter=0.2, on_transition=None):
+        self.name = name
+        self.failure_threshold = failure_threshold  # Consecutive failures that open the breaker
+        self.base_delay = base_delay  # Seconds of the first cooldown
+        self.max_delay = max_delay
+        self.jitter = jitter  # Random share added to every cooldown, spreads retries
+        self.on_transition = on_transition  # Called with (name, old state, new state)
+        self.state = "closed"
+        self.failures = 0  # Consecutive failures
+        self.opened = 0  # Consecutive openings, doubles the cooldown
+        self.open_until = 0  # Monotonic time the cooldown ends
+        self.probing = False
+
+    def allow(self, now):
+        if self.state == "open" and now >= self.open_until:
+            self._transition("half_open")
+        if self.state == "closed":
+            return True
+        if self.state == "half_open" and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def retry_in(self, now):  # Seconds until a request may pass, 0 if it may pass now
+        if self.state == "open":
+            return max(self.open_until - now, 0)
+        if self.state == "half_open" and self.probing:
+            return self.base_delay
+        return 0
+
+    def record_success(self):
+        self.failures = 0
+        self.opened = 0
+        self.probing = False
+        if self.state != "closed":
+            self._transition("closed")
+
+    def record_failure(self, now, retry_after=None):
+        self.failures += 1
+        self.probing = False
+        if retry_after is None and self.state == "closed" and self.failures < self.failure_threshold:
+            return
+        # Retry-After from the server wins over the own backoff
+        delay = min(self.base_delay * 2 ** self.opened, self.max_delay)
+        delay = retry_after if retry_after is not None else delay * (1 + random.uniform(0, self.jitter))
+        self.opened += 1
+        self.open_until = now + delay
+        if self.state != "open":
+            self._transition("open")
+
+    def _transition(self, state):
+        previous_state, self.state = self.state, state
+        if self.on_transition is not None:
+            self.on_transition(self.name, previous_state, state)
+
+
+class RequestPolicy(object):
+    # Shared request layer for Spotify and Musixmatch: per-endpoint circuit breakers, Retry-After, jittered exponential
+    # backoff between retries, and a budget that lets user-initiated requests preempt background ones.
+    # Background requests wait while a user request is in flight and are limited to background_rate per minute.
+    def __init__(self, background_rate=120, background_wait=2.0, clock=time.monotonic):
+        self.background_rate = background_rate  # Background requests per minute
+        self.background_wait = background_wait  # Longest wait in seconds for user requests to finish
+        self.clock = clock
+        self.breakers = {}  # Endpoint: CircuitBreaker
+        self.breaker_settings = {}  # Endpoint prefix: CircuitBreaker keyword arguments
+        self.transitions = collections.Counter()  # (endpoint, old state, new state): count
+        self.recent_transitions = collections.deque(maxlen=100)  # (time, endpoint, old state, new state)
+        self.counters = {"requests": 0, "failures": 0, "retries": 0, "rejected": 0, "preempted": 0}
+        self.user_in_flight = 0
+        self.background_times = collections.deque()  # Start times of the background requests in the last minute
+        self._condition = threading.Condition()
+
+    def configure(self, prefix, **settings):
+        # CircuitBreaker settings for endpoints starting with prefix, e.g. configure("musixmatch", base_delay=10)
+        self.breaker_settings[prefix] = settings
+
+    def get_breaker(self, endpoint):
+        with self._condition:
+            breaker = self.breakers.get(endpoint)
+            if breaker is None:
+                settings = next((settings for prefix, settings in self.breaker_settings.items() if endpoint.startswith(prefix)), {})
+                breaker = self.breakers[endpoint] = CircuitBreaker(endpoint, on_transition=self._record_transition, **settings)
+            return breaker
+
+    def get_open_breakers(self):  # {endpoint: seconds until retry} of every breaker that is not closed
+        now = self.clock()
+        with self._condition:
+            return {endpoint: breaker.retry_in(now) for endpoint, breaker in self.breakers.items() if breaker.state != "closed"}
+
+    def retry_in(self, endpoint):
+        breaker = self.get_breaker(endpoint)
+        with self._condition:
+            return breaker.retry_in(self.clock())
+
+    def execute(self, endpoint, send, priority="background", retries=0, max_retry_delay=5.0, classify=None):
+        # send() performs the request and returns the response. classify(response) returns (failed, retry_after),
+        # by default 429 and 5xx responses are failures. Failed attempts are retried with backoff while the wait is
+        # at most max_retry_delay seconds. Raises RequestRejected if the request is not sent.
+        breaker = self.get_breaker(endpoint)
+        attempt = 0
+        while True:
+            with self._condition:
+                if not breaker.allow(self.clock()):
+                    self.counters["rejected"] += 1
+                    raise RequestRejected(endpoint, "circuit open", breaker.retry_in(self.clock()))
+            try:
+                self._acquire(endpoint, priority)
+            except RequestRejected:
+                with self._condition:
+                    breaker.probing = False  # The probe was not sent
+                raise
+            self.counters["requests"] += 1
+            error = None
+            try:
+                response = send()
+            except requests.exceptions.RequestException as e:
+                failed, retry_after, response, error = True, None, None, e
+            except Exception:  # Any other error still ends a probe, or the half open breaker would reject forever
+                self._record_failure(breaker, None)
+                raise
+            else:
+                failed, retry_after = (classify or self.classify)(response)
+            finally:
+                self._release(priority)
+
+            if not failed:
+                with self._condition:
+                    breaker.record_success()
+                return response
+
+            self._record_failure(breaker, retry_after)
+            delay = retry_after if retry_after is not None else 0.25 * 2 ** attempt * (1 + random.random())
+            if attempt >= retries or delay > max_retry_delay:
+                if error is not None:
+                    raise error
+                return response
+            attempt += 1
+            self.counters["retries"] += 1
+            time.sleep(delay)
+
+    @staticmethod
+    def classify(response):
+        if response.status_code == 429 or response.status_code >= 500:
+            return True, parse_retry_after(response.headers.get("Retry-After"))
+        return False, None
+
+    def get_stats(self):
+        with self._condition:
+            return {
+                **self.counters,
+                "breakers": {endpoint: breaker.state for endpoint, breaker in self.breakers.items()},
+                "transitions": {" ".join(key): count for key, count in self.transitions.items()}
+            }
+
+    def _record_failure(self, breaker, retry_after):
+        with self._condition:
+            self.counters["failures"] += 1
+            breaker.record_failure(self.clock(), retry_after)
+
+    def _record_transition(self, endpoint, previous_state, state):  # Called with _condition held
+        print(f"Circuit breaker {endpoint}: {previous_state} -> {state}")
+        self.transitions[(endpoint, previous_state, state)] += 1
+        self.recent_transitions.append((time.time(), endpoint, previous_state, state))
+
+    def _acquire(self, endpoint, priority):
+        with self._condition:
+            if priority == "user":
+                self.user_in_flight += 1
+                return
+            if self.user_in_flight:
+                self.counters["preempted"] += 1
+                self._condition.wait_for(lambda: not self.user_in_flight, timeout=self.background_wait)
+            now = self.clock()
+            while self.background_times and self.background_times[0] < now - 60:
+                self.background_times.popleft()
+            if len(self.background_times) >= self.background_rate:
+                self.counters["rejected"] += 1
+                raise RequestRejected(endpoint, "background budget spent", self.background_times[0] + 60 - now)
+            self.background_times.append(now)
+
+    def _release(self, priority):
+        if priority != "user":
+            return
+        with self._condition:
+            self.user_in_flight -= 1
+            self._condition.notify_all()
@@ -0,0 +1,64 @@
+class Song(object):
+    def __init__(self, artist, title, album="", uri=""):
+        self.artist = artist
+        self.title = title
+        self.album = album
+        self.uri = uri
+        self.duration = 0
+        self.has_synced = False
+        self.has_unsynced = False
+        self.is_instrumental = False
+        self.lyrics = None
+        self.subtitles = None
+        self.coverart_url = None
+        self.lookup_status = None  # "found" / "not_found" / "restricted" / "timed_out" / "request_error" / "error", set by read_musixmatch_response
+        self.lookup_error = None  # Musixmatch response header if lookup_status is "request_error"
+
+    def __str__(self) -> str:
+        return f"{self.artist} - {self.title}"
+
+    def get_info(self):
+        return {
+            "coverart_url": self.coverart_url,
+            "title": self.title,
+            "artist": self.artist,
+            "album": self.album,
+            "duration": self.duration,
+            "has_synced": self.has_synced,
+            "has_unsynced": self.has_unsynced,
+            "is_instrumental": self.is_instrumental
+        }
+
+    def update_info(self, body):
+        meta = body["matcher.track.get"]["message"]["body"]
+        if not meta:
+            return
+        coverart_sizes = ["100x100", "350x350", "500x500", "800x800"]
+        coverart_urls = list(filter(None, [meta["track"][f"album_coverart_{size}"] for size in coverart_sizes]))
+        self.coverart_url = coverart_urls[-1] if coverart_urls else None
+        self.title = meta["track"]["track_name"]
+        self.artist = meta["track"]["artist_name"]
+        self.album = meta["track"]["album_name"]
+        self.duration = meta["track"]["track_length"] * 1000
+        self.has_synced = meta["track"]["has_subtitles"]
+        self.has_unsynced = meta["track"]["has_lyrics"]  # or meta["track"]["has_lyrics_crowd"]
+        self.is_instrumental = meta["track"]["instrumental"]
+
+
+def get_track_info(item):  # item: Spotify track object
+    return {
+        "track_name": item["name"],
+        "artists": [artist["name"] for artist in list(item["artists"])],
+        "artist_names": ", ".join(artist["name"] for artist in list(item["artists"])),
+        "album": item["album"]["name"],
+        "album_cover_link": item["album"]["images"][-1]["url"],
+        "duration_ms": item["duration_ms"],
+        "link": item["external_urls"]["spotify"],
+        "uri": item["uri"]
+    }
+
+
+def create_song(track_info):
+    song = Song(track_info["artist_names"], track_info["track_name"], track_info["album"], track_info["uri"])
+    song.duration = track_info["duration_ms"]
+    return song
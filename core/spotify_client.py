@@ -0,0 +1,173 @@
+import collections
+import concurrent.futures
+import contextlib
+import hashlib
+import json
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .request_policy import RequestPolicy, RequestRejected
+from .token_manager import TokenManager
+
+api_base_url = "https://api.spotify.com/v1"
+token_url = "https://accounts.spotify.com/api/token"
+
+
+class SpotifyClient(object):
+    # Spotify Web API client sharing one pooled keep-alive session between polling and the control buttons
+    def __init__(self, refresh_token, base64_token, pool_size=4, token_path=None, policy=None, base_url=api_base_url, timeout=(3.05, 10)):
+        self.refresh_token = refresh_token
+        self.base64_token = base64_token
+        self.base_url = base_url  # Web API base url, e.g. a local mock server
+        self.access_token = None
+        self.auth_headers = {}  # Built once per token and reused by every request
+        token_key = hashlib.sha256(f"{refresh_token}:{base64_token}".encode()).hexdigest()[:16]
+        self.tokens = TokenManager(self._request_token, token_path, key=token_key)  # Call tokens.start() to refresh in the background
+        self.policy = policy if policy is not None else RequestPolicy()  # Circuit breakers and request budget, may be shared
+        self.timeout = timeout  # Default (connect, read) timeout in seconds, a stalled connection must not stop the poller
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Accept": "application/json"})
+
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="SpotifyClient")
+
+        self.latencies = collections.defaultdict(lambda: collections.deque(maxlen=100))  # Endpoint: recent latencies in ms
+        self.first_latencies = {}  # Endpoint: latency in ms of the first request, includes the TCP+TLS handshake
+        self._latency_lock = threading.Lock()
+
+    def set_access_token(self, access_token):
+        self.access_token = access_token
+        self.auth_headers = {"Authorization": f"Bearer {access_token}"} if access_token is not None else {}
+
+    def warm_up(self, connections=2):
+        # Open the keep-alive connections in the background so the first poll and click skip the handshake
+        def open_connection(url):
+            with contextlib.suppress(requests.exceptions.RequestException):
+                self._timed("warm_up", self.session.head, url, timeout=5)
+
+        urls = [self.base_url] * connections + [token_url]
+        return [self.executor.submit(open_connection, url) for url in urls]
+
+    def request(self, method, endpoint, priority=None, **kwargs):
+        # endpoint is relative to the Web API base url, e.g. "/me/player/next"
+        # priority: "user" or "background", by default GET requests are background and everything else is user-initiated
+        # A 401 refreshes the token (once for all concurrent callers) and retries the request once.
+        # Raises RequestRejected while the endpoint's circuit breaker is open or no access token could be fetched.
+        if priority is None:
+            priority = "background" if method == "GET" else "user"
+        extra_headers = kwargs.pop("headers", {})
+        access_token = self.tokens.get_token()
+        if access_token is None:  # The refresh failed, an unauthenticated request would only come back as a 401
+            raise RequestRejected(f"{method} {endpoint}", "no access token")
+        response = self._send(method, endpoint, priority, access_token, extra_headers, kwargs)
+        if response.status_code == 401:
+            print(f"401 Unauthorized for {method} {endpoint}, refreshing token and retrying")
+            new_access_token = self.tokens.invalidate(access_token)
+            if new_access_token is not None:
+                response = self._send(method, endpoint, priority, new_access_token, extra_headers, kwargs)
+        return response
+
+    def get(self, endpoint, **kwargs):
+        return self.request("GET", endpoint, **kwargs)
+
+    def put(self, endpoint, **kwargs):
+        return self.request("PUT", endpoint, **kwargs)
+
+    def post(self, endpoint, **kwargs):
+        return self.request("POST", endpoint, **kwargs)
+
+    def get_playing(self):
+        response = None
+        try:
+            response = self.get("/me/player/currently-playing")
+            return response.json()
+        except requests.exceptions.ConnectionError:
+            print("\033[91m[ERROR] Connection Failed - Check internet connection\033[0m")
+            return None
+        except json.decoder.JSONDecodeError:
+            print(response)
+            print("\033[91m[ERROR] Spotify not open - Cannot retrieve playing data\033[0m")
+            return None
+        except RequestRejected as e:
+            print(f"\033[91m[ERROR] Request skipped - {e}\033[0m")
+            return None
+        except requests.exceptions.RequestException as e:  # E.g. a read timeout, must not end the poller thread
+            print(f"\033[91m[ERROR] Request failed - {e!r}\033[0m")
+            return None
+
+    def get_playback_state(self):
+        response = None
+        try:
+            response = self.get("/me/player")
+            return response.json()
+        except requests.exceptions.ConnectionError:
+            print("\033[91m[ERROR] Connection Failed - Check internet connection\033[0m")
+            return None
+        except json.decoder.JSONDecodeError:
+            print(response)
+            print("\033[91m[ERROR] Spotify not open - Cannot retrieve playback state\033[0m")
+            return None
+        except RequestRejected as e:
+            print(f"\033[91m[ERROR] Request skipped - {e}\033[0m")
+            return None
+        except requests.exceptions.RequestException as e:  # E.g. a read timeout, must not end the poller thread
+            print(f"\033[91m[ERROR] Request failed - {e!r}\033[0m")
+            return None
+
+    def get_playback(self):
+        # Issue both poll requests concurrently over the pooled connections
+        playing_future = self.executor.submit(self.get_playing)
+        state_future = self.executor.submit(self.get_playback_state)
+        return playing_future.result(), state_future.result()
+
+    def refresh_access_token(self):
+        # Refreshes now, waiting for a refresh that is already running. Returns None if the refresh failed.
+        return self.tokens.refresh()
+
+    def get_latency_stats(self):
+        # Endpoint: first, last and mean latency in ms. The gap between first and mean is the handshake saving.
+        with self._latency_lock:
+            return {
+                endpoint: {
+                    "count": len(samples),
+                    "first_ms": self.first_latencies.get(endpoint),
+                    "last_ms": samples[-1],
+                    "mean_ms": sum(samples) / len(samples)
+                }
+                for endpoint, samples in self.latencies.items() if samples
+            }
+
+    def close(self):
+        self.tokens.stop()
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+    def _send(self, method, endpoint, priority, access_token, extra_headers, kwargs):
+        if access_token != self.access_token:
+            self.set_access_token(access_token)
+        headers = {**self.auth_headers, **extra_headers}
+        kwargs.setdefault("timeout", self.timeout)
+        name = f"{method} {endpoint}"
+        return self.policy.execute(name, lambda: self._timed(name, self.session.request, method, self.base_url + endpoint, headers=headers, **kwargs), priority=priority)
+
+    def _request_token(self):  # Token endpoint call for the TokenManager, raises on failure
+        response = self.policy.execute("POST /api/token", lambda: self._timed("POST /api/token", self.session.post, token_url, data={"grant_type": "refresh_token", "refresh_token": self.refresh_token}, headers={"Authorization": f"Basic {self.base64_token}"}, timeout=10), priority="user", retries=2)
+        print("Posted request with response:")
+        print(f"\033[90mCode {response.status_code}: {response.reason}\033[0m")
+        response.raise_for_status()
+        return response.json()
+
+    def _timed(self, endpoint, function, *args, **kwargs):
+        start_time = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            latency = (time.perf_counter() - start_time) * 1000
+            with self._latency_lock:
+                self.first_latencies.setdefault(endpoint, latency)
+                self.latencies[endpoint].append(latency)
@@ -0,0 +1,50 @@
+import threading
+import time
+
+
+class StartupTrace(object):
+    # Timing of the startup phases. Phases on the main thread are consecutive: mark(phase) ends the phase that started
+    # at the previous mark. Background phases are timed with timed() and overlap them, event() records a milestone.
+    def __init__(self, start_time=None, clock=time.perf_counter):
+        self.clock = clock
+        self.start_time = start_time if start_time is not None else clock()  # clock() value the startup began at
+        self.last_mark = self.start_time
+        self.phases = []  # (phase, start, end, thread name), end is None for events
+        self.reported = False
+        self._lock = threading.Lock()
+
+    def mark(self, phase):
+        now = self.clock()
+        self._add(phase, self.last_mark, now)
+        self.last_mark = now
+
+    def event(self, name):
+        self._add(name, self.clock(), None)
+
+    def timed(self, phase, function, *args, **kwargs):  # Runs function and records it as a phase of the calling thread
+        start = self.clock()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self._add(phase, start, self.clock())
+
+    def get_phases(self):  # [{"phase", "start_ms", "duration_ms", "thread"}, ...] sorted by start
+        with self._lock:
+            phases = sorted(self.phases, key=lambda phase: phase[1])
+        return [{
+            "phase": name,
+            "start_ms": round((start - self.start_time) * 1000, 1),
+            "duration_ms": round((end - start) * 1000, 1) if end is not None else None,
+            "thread": thread_name
+        } for name, start, end, thread_name in phases]
+
+    def report(self):
+        print(f"{'phase':<24} {'start ms':>9} {'duration ms':>12}  thread")
+        for phase in self.get_phases():
+            duration = f"{phase['duration_ms']:>12.1f}" if phase["duration_ms"] is not None else f"{'-':>12}"
+            print(f"{phase['phase']:<24} {phase['start_ms']:>9.1f} {duration}  {phase['thread']}")
+        self.reported = True
+
+    def _add(self, name, start, end):
+        with self._lock:
+            self.phases.append((name, start, end, threading.current_thread().name))
@@ -0,0 +1,120 @@
+import contextlib
+import json
+import os
+import threading
+import time
+
+
+class TokenManager(object):
+    # Spotify access token refreshed in the background ahead of its expiry.
+    # The token and its expiry are persisted, so a restart within the validity window needs no refresh.
+    # Concurrent refreshes are single-flighted: callers arriving while a refresh is running wait for its result.
+    def __init__(self, fetch, path=None, key=None, refresh_margin=300, retry_delay=10):
+        self.fetch = fetch  # Callable returning the token endpoint response: {"access_token": ..., "expires_in": seconds}
+        self.path = path  # JSON file persisting the token, readable by the owner only. None to keep it in memory only
+        self.key = key  # Identifies the credentials, a saved token of other credentials is ignored
+        self.refresh_margin = refresh_margin  # Seconds before expiry to refresh in the background
+        self.retry_delay = retry_delay  # Seconds between background attempts after a failed refresh
+        self.access_token = None
+        self.expires_at = 0  # Epoch time
+        self.counters = {"refreshes": 0, "failures": 0, "waits": 0, "loaded": 0, "invalidations": 0}
+        self._lock = threading.Lock()
+        self._in_flight = None  # Event of the running refresh
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._load()
+
+    def is_valid(self, margin=0):
+        return self.access_token is not None and time.time() < self.expires_at - margin
+
+    def get_token(self):
+        # Returns a valid token without waiting, only refreshes in the calling thread if none exists
+        if self.is_valid():
+            return self.access_token
+        return self.refresh()
+
+    def invalidate(self, access_token):
+        # A request with access_token was rejected (401). Returns a fresh token, refreshing once for all callers.
+        with self._lock:
+            if access_token == self.access_token:
+                self.expires_at = 0
+                self.counters["invalidations"] += 1
+        return self.get_token()
+
+    def refresh(self):
+        with self._lock:
+            event = self._in_flight
+            owner = event is None
+            if owner:
+                event = self._in_flight = threading.Event()
+
+        if not owner:
+            self.counters["waits"] += 1
+            event.wait()
+            return self.access_token if self.is_valid() else None
+
+        try:
+            print("Refreshing spotify token...")
+            response = self.fetch()
+            access_token = response["access_token"]
+            expires_at = time.time() + response.get("expires_in", 3600)
+            with self._lock:
+                self.access_token = access_token
+                self.expires_at = expires_at
+            self.counters["refreshes"] += 1
+            print("Spotify token refreshed")
+            self._save()
+            return access_token
+        except Exception as e:  # Connection, HTTP or JSON error, the caller or the background thread retries later
+            self.counters["failures"] += 1
+            print(f"\033[91m[ERROR] Spotify token refresh failed: {e!r}\033[0m")
+            return None
+        finally:
+            with self._lock:
+                self._in_flight = None
+            event.set()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="TokenManager", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def get_stats(self):
+        return {**self.counters, "expires_in": round(self.expires_at - time.time()) if self.access_token else None}
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            if not self.is_valid(self.refresh_margin) and self.refresh() is None:
+                delay = self.retry_delay
+            else:
+                delay = max(self.expires_at - self.refresh_margin - time.time(), 1)
+            self._stop_event.wait(delay)
+
+    def _load(self):
+        if self.path is None or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as file:
+                data = json.load(file)
+            if data.get("key") != self.key:
+                return
+            self.access_token = data["access_token"]
+            self.expires_at = data["expires_at"]
+            self.counters["loaded"] += 1
+        except (OSError, ValueError, KeyError) as e:
+            print(f"\033[91m[ERROR] Ignoring saved spotify token: {e!r}\033[0m")
+
+    def _save(self):
+        if self.path is None:
+            return
+        temporary_path = f"{self.path}.tmp"
+        with contextlib.suppress(OSError):
+            with os.fdopen(os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as file:  # Live bearer token
+                os.chmod(temporary_path, 0o600)  # The mode of os.open only applies to a new file
+                json.dump({"access_token": self.access_token, "expires_at": self.expires_at, "key": self.key}, file)
+            os.replace(temporary_path, self.path)  # Atomic, a crash never leaves a partial file
@@ -0,0 +1,103 @@
+import bisect
+import time
+
+
+def linear(progress):
+    return progress
+
+
+def ease_in_out(progress):  # Cubic
+    if progress < 0.5:
+        return 4 * progress ** 3
+    return 1 - (-2 * progress + 2) ** 3 / 2
+
+
+class AccelerationCurve(object):
+    # Easing curve from a table of {percent completed: percent of the distance moved in that step},
+    # e.g. {0: 4, 10: 6, ...}. Movement within a step is linear. Values are normalized, they do not need to add up to 100.
+    def __init__(self, table):
+        self.steps = sorted(table)
+        total = sum(table.values())
+        self.positions = [0]  # Eased position at the start of every step, and 1 at the end
+        for step in self.steps:
+            self.positions.append(self.positions[-1] + table[step] / total)
+        self.bounds = [step / 100 for step in self.steps] + [1]  # Progress at the start of every step, and 1 at the end
+
+    def __call__(self, progress):
+        if progress <= 0:
+            return 0
+        if progress >= 1:
+            return 1
+        index = bisect.bisect_right(self.bounds, progress) - 1
+        step_progress = (progress - self.bounds[index]) / (self.bounds[index + 1] - self.bounds[index])
+        return self.positions[index] + step_progress * (self.positions[index + 1] - self.positions[index])
+
+
+class Tween(object):
+    def __init__(self, start, end, duration, easing, on_update, on_complete, start_time):
+        self.start = tuple(start)
+        self.end = tuple(end)
+        self.duration = duration
+        self.easing = easing
+        self.on_update = on_update  # Called with the interpolated values every step
+        self.on_complete = on_complete  # Called once after the final values were applied
+        self.start_time = start_time
+
+    def values_at(self, now):
+        progress = (now - self.start_time) / self.duration if self.duration > 0 else 1
+        eased = self.easing(min(max(progress, 0), 1))
+        return tuple(start + (end - start) * eased for start, end in zip(self.start, self.end)), progress >= 1
+
+
+class TweenEngine(object):
+    # Runs any number of time-based tweens, each identified by a key. Progress comes from the clock, not from the number
+    # of frames, so animations take the same time at any frame rate. Values are interpolated between the start and end
+    # values given to start(), nothing is read back from the widgets.
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.tweens = {}  # Key: Tween
+        self.counters = {"started": 0, "completed": 0, "cancelled": 0, "steps": 0}
+
+    @property
+    def running(self):
+        return bool(self.tweens)
+
+    def start(self, key, start, end, duration, easing=linear, on_update=None, on_complete=None):
+        # Replaces a running tween with the same key, its on_complete is not called
+        if key in self.tweens:
+            self.counters["cancelled"] += 1
+        self.tweens[key] = Tween(start, end, duration, easing, on_update, on_complete, self.clock())
+        self.counters["started"] += 1
+
+    def cancel(self, key):
+        if self.tweens.pop(key, None) is not None:
+            self.counters["cancelled"] += 1
+
+    def clear(self):
+        self.counters["cancelled"] += len(self.tweens)
+        self.tweens.clear()
+
+    def is_running(self, key):
+        return key in self.tweens
+
+    def get_end(self, key):  # End values of a running tween, None if not running
+        tween = self.tweens.get(key)
+        return tween.end if tween is not None else None
+
+    def step(self):
+        # Applies the current values of every tween, returns True while any tween is still running
+        now = self.clock()
+        for key, tween in list(self.tweens.items()):
+            values, finished = tween.values_at(now)
+            self.counters["steps"] += 1
+            if tween.on_update is not None:
+                tween.on_update(values)
+            if finished and self.tweens.get(key) is tween:  # on_update may have replaced or cancelled the tween
+                del self.tweens[key]
+                self.counters["completed"] += 1
+                if tween.on_complete is not None:
+                    tween.on_complete()
+        return self.running
+
+    def get_stats(self):
+        return dict(self.counters)
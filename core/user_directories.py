@@ -0,0 +1,15 @@
+import os
+import sys
+
+
+def get_cache_directory(app_name="spotify-surface"):
+    # Per-user cache directory, created on first use. Keeps the lyrics cache and the saved token out of the checkout.
+    if sys.platform == "win32":
+        base = os.getenv("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    directory = os.path.join(base, app_name)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    return directory
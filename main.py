@@ -1,311 +1,50 @@
-import asyncio
+import time
+
+startup_time = time.perf_counter()  # Before the other imports, so --startup-trace includes them
+
+import argparse
+import concurrent.futures
 import contextlib
-import datetime
+import functools
 import json
 import math
-import multiprocessing
 import os
-import time
 import tkinter as tk
 import tkinter.font as tk_font
-import urllib.error
-import urllib.parse
-import urllib.request
 from tkinter import ttk
 
 import requests
 import sv_ttk
-import win32api
-import win32con
-from PIL import Image, ImageTk
 from dotenv import load_dotenv
 from screeninfo import get_monitors
-from winsdk.windows.media.control import GlobalSystemMediaTransportControlsSessionManager as MediaManager
-
-
-def get_lyrics(song):
-    print(f"Searching song: {song}")
-    try:
-        body = find_lyrics(song)
-    except KeyError:  # Unknown cause. API returns invalid?
-        body = None
-    if body is None:
-        print("Failed to find song")
-        return None
-    song.update_info(body)
-    print("Song found")
-
-    print(f"Searching lyrics: {song}")
-    lyrics = get_unsynced_lyrics(song, body)
-    if lyrics is None:
-        print("Failed to find lyrics")
-
-    synced_lyrics = get_synced_lyrics(song, body)
-    if synced_lyrics is None:
-        print("Failed to find synced lyrics")
-
-    return {
-        "synced_lyrics": synced_lyrics,
-        "lyrics": lyrics,
-        "song_info": song.get_info()
-    }
 
-
-def find_lyrics(song):
-    global lyric_fetch_attempt, schedule_retry_lyric_fetch_time
-
-    duration = song.duration / 1000 if song.duration else ""
-    params = {
-        "q_album": song.album,
-        "q_artist": song.artist,
-        "q_artists": song.artist,
-        "q_track": song.title,
-        "track_spotify_id": song.uri,
-        "q_duration": duration,
-        "f_subtitle_length": math.floor(duration) if duration else "",
-        "usertoken": musixmatch_token,
-    }
-
-    req = urllib.request.Request(musixmatch_base_url + urllib.parse.urlencode(params, quote_via=urllib.parse.quote), headers=musixmatch_headers)
-    try:
-        response = urllib.request.urlopen(req).read()
-    except (urllib.error.HTTPError, urllib.error.URLError, ConnectionResetError) as e:
-        print(repr(e))
-        return
-
-    r = json.loads(response.decode())
-    if r["message"]["header"]["status_code"] != 200 and r["message"]["header"].get("hint") == "renew":
-        print("Invalid token")
-        return
-    body = r["message"]["body"]["macro_calls"]
-
-    if body["matcher.track.get"]["message"]["header"]["status_code"] != 200:
-        if body["matcher.track.get"]["message"]["header"]["status_code"] == 404:
-            print("Song not found.")
-        elif body["matcher.track.get"]["message"]["header"]["status_code"] == 401:
-            print("Timed out. Change the token or wait a few minutes before trying again.")
-            create_notification(f"Timed out. Retrying in {lyric_fail_reattempt_time} seconds...", "#f95353")
-            schedule_retry_lyric_fetch_time = time.time() + lyric_fail_reattempt_time
-            if lyric_fetch_attempt is None:
-                lyric_fetch_attempt = 2  # Next fetch attempt number
-            else:
-                lyric_fetch_attempt += 1
-            root.after(3000, clear_notification)
-        else:
-            print(f"Requested error: {body['matcher.track.get']['message']['header']}")
-            create_notification(f"{body['matcher.track.get']['message']['header']}", "#f95353")
-            lyric_fetch_attempt = None
-            root.after(3000, clear_notification)
-        return
-
-    elif isinstance(body["track.lyrics.get"]["message"].get("body"), dict):
-        if body["track.lyrics.get"]["message"]["body"]["lyrics"]["restricted"]:
-            print("Restricted lyrics.")
-            create_notification("Lyrics are restricted.", "#f95353")
-            lyric_fetch_attempt = None
-            root.after(3000, clear_notification)
-            return
-
-    lyric_fetch_attempt = None
-    return body
-
-
-def get_unsynced_lyrics(song, body):
-    if song.is_instrumental:
-        lines = ["Instrumental"]
-    elif song.has_unsynced:
-        lyrics_body = body["track.lyrics.get"]["message"].get("body")
-        if lyrics_body is None:
-            return None
-        if lyrics := lyrics_body["lyrics"]["lyrics_body"]:
-            lines = list(filter(None, lyrics.split("\n")))
-        else:
-            return None
-    else:
-        return None
-    return lines
-
-
-def get_synced_lyrics(song, body):
-    if song.is_instrumental:
-        synced_lyrics = [[0, song.get_info()["duration"]], "Instrumental"]
-    elif song.has_synced:
-        subtitle_body = body["track.subtitles.get"]["message"].get("body")
-        if subtitle_body is None:
-            return None
-        subtitle = subtitle_body["subtitle_list"][0]["subtitle"]
-        if not subtitle:
-            return None
-        old_lyric_lines = subtitle["subtitle_body"].split("\n")
-
-        # Remove double instrumental sections
-        previous_line_lyrics = None
-        lyric_lines = []
-        for line in old_lyric_lines:
-            if line.split("]")[1].strip() == "" and previous_line_lyrics == "":
-                pass
-            else:
-                lyric_lines.append(line.strip())
-                previous_line_lyrics = line.split("]")[1].strip()
-
-        def timestamp_to_epoch(timestamp):  # 00:00.00 str
-            epoch = 0
-            epoch += int(timestamp.split(":")[0]) * 60000
-            epoch += int(timestamp.split(":")[1].split(".")[0]) * 1000
-            epoch += int(timestamp.split(".")[1]) * 10
-            return epoch
-
-        synced_lyrics = []
-        # Add blank line from 0 to first line
-        first_line_epoch = timestamp_to_epoch(lyric_lines[0].split("] ")[0].replace("[", "").strip())
-        if first_line_epoch != 0:  # If first line does not start at 0
-            synced_lyrics.append([[0, first_line_epoch], ""])
-
-        # Append all lines
-        for index, line in enumerate(lyric_lines):
-            # Lyric Start Epoch
-            lyric_start = timestamp_to_epoch(line.split("]")[0].replace("[", ""))
-
-            # Lyric End Epoch
-            if index + 1 == len(lyric_lines):  # If iterating over last item in list
-                lyric_end = song.get_info()["duration"]
-            else:
-                lyric_end = timestamp_to_epoch(lyric_lines[index + 1].split("]")[0].replace("[", ""))
-
-            # Lyrics Line String
-            if line.split("]")[1] == "":  # Current line is empty / is an instrumental section
-                lyric = ""  # or "♪"
-            else:
-                lyric = line.split("] ")[1]
-
-            synced_lyrics.append([[lyric_start, lyric_end], lyric])
-
-        # Add blank line to end if not already existent
-        if synced_lyrics[-1][1] != "":
-            print(synced_lyrics[-1][0][1])
-            synced_lyrics.append([[synced_lyrics[-1][0][1], song.get_info()["duration"]], ""])
-    else:
-        return None
-    return synced_lyrics
-
-
-def spotifyapi_get_playing(access_token):
-    response = None
-    try:
-        response = requests.get("https://api.spotify.com/v1/me/player/currently-playing",
-                                headers={
-                                    "Accept": "application/json",
-                                    "Content-Type": "application/json",
-                                    "Authorization": f"Bearer {access_token}"
-                                })
-        return response.json()
-    except requests.exceptions.ConnectionError:
-        print("\033[91m[ERROR] Connection Failed - Check internet connection\033[0m")
-        return None
-    except json.decoder.JSONDecodeError:
-        print(response)
-        print("\033[91m[ERROR] Spotify not open - Cannot retrieve playing data\033[0m")
-        return None
-
-
-def spotifyapi_get_playback_state(access_token):
-    response = None
-    try:
-        response = requests.get("https://api.spotify.com/v1/me/player",
-                                headers={
-                                    "Accept": "application/json",
-                                    "Content-Type": "application/json",
-                                    "Authorization": f"Bearer {access_token}"
-                                })
-        return response.json()
-    except requests.exceptions.ConnectionError:
-        print("\033[91m[ERROR] Connection Failed - Check internet connection\033[0m")
-        return None
-    except json.decoder.JSONDecodeError:
-        print(response)
-        print("\033[91m[ERROR] Spotify not open - Cannot retrieve playback state\033[0m")
-        return None
-
-
-def spotifyapi_refresh_token():
-    try:
-        print("Refreshing spotify token...")
-        query = "https://accounts.spotify.com/api/token"
-        response = requests.post(query, data={"grant_type": "refresh_token", "refresh_token": spotify_refresh_token}, headers={"Authorization": f"Basic {spotify_base64_token}"})
-
-        print("Posted request with response:")
-        print(f"\033[90mCode {response.status_code}: {response.reason}\033[0m")
-        with contextlib.suppress(json.decoder.JSONDecodeError):
-            print(f"\033[90m{response.json()}\033[0m")
-        print("Spotify token refreshed")
-
-        return response.json()["access_token"]
-    except requests.exceptions.ConnectionError:
-        print("\033[91m[ERROR] Connection Failed - Check internet connection\033[0m")
-        print("Retrying in 10 seconds...")
-        time.sleep(1000)
-        spotifyapi_refresh_token()
-
-
-async def get_media_info():
-    sessions = await MediaManager.request_async()
-
-    if current_session := sessions.get_current_session():
-        print(current_session.source_app_user_model_id)
-        if current_session.source_app_user_model_id in ["Chrome", "Spotify.exe"]:
-            info = await current_session.try_get_media_properties_async()
-
-            info_dict = {song_attr: info.__getattribute__(song_attr) for song_attr in dir(info) if song_attr[0] != '_'}  # song_attr[0] != '_' ignores system attributes
-            info_dict["genres"] = list(info_dict["genres"])  # Convert winsdk vector to list
-
-            print(info_dict)
-            return info_dict
-    return None
-
-
-class Song(object):
-    def __init__(self, artist, title, album="", uri=""):
-        self.artist = artist
-        self.title = title
-        self.album = album
-        self.uri = uri
-        self.duration = 0
-        self.has_synced = False
-        self.has_unsynced = False
-        self.is_instrumental = False
-        self.lyrics = None
-        self.subtitles = None
-        self.coverart_url = None
-
-    def __str__(self) -> str:
-        return f"{self.artist} - {self.title}"
-
-    def get_info(self):
-        return {
-            "coverart_url": self.coverart_url,
-            "title": self.title,
-            "artist": self.artist,
-            "album": self.album,
-            "duration": self.duration,
-            "has_synced": self.has_synced,
-            "has_unsynced": self.has_unsynced,
-            "is_instrumental": self.is_instrumental
-        }
-
-    def update_info(self, body):
-        meta = body["matcher.track.get"]["message"]["body"]
-        if not meta:
-            return
-        coverart_sizes = ["100x100", "350x350", "500x500", "800x800"]
-        coverart_urls = list(filter(None, [meta["track"][f"album_coverart_{size}"] for size in coverart_sizes]))
-        self.coverart_url = coverart_urls[-1] if coverart_urls else None
-        self.title = meta["track"]["track_name"]
-        self.artist = meta["track"]["artist_name"]
-        self.album = meta["track"]["album_name"]
-        self.duration = meta["track"]["track_length"] * 1000
-        self.has_synced = meta["track"]["has_subtitles"]
-        self.has_unsynced = meta["track"]["has_lyrics"]  # or meta["track"]["has_lyrics_crowd"]
-        self.is_instrumental = meta["track"]["instrumental"]
+import media
+from core import musixmatch
+from core.command_dispatcher import CommandDispatcher
+from core.frame_profiler import FrameProfiler
+from core.frame_scheduler import FrameScheduler
+from core.job_runner import JobRunner
+from core.lyrics_cache import LyricsCache
+from core.lyrics_timeline import LyricsTimeline
+from core.musixmatch import MusixmatchProvider, decode_lyrics, encode_lyrics
+from core.playback_clock import PlaybackClock
+from core.playback_commands import send_playback_command
+from core.playback_frame import LyricsLoader, find_lyric_line, is_song_change, read_snapshot
+from core.playback_trace import TraceRecorder
+from core.poll_scheduler import PollScheduler
+from core.poller import PlaybackPoller, fetch_playback_snapshot, snapshot_from_media_info
+from core.prefetcher import LyricsPrefetcher
+from core.request_policy import RequestPolicy
+from core.song import create_song, get_track_info
+from core.spotify_client import SpotifyClient
+from core.startup_trace import StartupTrace
+from core.tween import AccelerationCurve, TweenEngine
+from core.user_directories import get_cache_directory
+from ui.asset_manager import AssetManager
+from ui.highlight import HighlightRectangle
+from ui.lyrics_view import LyricsView
+from ui.text_layout import TextLayout
+from ui.view_model import ViewModel
 
 
 def round_rectangle_points(x1, y1, x2, y2, radius=25):  # Generating points for a rounded rectangle
@@ -331,396 +70,326 @@ def round_rectangle_points(x1, y1, x2, y2, radius=25):  # Generating points for
             x1, y1]
 
 
-def create_notification(text, bg):
-    notification_text.config(text=text, bg=bg)
+@functools.lru_cache(maxsize=1024)
+def format_time(seconds):  # Whole seconds to "MM:SS", cached since the label only changes once a second
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+
+def create_notification(text, bg):  # Shown by the next view_model.commit()
+    view_model.set(notification_text, text=text, bg=bg)
     notification_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
     canvas_notification.grid(row=2, column=0, sticky="nsew")
-    root.update()
+    view_model.request_flush()
 
 
-def clear_notification():
-    notification_text.config(text="", bg="white")
+def clear_notification():  # Hidden by the next view_model.commit()
+    view_model.set(notification_text, text="", bg="white")
     notification_text.pack_forget()
     canvas_notification.grid_forget()
-    root.update()
+    view_model.request_flush()
 
 
-def make_api_call(spotify_access_token, code_directory):
-    global last_api_call_time
-    spotify_playing = spotifyapi_get_playing(spotify_access_token)
-    spotify_state = spotifyapi_get_playback_state(spotify_access_token)
-    last_api_call_time = time.time()
-    # print(f"\033[90m{spotify_playing}\033[0m")
+def expire_notification():  # Timer callback outside of a frame, the woken frame commits the cleared notification
+    clear_notification()
+    wake_updater()
 
-    if spotify_playing is None and spotify_state is None:
-        returns = {}
-    else:
-        returns = {
-            "api_call_timestamp": time.time(),
-            "spotify_playing": spotify_playing,
-            "spotify_state": spotify_state,
-            "last_updated_time": last_api_call_time,
-            "returns_received": False
-        }
 
-    with open(f"{code_directory}\\api_data.json", "w+") as file:
-        json.dump(returns, file, indent=4)
-    return
+def prefetch_lyrics(item):  # Runs on a prefetcher worker thread, returns True if the lyrics or a negative result are cached now
+    song = create_song(get_track_info(item))
+    lyrics_cache.get_or_fetch(song, functools.partial(musixmatch_provider.get_lyrics, priority="background"))
+    return lyrics_cache.get(song, count=False)[0]  # Rate limited or failed lookups are not cached
 
 
-def get_api_data():
-    try:
-        with open(f"{code_directory}\\api_data.json", "r+") as file:
-            data = json.load(file)
-    except json.decoder.JSONDecodeError:  # Occurs during the time when file is being written to
-        time.sleep(0.1)
-        print("Data retrieval reattempt")
-        data = get_api_data()  # Reattempts to get data
-    return data
+def on_media_session_change(info):  # Runs on the media session thread
+    # Local playback changes are published as snapshots right away, polls of the Web API stay as the fallback
+    poll_scheduler.media_session_active = info is not None and info["playing"] and info["uri"] is not None
+    snapshot = snapshot_from_media_info(info, playback_poller.snapshot)
+    if snapshot is not None:
+        playback_poller.publish(snapshot)
+    else:  # The session cannot stand in for a poll, e.g. no Spotify URI on Windows
+        playback_poller.poke()
+    with contextlib.suppress(RuntimeError, tk.TclError):  # RuntimeError before the main loop runs, the next frame picks it up
+        root.event_generate("<<MediaSessionChanged>>", when="tail")  # Wakes the updater, Tk queues it for its own thread
+
+
+def handle_lyrics_lookup(song):  # Runs on the Tk thread once a lookup finished
+    global lyrics_retry_pending
+
+    # Rate limited, the notification comes from the Musixmatch circuit breaker (update_request_notification)
+    lyrics_retry_pending = song.lookup_status == "timed_out"
 
+    if song.lookup_status == "request_error":
+        create_notification(f"{song.lookup_error}", "#f95353")
+        root.after(3000, expire_notification)
+    elif song.lookup_status == "restricted":
+        create_notification("Lyrics are restricted.", "#f95353")
+        root.after(3000, expire_notification)
 
-def create_rectangle(x1, y1, x2, y2):
-    global images
 
-    canvas_synced_lyrics.delete("rectangle")
-    images.clear()
+def format_retry(retry_in):  # Seconds until a breaker lets a request pass, 0 while its probe is due or in flight
+    seconds = math.ceil(retry_in)
+    return f"Retrying in {seconds} seconds..." if seconds > 0 else "Retrying..."
 
-    x1 = int(x1)
-    y1 = int(y1)
-    x2 = int(x2)
-    y2 = int(y2)
 
-    alpha = int(.3 * 255)  # .5 alpha
-    fill = root.winfo_rgb("#000000") + (alpha,)
-    x = max(x2 - x1, 0)
-    y = max(y2 - y1, 0)
-    image = Image.new("RGBA", (x, y), fill)
-    images.append(ImageTk.PhotoImage(image))
-    rectangle = canvas_synced_lyrics.create_image(x1, y1, image=images[-1], anchor="nw", tags="rectangle")
-    root.update()
-    return rectangle
+def update_request_notification():  # Shows open circuit breakers, runs every frame
+    global request_notification_text
+    open_breakers = request_policy.get_open_breakers()
+    spotify_breakers = [retry_in for endpoint, retry_in in open_breakers.items() if endpoint in notified_endpoints]
+    if "musixmatch" in open_breakers:
+        text = f"Lyrics rate limited. {format_retry(open_breakers['musixmatch'])}"
+    elif spotify_breakers:
+        text = f"Spotify unavailable. {format_retry(min(spotify_breakers))}"
+    else:
+        text = None
+
+    if text is not None:
+        frame_scheduler.request_in(1, "notification")  # Count down
+    if text == request_notification_text:
+        return
+    if text is not None:
+        create_notification(text, "#f95353")
+    elif notification_text.cget("text") == request_notification_text:  # Not replaced by another notification
+        clear_notification()
+    request_notification_text = text
+
+
+def create_rectangle(x1, y1, x2, y2):  # Moves and resizes the persistent highlight in place
+    return highlight_rectangle.draw(x1, y1, x2, y2)
 
 
 def update_synced_lyrics(lyrics, duration):  # sourcery skip: low-code-quality
-    global selected_lyric_line, rectangle_created, rectangle_status, rectangle, original_rect, rect_x1, rect_y1, rect_x2, rect_y2, target_x1, target_y1, target_x2, target_y2
-    global automatic_scroll, previous_auto_scroll_fraction
-    
-    lyric_sync_buffer = -50  # Buffer in ms. Negative for earlier, positive for later.
-    duration = duration - lyric_sync_buffer
+    global selected_lyric_line, rectangle_created, rectangle_status, target_x1, target_y1, target_x2, target_y2
+    global automatic_scroll, previous_auto_scroll_fraction, target_fraction
 
-    # rectangle_status: "creating" / "moving" / "teleporting" / "destroying" / None
+    # duration: Track progress in ms, already shifted by the playback clock sync offset
+    # rectangle_status: "creating" / "moving" / "destroying" / None, animations run on tween_engine
 
     if selected_lyric_line is None:  # Song changed
         print("Song changed, resetting lyric lines")
         selected_lyric_line = 0
+        target_x1, target_y1, target_x2, target_y2 = 0, 0, 0, 0
 
         automatic_scroll = True
         previous_auto_scroll_fraction = 0
+        target_fraction = None
         canvas_synced_lyrics.yview_moveto(0)
 
-    for index, lyric_data in enumerate(lyrics):  # Loop through lyric ranges
-        if lyric_data[0][0] <= duration <= lyric_data[0][1]:  # If duration is in range, index is the current lyric line
-            if selected_lyric_line != index and rectangle_status is None:  # If line changed, rectangle_status is None ensures animation is finished before continuing
-                target_text = lyrics_text_list[index]  # May raise index error?
-                if canvas_synced_lyrics.itemcget(lyrics_text_list[index], "text").strip() == "":
-                    target_x1, target_y1, target_x2, target_y2 = 5, canvas_synced_lyrics.bbox(target_text)[1], 5, canvas_synced_lyrics.bbox(target_text)[3]  # Target location/bbox of the text
-                else:
-                    target_x1, target_y1, target_x2, target_y2 = canvas_synced_lyrics.bbox(target_text)[0], canvas_synced_lyrics.bbox(target_text)[1], canvas_synced_lyrics.bbox(target_text)[2] + 2, canvas_synced_lyrics.bbox(target_text)[3]  # Target location/bbox of the text
-
-                if rectangle_created and canvas_synced_lyrics.itemcget(lyrics_text_list[index], "text").strip() == "":
-                    print("Blank line, destroying")
-                    rectangle_status = "destroying"
-
-                # Rectangle not created and current line is not blank, create rectangle
-                if not rectangle_created and canvas_synced_lyrics.itemcget(lyrics_text_list[index], "text").strip() != "":  # First line, start starting animation
-                    print("Preparing to create")
-                    rectangle_status = "creating"
-
-                elif rectangle_created and canvas_synced_lyrics.itemcget(lyrics_text_list[index], "text").strip() == "":
-                    print("Blank line, destroying")
-                    rectangle_status = "destroying"
-
-                # Expected lyric line, move down
-                elif index == selected_lyric_line + 1:
-                    print(f"Next lyric line ({selected_lyric_line} -> {index})")
-                    print("Moving rectangle down")
-                    rectangle_status = "moving"
-
-                    rect_x1 = canvas_synced_lyrics.bbox(rectangle)[0]
-                    rect_y1 = canvas_synced_lyrics.bbox(rectangle)[1]
-                    rect_x2 = canvas_synced_lyrics.bbox(rectangle)[2]
-                    rect_y2 = canvas_synced_lyrics.bbox(rectangle)[3]
-                    original_rect = (rect_x1, rect_y1, rect_x2, rect_y2)
-
-                # Unexpected jump, remove and create new rectangle
-                else:
-                    print(f"Lyric line jumped ({selected_lyric_line} -> {index})")
-                    print("Lyrics jumped, teleporting rectangle")
-                    rectangle_status = "teleporting"
-
-                print(f"New lyric hover: \"{lyrics[index][1]}\"")
-                print(f"New lyric time range: {lyrics[index][0]}")
-
-                selected_lyric_line = index
-            break
-
-    if rectangle_status is not None:
-        if rectangle_status == "moving":
-            # x1 never changes, y1 changes for movement, x2 changes for line length, y2 changes for movement
-
-            # Move rectangle
-            # Movement push down y1
-            if round(rect_y1) >= target_y1:  # Down movement is completed
-                rect_y1 = target_y1
-            else:
-                animation_completion = 1 - (target_y1 - rect_y1) / (target_y1 - original_rect[1])  # Animation completion percentage: 1 - Distance from current rectangle to target rectangle / Distance from original rectangle to target rectangle
-                animation_completion_percentage = int(min(round(animation_completion * 100, -1), 90))
-
-                move_pixels = (animation_acceleration[animation_completion_percentage] / 100) / 2 * (target_y1 - original_rect[1])
-                try:
-                    rect_y1 = canvas_synced_lyrics.bbox(rectangle)[1] + math.ceil(move_pixels)
-                except TypeError:
-                    rectangle_status = None
-                    print("TypeError raised: moving > push down y1")
-
-            # Movement push down y2
-            if round(rect_y2) >= target_y2:  # Down movement is completed
-                rect_y2 = target_y2
-            else:
-                animation_completion = 1 - (target_y2 - rect_y2) / (target_y2 - original_rect[3])  # Animation completion percentage: 1 - Distance from current rectangle to target rectangle / Distance from original rectangle to target rectangle
-                animation_completion_percentage = int(min(round(animation_completion * 100, -1), 90))
-
-                move_pixels = (animation_acceleration[animation_completion_percentage] / 100) / 2 * (target_y2 - original_rect[3])
-                try:
-                    rect_y2 = canvas_synced_lyrics.bbox(rectangle)[3] + math.ceil(move_pixels)
-                except TypeError:
-                    rectangle_status = None
-                    print("TypeError raised: moving > push down y2")
-
-            # Calculate rectangle shape change
-            # Resize by adjusting x2
-            # sourcery skip: merge-duplicate-blocks, merge-else-if-into-elif
-            if original_rect[2] >= target_x2:  # If rectangle has to shrink
-                if round(rect_x2) <= target_x2:
-                    rect_x2 = target_x2
-                else:
-                    animation_completion = 1 - (rect_x2 - target_x2) / (original_rect[2] - target_x2)  # Animation completion percentage: 1 - Distance from current rectangle to target rectangle / Distance from original rectangle to target rectangle
-                    animation_completion_percentage = int(min(round(animation_completion * 100, -1), 90))
-
-                    move_pixels = (animation_acceleration[animation_completion_percentage] / 100) / 2 * (original_rect[2] - target_x2)
-                    rect_x2 = canvas_synced_lyrics.bbox(rectangle)[2] - math.ceil(move_pixels)
-            else:  # If rectangle has to expand
-                if round(rect_x2) >= target_x2:
-                    rect_x2 = target_x2
-                else:
-                    animation_completion = 1 - (target_x2 - rect_x2) / (target_x2 - original_rect[2])  # Animation completion percentage: 1 - Distance from current rectangle to target rectangle / Distance from original rectangle to target rectangle
-                    animation_completion_percentage = int(min(round(animation_completion * 100, -1), 90))
-
-                    move_pixels = (animation_acceleration[animation_completion_percentage] / 100) / 2 * (target_x2 - original_rect[2])
-                    rect_x2 = canvas_synced_lyrics.bbox(rectangle)[2] + math.ceil(move_pixels)
-
-            rectangle = create_rectangle(rect_x1, rect_y1, rect_x2, rect_y2)  # Create the rectangle
-
-            if rect_x1 == target_x1 and rect_y1 == target_y1 and rect_x2 == target_x2 and rect_y2 == target_y2:  # If rectangle matches text box
-                print("Moving animation done")
-                rectangle_status = None
-
-        if rectangle_status == "teleporting":
-            rectangle = create_rectangle(target_x1, target_y1, target_x2, target_y2)  # Create the rectangle
-            print("Teleport done")
+    index = find_lyric_line(lyrics_timeline, duration, frame_scheduler)  # Current lyric line, None if duration is outside of the lyrics
+    if index is not None and selected_lyric_line != index:  # If line changed, a running animation continues from where it is
+        target_bbox = lyrics_view.get_line_bounds(index)  # From the layout, animations interpolate from it
+        blank_line = lyrics.texts[index].strip() == ""
+        if blank_line:
+            target_x1, target_y1, target_x2, target_y2 = 5, target_bbox[1], 5, target_bbox[3]  # Target location/bbox of the text
+        else:
+            target_x1, target_y1, target_x2, target_y2 = target_bbox[0], target_bbox[1], target_bbox[2] + 2, target_bbox[3]  # Target location/bbox of the text
+        current_rect = highlight_rectangle.bounds  # Last drawn geometry, None if not drawn
+
+        # Blank line, shrink the rectangle to its center and remove it
+        if blank_line:
+            if rectangle_created and current_rect is not None:
+                print("Blank line, destroying")
+                rectangle_status = "destroying"
+                rectangle_created = False
+                center_x = (current_rect[0] + current_rect[2]) / 2
+                tween_engine.start("rectangle", current_rect, (center_x, current_rect[1], center_x, current_rect[3]), animation_duration, animation_curve, draw_rectangle, finish_destroying_rectangle)
+
+        # Rectangle not created and current line is not blank, grow the rectangle from the center of the line
+        elif not rectangle_created or current_rect is None:
+            print("Creating rectangle")
+            rectangle_status = "creating"
+            rectangle_created = True
+            center_x = (target_x1 + target_x2) / 2
+            tween_engine.start("rectangle", (center_x, target_y1, center_x + 1, target_y2), (target_x1, target_y1, target_x2, target_y2), animation_duration, animation_curve, draw_rectangle, finish_rectangle_animation)
+
+        # Expected lyric line, move down
+        elif index == selected_lyric_line + 1:
+            print(f"Next lyric line ({selected_lyric_line} -> {index})")
+            print("Moving rectangle down")
+            rectangle_status = "moving"
+            tween_engine.start("rectangle", current_rect, (target_x1, target_y1, target_x2, target_y2), animation_duration, animation_curve, draw_rectangle, finish_rectangle_animation)
+
+        # Unexpected jump, remove and create new rectangle
+        else:
+            print(f"Lyric line jumped ({selected_lyric_line} -> {index})")
+            print("Lyrics jumped, teleporting rectangle")
+            tween_engine.cancel("rectangle")
             rectangle_status = None
+            draw_rectangle((target_x1, target_y1, target_x2, target_y2))
 
-        if rectangle_status == "destroying":
-            # Rectangle is created, prepare to destroy
-            if rectangle_created:
-                rectangle_created = False
-                rect_x1 = canvas_synced_lyrics.bbox(rectangle)[0]
-                rect_y1 = canvas_synced_lyrics.bbox(rectangle)[1]
-                rect_x2 = canvas_synced_lyrics.bbox(rectangle)[2]
-                rect_y2 = canvas_synced_lyrics.bbox(rectangle)[3]
+        print(f"New lyric hover: \"{lyrics.texts[index]}\"")
+        print(f"New lyric time range: {[lyrics.starts[index], lyrics.ends[index]]}")
 
-                original_rect = (rect_x1, rect_y1, rect_x2, rect_y2)
+        selected_lyric_line = index
 
-                target_x1, target_y1, target_x2, target_y2 = (rect_x1 + rect_x2) / 2, rect_y1, (rect_x1 + rect_x2) / 2, rect_y2
+    # Automatic scroll
+    if lyrics_height is not None and lyrics_height > canvas_middle.winfo_height():  # If all lyrics cannot be displayed/lyrics are covered
+        if automatic_scroll:  # If automatic scroll is enabled
+            if not synced_lyrics_scrollbar.winfo_ismapped():  # If scroll bar is not packed, pack
+                canvas_synced_lyrics.pack_forget()
+                synced_lyrics_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)  # Scrollbar must be packed before lyrics canvas
+                canvas_synced_lyrics.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
-            # Rectangle being removed, continue to destroy
-            else:
-                # Movement up and down are not required because rectangle destroy pushes from both sides
+            # Center the highlighted line to the middle of the screen
+            visible_canvas_height = canvas_middle.winfo_height()
+            fraction = max(((target_y1 + target_y2) / 2 - (visible_canvas_height / 2)) / lyrics_height, 0)  # (Center of highlighted line - half of visible canvas height) / height of lyrics
+            if fraction != target_fraction:  # Highlighted line or canvas height changed, scroll to it
+                target_fraction = fraction
+                start_fraction = previous_auto_scroll_fraction if previous_auto_scroll_fraction is not None else fraction
+                tween_engine.start("scroll", (start_fraction,), (fraction,), animation_duration, animation_curve, scroll_synced_lyrics)
 
-                # Movement push left
-                if round(rect_x1) >= target_x1:  # Left movement is completed
-                    rect_x1 = target_x1
-                else:
-                    animation_completion = 1 - (target_x1 - rect_x1) / (target_x1 - original_rect[0])  # Animation completion percentage: 1 - Distance from current rectangle to target rectangle / Distance from original rectangle to target rectangle
-                    animation_completion_percentage = int(min(round(animation_completion * 100, -1), 90))
+    elif synced_lyrics_scrollbar.winfo_ismapped():  # If scroll bar is packed, unpack
+        synced_lyrics_scrollbar.pack_forget()
 
-                    move_pixels = (animation_acceleration[animation_completion_percentage] / 100) / 2 * (target_x1 - original_rect[0])
-                    rect_x1 = canvas_synced_lyrics.bbox(rectangle)[0] + math.ceil(move_pixels)
+    lyrics_view.render()  # Materialize lines scrolled into view
 
-                # Movement push right
-                if round(rect_x2) <= target_x2:  # Right movement is completed
-                    rect_x2 = target_x2
-                else:
-                    animation_completion = 1 - (rect_x2 - target_x2) / (original_rect[2] - target_x2)  # Animation completion percentage: 1 - Distance from current rectangle to target rectangle / Distance from original rectangle to target rectangle
-                    animation_completion_percentage = int(min(round(animation_completion * 100, -1), 90))
 
-                    move_pixels = (animation_acceleration[animation_completion_percentage] / 100) / 2 * (original_rect[2] - target_x2)
-                    rect_x2 = canvas_synced_lyrics.bbox(rectangle)[2] - math.ceil(move_pixels)
+def draw_rectangle(bounds):  # Tween update, bounds: (x1, y1, x2, y2)
+    create_rectangle(*bounds)
 
-                rectangle = create_rectangle(rect_x1, rect_y1, rect_x2, rect_y2)  # Create the rectangle
 
-                if rect_x1 == target_x1 and rect_y1 == target_y1 and rect_x2 == target_x2 and rect_y2 == target_y2:  # If rectangle matches text box
-                    print("Destroy animation done")
-                    canvas_synced_lyrics.delete("rectangle")
-                    rectangle_status = None
+def finish_rectangle_animation():
+    global rectangle_status
+    print(f"Rectangle animation done ({rectangle_status})")
+    rectangle_status = None
 
-        if rectangle_status == "creating":
-            # Rectangle is not created, create a new rectangle
-            if not rectangle_created:
-                rectangle_created = True
 
-                rectangle = create_rectangle((target_x1 + target_x2) / 2, target_y1, (target_x1 + target_x2) / 2 + 1, target_y2)  # Create first rectangle
+def finish_destroying_rectangle():
+    highlight_rectangle.delete()
+    finish_rectangle_animation()
 
-                rect_x1 = canvas_synced_lyrics.bbox(rectangle)[0]
-                rect_y1 = canvas_synced_lyrics.bbox(rectangle)[1]  # Equal to target_y1
-                rect_x2 = canvas_synced_lyrics.bbox(rectangle)[2]
-                rect_y2 = canvas_synced_lyrics.bbox(rectangle)[3]  # Equal to target_y2
 
-                original_rect = (rect_x1, rect_y1, rect_x2, rect_y2)
+def scroll_synced_lyrics(values):  # Tween update, values: (fraction,)
+    global previous_auto_scroll_fraction
+    previous_auto_scroll_fraction = values[0]
+    canvas_synced_lyrics.yview_moveto(values[0])
 
-            # Rectangle has already been created, expand rectangle
-            else:
-                # Movement up and down are not required because rectangle creation starts at y1 - y2
 
-                # Movement push left
-                if round(rect_x1) <= target_x1:  # Left movement is completed
-                    rect_x1 = target_x1
-                else:
-                    animation_completion = 1 - (rect_x1 - target_x1) / (original_rect[0] - target_x1)  # Animation completion percentage: 1 - Distance from current rectangle to target rectangle / Distance from original rectangle to target rectangle
-                    animation_completion_percentage = int(min(round(animation_completion * 100, -1), 90))
+def reset_lyric_animations():  # Call after the synced lyrics canvas was cleared
+    global rectangle_status
+    tween_engine.clear()
+    rectangle_status = None
+    highlight_rectangle.reset()
+    lyrics_view.reset()
 
-                    move_pixels = (animation_acceleration[animation_completion_percentage] / 100) / 2 * (original_rect[0] - target_x1)
-                    rect_x1 = canvas_synced_lyrics.bbox(rectangle)[0] - math.ceil(move_pixels)
 
-                # Movement push right
-                if round(rect_x2) >= target_x2:  # Right movement is completed
-                    rect_x2 = target_x2
-                else:
-                    animation_completion = 1 - (target_x2 - rect_x2) / (target_x2 - original_rect[2])  # Animation completion percentage: 1 - Distance from current rectangle to target rectangle / Distance from original rectangle to target rectangle
-                    animation_completion_percentage = int(min(round(animation_completion * 100, -1), 90))
+def on_lyrics_layout():  # Line offsets changed, e.g. after a resize
+    global lyrics_height, target_x1, target_y1, target_x2, target_y2, target_fraction
+    lyrics_height = lyrics_view.total_height
+    if selected_lyric_line is None or selected_lyric_line >= len(lyrics_view.texts):
+        return
+    target_bbox = lyrics_view.get_line_bounds(selected_lyric_line)
+    if lyrics_view.texts[selected_lyric_line].strip() == "":
+        target_x1, target_y1, target_x2, target_y2 = 5, target_bbox[1], 5, target_bbox[3]
+    else:
+        target_x1, target_y1, target_x2, target_y2 = target_bbox[0], target_bbox[1], target_bbox[2] + 2, target_bbox[3]
+    target_fraction = None  # Scroll to the new position of the line
+    if rectangle_created and not tween_engine.is_running("rectangle"):  # Move the highlight with its line
+        draw_rectangle((target_x1, target_y1, target_x2, target_y2))
 
-                    move_pixels = (animation_acceleration[animation_completion_percentage] / 100) / 2 * (target_x2 - original_rect[2])
-                    rect_x2 = canvas_synced_lyrics.bbox(rectangle)[2] + math.ceil(move_pixels)
 
-                rectangle = create_rectangle(rect_x1, rect_y1, rect_x2, rect_y2)  # Create the rectangle
+def display_lyrics():  # Renders the lyrics of the current song
+    global selected_lyric_line, rectangle_status, rectangle_created, lyrics_height, lyrics_timeline
 
-                # Rectangle matches the size of text box, create animation completed
-                if rect_x1 == target_x1 and rect_y1 == target_y1 and rect_x2 == target_x2 and rect_y2 == target_y2:  # If rectangle matches text box
-                    print("Creation animation done")
-                    rectangle_status = None
+    print(f"\033[90m{lyrics}\033[0m")
 
-    # Automatic scroll
-    if lyrics_height is not None and lyrics_height > canvas_middle.winfo_height():  # If all lyrics cannot be displayed/lyrics are covered
-        # print("Scroll needed")  # DEBUG
-        # print(canvas_synced_lyrics.winfo_reqheight())
-        if automatic_scroll:  # If automatic scroll is enabled
-            if not synced_lyrics_scrollbar.winfo_ismapped():  # If scroll bar is not packed, pack
-                canvas_synced_lyrics.pack_forget()
-                synced_lyrics_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)  # Scrollbar must be packed before lyrics canvas
-                canvas_synced_lyrics.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    lyrics_center_subtitle.config(text="")
+    frame_lyrics_info.place_forget()
 
-            # Center rectangle to the middle of the screen
-            with contextlib.suppress(TypeError, tk.TclError):  # TypeError caused by non-existent rectangle/rectangle has been destroyed. TclError unknown cause, occurs after advertisement.
-                rectangle_height = canvas_synced_lyrics.bbox(rectangle)[3] - canvas_synced_lyrics.bbox(rectangle)[1]
-                rectangle_y_pos = canvas_synced_lyrics.bbox(rectangle)[1]  # y1 (Top left of rectangle)
-                rectangle_y_center = rectangle_y_pos + (rectangle_height / 2)
-                visible_canvas_height = canvas_middle.winfo_height()
-                # noinspection PyTypeChecker
-                fraction = (rectangle_y_center - (visible_canvas_height / 2)) / lyrics_height  # (Center of rectangle - half of visible canvas height) / height of lyrics.
-
-                # If scroll wants to jump more than x pixels
-                fraction_per_pixel = 1 / visible_canvas_height
-                max_jump_range = 3  # Maximum jump in pixels
-                if previous_auto_scroll_fraction is not None and not previous_auto_scroll_fraction - (fraction_per_pixel * max_jump_range) < fraction < previous_auto_scroll_fraction + (fraction_per_pixel * max_jump_range):  # If previous is not in range of current by 5 pixels
-                    global target_fraction, start_fraction
-                    # Start jump
-                    target_fraction = float(fraction)
-                    start_fraction = float(previous_auto_scroll_fraction)
-
-                # If currently jumping
-                if previous_auto_scroll_fraction is not None and target_fraction is not None and start_fraction is not None:
-                    if target_fraction > start_fraction:  # Going down
-                        animation_completion = 1 - (target_fraction - previous_auto_scroll_fraction) / (target_fraction - start_fraction)  # Animation completion percentage: 1 - Distance from current rectangle to target rectangle / Distance from original rectangle to target rectangle
-                        animation_completion_percentage = int(min(round(animation_completion * 100, -1), 90))
-
-                        if previous_auto_scroll_fraction >= target_fraction:
-                            print("Jump down completed")
-                            target_fraction = None
-                            start_fraction = None
-                        else:
-                            fraction_change = (animation_acceleration[animation_completion_percentage] / 100) * (target_fraction - start_fraction) * 2  # x2 for double speed
-                            fraction = previous_auto_scroll_fraction + fraction_change
-
-                    elif target_fraction < start_fraction:  # Going up
-                        animation_completion = 1 - (previous_auto_scroll_fraction - target_fraction) / (start_fraction - target_fraction)  # Animation completion percentage: 1 - Distance from current rectangle to target rectangle / Distance from original rectangle to target rectangle
-                        animation_completion_percentage = int(min(round(animation_completion * 100, -1), 90))
-
-                        if previous_auto_scroll_fraction <= target_fraction:
-                            print("Jump up completed")
-                            target_fraction = None
-                            start_fraction = None
-                        else:
-                            fraction_change = (animation_acceleration[animation_completion_percentage] / 100) * (start_fraction - target_fraction) * 2  # x2 for double speed
-                            fraction = previous_auto_scroll_fraction - fraction_change
-
-                previous_auto_scroll_fraction = float(fraction)
-                canvas_synced_lyrics.yview_moveto(fraction)
+    # Instrumental song
+    # noinspection PyTypeChecker
+    if lyrics is not None and (lyrics["song_info"])["is_instrumental"]:
+        lyrics_center_text.config(text="Instrumental")
+        frame_lyrics_info.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
 
-    elif synced_lyrics_scrollbar.winfo_ismapped():  # If scroll bar is packed, unpack
-        synced_lyrics_scrollbar.pack_forget()
+    # Synced lyrics
+    elif lyrics is not None and lyrics["synced_lyrics"] is not None:
+        print("Creating synced lyrics")
+
+        selected_lyric_line = None
+        rectangle_status = None
+        rectangle_created = False
+
+        lyrics_timeline = LyricsTimeline(lyrics["synced_lyrics"])  # Compiled once, looked up every frame
+
+        fonts = []
+        for i in range(len(lyrics["synced_lyrics"])):
+            if i == 0 or i + 1 == len(lyrics["synced_lyrics"]):  # First and last item in list
+                font_size = 1
+            else:
+                font_size = 9
+            fonts.append((lyrics_font_family, font_size))
+        lyrics_view.set_lines(lyrics["synced_lyrics"].texts, fonts)  # Only lines near the viewport get canvas items, sets the scroll region
+        lyrics_height = lyrics_view.total_height
+
+        synced_lyrics_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)  # Scrollbar must be packed before lyrics canvas
+        canvas_synced_lyrics.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+    elif lyrics is not None and lyrics["lyrics"] is not None:
+        print("Creating scrollable lyrics")
+        scroll_lyrics_listbox.insert(tk.END, "These lyrics are not synced yet.")
+        scroll_lyrics_listbox.insert(tk.END, "-------------------------------------")
+        for line in lyrics["lyrics"]:
+            scroll_lyrics_listbox.insert(tk.END, line)
+        scroll_lyrics_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(5, 0))
+        scroll_lyrics_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+    else:
+        print("No lyrics")
+        lyrics_center_text.config(text="Lyrics Unavailable")
+        frame_lyrics_info.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
+
+    view_model.request_flush()  # Flushed with the rest of the frame by view_model.commit()
 
 
 def updater():  # sourcery skip: low-code-quality
-    global track_info, lyrics, previous_track_info, previous_not_playing, track_start_time, playing, shuffle, repeat
+    global track_info, lyrics, previous_track_info, previous_not_playing, playing, shuffle, repeat
     global track_progress
     global text_track_title_slide_completed, text_track_title_slide_queued, text_artists_slide_completed, text_artists_slide_queued, text_next_slide
-    global last_api_call_time, spotify_access_token, spotify_last_refresh_time, schedule_retry_lyric_fetch_time, lyric_fetch_attempt
-    global selected_lyric_line, rectangle_status, rectangle_created, lyrics_height
-    global root_after_id, multiprocessing_process_id
+    global last_snapshot_version, lyrics_retry_pending
+    global root_after_id
 
     if override_cancel:
         root_after_id = root.after(15, updater)
         return
 
+    frame_scheduler.begin_frame()
+    frame_profiler.begin_frame()
+    frame_scheduler.visible = root.state() == "normal"  # Idle while minimized
+    update_request_notification()
+
     # Expected timing for in between API calls
     with contextlib.suppress(TypeError):  # TypeError: First run, track_info & playing = None
         if playing:  # If previously playing, playing starts as None
-            track_progress = ((time.time() - track_start_time) * 1000)
-            progress_bar["value"] = track_progress / track_info["duration_ms"] * 100
-            text_progress_start.config(text=datetime.datetime.fromtimestamp(track_progress / 1000).strftime("%M:%S"))
-            text_progress_end.config(text=datetime.datetime.fromtimestamp(track_info["duration_ms"] / 1000).strftime("%M:%S"))
-            root.update()
+            track_progress = 0 if command_dispatcher.is_pending("skip") else playback_clock.get_progress()  # Skipped tracks start at 0 until the poll shows the new one
+            set_progress(track_progress, track_info["duration_ms"])
+            frame_scheduler.request_in((1000 - track_progress % 1000) / 1000, "progress")  # Next second on the progress label
+    frame_profiler.mark("progress")
 
     # Update synced lyrics
     # noinspection PyUnresolvedReferences
     if playing and lyrics is not None and lyrics["synced_lyrics"] is not None and lyrics["lyrics"] is not ["Instrumental"]:
         try:
-            update_synced_lyrics(lyrics["synced_lyrics"], track_progress)
+            update_synced_lyrics(lyrics["synced_lyrics"], playback_clock.get_lyrics_progress())
         except TypeError:
             # print("TypeError exception unhandled:")
             # traceback.print_exc()
             pass
+    frame_profiler.mark("lyrics")
+    if tween_engine.step():  # Rectangle or scroll animation running
+        frame_scheduler.request_frame("animation")
+    frame_profiler.mark("animation")
 
     # Sliding track title
-    if (text_track_title.winfo_width() > canvas_topbar.winfo_width() - exit_button.winfo_width() - minimize_button.winfo_width()) and (text_next_slide is None or time.time() >= text_next_slide):  # If text track title does not fit and next slide is not queued or queued time is up
+    text_track_title_overflows = text_track_title.winfo_width() > canvas_topbar.winfo_width() - exit_button.winfo_width() - minimize_button.winfo_width()
+    text_artists_overflows = text_artists.winfo_width() > canvas_topbar.winfo_width() - exit_button.winfo_width()
+    if text_track_title_overflows and (text_next_slide is None or time.time() >= text_next_slide):  # If text track title does not fit and next slide is not queued or queued time is up
         y_pos = text_track_title.winfo_y()
         x_pos = text_track_title.winfo_x()
-        text_track_title.place_forget()
 
         text_next_slide = None
 
         if 6 >= x_pos >= 5 and not text_track_title_slide_queued:  # If slide has completed a rotation
-            text_track_title.place(x=5, y=y_pos)  # Fix minor differences
+            view_model.place(text_track_title, x=5, y=y_pos)  # Fix minor differences
             text_track_title_slide_completed = True
             if text_track_title_slide_completed and text_artists_slide_completed and text_next_slide is None:  # If both texts have finished sliding and next slide is not queued
                 text_next_slide = time.time() + 3  # Text stays for 3 seconds before sliding again
@@ -728,28 +397,25 @@ def updater():  # sourcery skip: low-code-quality
                 text_artists_slide_queued = True
 
         elif (x_pos + text_track_title.winfo_width()) < 0:  # If right side of text if past left side of parent, then restart slide
-            text_track_title.place(x=root.winfo_width() - exit_button.winfo_width(), y=y_pos)
+            view_model.place(text_track_title, x=root.winfo_width() - exit_button.winfo_width(), y=y_pos)
 
         else:  # Slide text
-            text_track_title.place(x=x_pos - 1, y=y_pos)  # Speed of text slide (int)
+            view_model.place(text_track_title, x=x_pos - 1, y=y_pos)  # Speed of text slide (int)
             text_track_title_slide_queued = False
             text_track_title_slide_completed = False
 
     elif text_track_title.winfo_x() != 5:  # Track title text does not need to slide but is not in correct position
-        y_pos = text_track_title.winfo_y()
-        text_track_title.place_forget()
-        text_track_title.place(x=5, y=y_pos)
+        view_model.place(text_track_title, x=5, y=text_track_title.winfo_y())
 
     # Sliding artists text
-    if (text_artists.winfo_width() > canvas_topbar.winfo_width() - exit_button.winfo_width()) and (text_next_slide is None or time.time() >= text_next_slide):  # If text track title does not fit and next slide is not queued or queued time is up
+    if text_artists_overflows and (text_next_slide is None or time.time() >= text_next_slide):  # If text track title does not fit and next slide is not queued or queued time is up
         y_pos = text_artists.winfo_y()
         x_pos = text_artists.winfo_x()
-        text_artists.place_forget()
 
         text_next_slide = None
 
         if 6 >= x_pos >= 5 and not text_artists_slide_queued:  # If slide has completed a rotation
-            text_artists.place(x=5, y=y_pos)  # Fix minor differences
+            view_model.place(text_artists, x=5, y=y_pos)  # Fix minor differences
             text_artists_slide_completed = True
             if text_track_title_slide_completed and text_artists_slide_completed and text_next_slide is None:  # If both texts have finished sliding and next slide is not queued
                 text_next_slide = time.time() + 3  # Text stays for 3 seconds before sliding again
@@ -757,18 +423,22 @@ def updater():  # sourcery skip: low-code-quality
                 text_artists_slide_queued = True
 
         elif (x_pos + text_artists.winfo_width()) < 0:  # If right side of text if past left side of parent, then restart slide
-            text_artists.place(x=root.winfo_width(), y=y_pos)  # Exit button slide is not included because it is covering the text
+            view_model.place(text_artists, x=root.winfo_width(), y=y_pos)  # Exit button slide is not included because it is covering the text
 
         else:  # Slide text
-            text_artists.place(x=x_pos - 1, y=y_pos)  # Speed of text slide (int)
+            view_model.place(text_artists, x=x_pos - 1, y=y_pos)  # Speed of text slide (int)
             text_artists_slide_queued = False
             text_artists_slide_completed = False
 
     elif text_artists.winfo_x() != 5:  # Track title text does not need to slide but is not in correct position
-        y_pos = text_artists.winfo_y()
-        text_artists.place_forget()
-        text_artists.place(x=5, y=y_pos)
-    root.update()
+        view_model.place(text_artists, x=5, y=text_artists.winfo_y())
+
+    if text_track_title_overflows or text_artists_overflows:
+        if text_next_slide is not None and time.time() < text_next_slide:  # Texts are paused between slides
+            frame_scheduler.request_in(text_next_slide - time.time(), "marquee")
+        else:
+            frame_scheduler.request_frame("marquee")
+    frame_profiler.mark("marquee")
 
     # Create/Remove automatic scroll button
     if not automatic_scroll:  # If automatic scroll is disabled
@@ -780,82 +450,30 @@ def updater():  # sourcery skip: low-code-quality
     else:  # If automatic scroll is enabled
         if lyrics_enable_auto_scroll.winfo_ismapped():  # If enable automatic scroll button is placed
             lyrics_enable_auto_scroll.place_forget()
+    frame_profiler.mark("scroll_button")
+
+    # Consume the latest playback snapshot only when the poller has published a new version, or again after a command failed
+    api_data = playback_poller.get_snapshot(None if command_dispatcher.take_rollback() else last_snapshot_version)
 
-    # Refresh Spotify access token if necessary
-    if spotify_last_refresh_time < int(time.time()) - 1800:
-        print("Refreshing spotify token due to time out")
-        spotify_access_token = spotifyapi_refresh_token()
-        spotify_last_refresh_time = time.time()
-
-    # API call update every 1.5 seconds
-    if time.time() > last_api_call_time + 1.5:
-        last_api_call_time = time.time()
-        multiprocessing_process_id = multiprocessing.Process(target=make_api_call, args=(spotify_access_token, code_directory))
-        multiprocessing_process_id.start()
-
-    api_data = get_api_data()
-
-    if api_data != {} and not api_data["returns_received"]:
-        # Set returns_received to True to retrieve file after every update
-        with open(f"{code_directory}\\api_data.json", "r+") as file:
-            data = json.load(file)
-            data["returns_received"] = True
-            file.seek(0)
-            file.truncate(0)
-            json.dump(data, file, indent=4)
+    if api_data is not None:
+        if last_snapshot_version is None:
+            root.after_idle(report_startup, "first_poll_rendered")
+        last_snapshot_version = api_data["version"]
         try:
-            api_call_timestamp = api_data["api_call_timestamp"]
-            spotify_playing = api_data["spotify_playing"]
-            spotify_state = api_data["spotify_state"]
-
-            track_info = {
-                "track_name": spotify_playing["item"]["name"],
-                "artists": [artist["name"] for artist in list(spotify_playing["item"]["artists"])],
-                "artist_names": ", ".join(artist["name"] for artist in list(spotify_playing["item"]["artists"])),
-                "album": spotify_playing["item"]["album"]["name"],
-                "album_cover_link": spotify_playing["item"]["album"]["images"][-1]["url"],
-                "duration_ms": spotify_playing["item"]["duration_ms"],
-                "link": spotify_playing["item"]["external_urls"]["spotify"],
-                "uri": spotify_playing["item"]["uri"]
-            }
-            track_progress = spotify_playing["progress_ms"]
-            playing = spotify_playing["is_playing"]
-            shuffle = spotify_state["shuffle_state"]
-            repeat = spotify_state["repeat_state"]
-
-            track_start_time = api_call_timestamp - (track_progress / 1000)  # Use api_call_timestamp to prevent file save/recall delay
+            # Commands not confirmed by a poll yet are shown over the polled state
+            track_info, playback_state = read_snapshot(api_data, playback_clock, command_dispatcher)
+            playing = playback_state["playing"]
+            shuffle = playback_state["shuffle"]
+            repeat = playback_state["repeat"]
+            track_progress = playback_clock.get_progress()
 
             # Track Title and Artists Text
-            text_track_title.config(text=track_info["track_name"])
-            text_artists.config(text=track_info["artist_names"])
-            # Progress bar
-            progress_bar["value"] = track_progress / track_info["duration_ms"] * 100
-            # Progress texts
-            text_progress_start.config(text=datetime.datetime.fromtimestamp(track_progress / 1000).strftime("%M:%S"))
-            text_progress_end.config(text=datetime.datetime.fromtimestamp(track_info["duration_ms"] / 1000).strftime("%M:%S"))
-            # Play button
-            if playing:
-                image = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/pause.png").resize((35, 35), Image.Resampling.LANCZOS))
-            else:
-                image = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/play.png").resize((35, 35), Image.Resampling.LANCZOS))
-            button_play.config(image=image)
-            button_play.photo = image
-            # Shuffle button
-            if shuffle:
-                image = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/shuffle_selected.png").resize((15, 15), Image.Resampling.LANCZOS))
-            else:
-                image = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/shuffle.png").resize((15, 15), Image.Resampling.LANCZOS))
-            button_shuffle.config(image=image)
-            button_shuffle.photo = image
-            # Repeat button
-            if repeat is not None:
-                image = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/repeat_{repeat}.png").resize((15, 15), Image.Resampling.LANCZOS))
-            else:
-                image = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/repeat_off.png").resize((15, 15), Image.Resampling.LANCZOS))
-            button_repeat.config(image=image)
-            button_repeat.photo = image
-
-            root.update()
+            view_model.set(text_track_title, text=track_info["track_name"])
+            view_model.set(text_artists, text=track_info["artist_names"])
+            # Progress bar and texts
+            set_progress(track_progress, track_info["duration_ms"])
+            # Play, shuffle and repeat buttons
+            show_playback_controls()
 
             previous_not_playing = False
 
@@ -870,145 +488,182 @@ def updater():  # sourcery skip: low-code-quality
 
             track_info = None
             previous_track_info = None
+            lyrics_loader.cancel()
 
             # Track Title and Artists Text
             if type(exception) == TypeError:
-                text_track_title.config(text="[Advertisement]")
+                view_model.set(text_track_title, text="[Advertisement]")
             else:
-                text_track_title.config(text="[Not Playing]")
-            text_artists.config(text="")
+                view_model.set(text_track_title, text="[Not Playing]")
+            view_model.set(text_artists, text="")
             # Progress bar
-            progress_bar["value"] = 0
+            view_model.set(progress_bar, value=0)
             # Progress texts
-            text_progress_start.config(text="--:--")
-            text_progress_end.config(text="--:--")
+            view_model.set(text_progress_start, text="--:--")
+            view_model.set(text_progress_end, text="--:--")
             # Lyrics
             canvas_synced_lyrics.delete("all")
+            reset_lyric_animations()
             canvas_synced_lyrics.pack_forget()
             synced_lyrics_scrollbar.pack_forget()
             scroll_lyrics_listbox.delete(0, tk.END)
             scroll_lyrics_listbox.pack_forget()
             scroll_lyrics_scrollbar.pack_forget()
             frame_lyrics_info.place_forget()
+            frame_profiler.mark("snapshot")
 
-            root.update()
-            root_after_id = root.after(15, updater)
+            view_model.commit()
+            command_dispatcher.mark_rendered()
+            frame_profiler.end_frame("commit")
+            root_after_id = root.after(frame_scheduler.next_delay_ms(), updater)
             return
+        frame_profiler.mark("snapshot")
 
         # Song is different from previously/Song has changed
-        # noinspection PyTypeChecker
-        if track_info != previous_track_info or (schedule_retry_lyric_fetch_time is not None and time.time() >= schedule_retry_lyric_fetch_time):
-            schedule_retry_lyric_fetch_time = None
-
-            if track_info != previous_track_info:
-                previous_track_info = track_info.copy()
-                print("Song changed:")
-                print(f"\033[90m{track_info}\033[0m")
-                lyric_fetch_attempt = None
-            else:
-                print(f"Retrying lyric fetch... (Attempt {lyric_fetch_attempt})")
-
-            canvas_synced_lyrics.delete("all")
-            canvas_synced_lyrics.pack_forget()
-            synced_lyrics_scrollbar.pack_forget()
-            scroll_lyrics_listbox.delete(0, tk.END)
-            scroll_lyrics_listbox.pack_forget()
-            scroll_lyrics_scrollbar.pack_forget()
+        song_changed = is_song_change(track_info, previous_track_info)
+    else:
+        song_changed = False
+
+    # A rate limited lookup is retried once the Musixmatch breaker allows it, without waiting for a new snapshot
+    if track_info is not None and (song_changed or (lyrics_retry_pending and request_policy.retry_in("musixmatch") == 0)):
+        lyric_fetch_attempt = None  # Attempt number shown while retrying
+
+        if song_changed:
+            previous_track_info = track_info.copy()
+            print("Song changed:")
+            print(f"\033[90m{track_info}\033[0m")
+        elif lyrics_retry_pending:
+            lyric_fetch_attempt = request_policy.get_breaker("musixmatch").failures + 1
+            print(f"Retrying lyric fetch... (Attempt {lyric_fetch_attempt})")
+        lyrics_retry_pending = False
+
+        canvas_synced_lyrics.delete("all")
+        reset_lyric_animations()
+        canvas_synced_lyrics.pack_forget()
+        synced_lyrics_scrollbar.pack_forget()
+        scroll_lyrics_listbox.delete(0, tk.END)
+        scroll_lyrics_listbox.pack_forget()
+        scroll_lyrics_scrollbar.pack_forget()
+
+        song = create_song(track_info)
+        lyrics_cached, lyrics = lyrics_loader.load(song)  # A miss is looked up in the background, the result is picked up by a later updater tick
+        lyrics_prefetcher.record_song_change(track_info["uri"])
+        lyrics_prefetcher.schedule()  # Prefetch lyrics for the upcoming tracks
+        if lyrics_cached:  # Cache hit, lyrics are shown in the same frame as the song change
+            print("Lyrics loaded from cache")
+            display_lyrics()
+        else:
             lyrics_center_text.config(text="Loading lyrics...")
             if lyric_fetch_attempt is not None:
                 lyrics_center_subtitle.config(text=f"Attempt {lyric_fetch_attempt}")
             frame_lyrics_info.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
 
-            root.update()
+            lyrics = None  # Stop drawing the previous song's lyrics while loading
+    frame_profiler.mark("song_change")
 
-            lyrics = get_lyrics(Song(track_info["artist_names"], track_info["track_name"]))
-            print(f"\033[90m{lyrics}\033[0m")
+    # Lyrics lookup finished in the background
+    if (lookup_result := lyrics_loader.get_result(track_info["uri"] if track_info is not None else None)) is not None:  # Results for a song that is no longer playing are dropped
+        lookup_song, lyrics = lookup_result
+        if lookup_song is not None:
+            handle_lyrics_lookup(lookup_song)
+        display_lyrics()
 
-            lyrics_center_subtitle.config(text="")
-            frame_lyrics_info.place_forget()
+    # Wake up for the next poll result and background lyrics lookups
+    if playback_poller.fetching or lyrics_loader.is_running() or command_dispatcher.is_busy():
+        frame_scheduler.request_in(0.05, "background")
+    else:
+        frame_scheduler.request_in(max(playback_poller.next_poll_time - time.time(), 0.05), "poll")
 
-            # Instrumental song
-            # noinspection PyTypeChecker
-            if lyrics is not None and (lyrics["song_info"])["is_instrumental"]:
-                lyrics_center_text.config(text="Instrumental")
-                frame_lyrics_info.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
+    frame_profiler.mark("lyrics_lookup")
 
-            # Synced lyrics
-            elif lyrics is not None and lyrics["synced_lyrics"] is not None:
-                print("Creating synced lyrics")
+    view_model.commit()  # Apply this frame's widget changes in one batch
+    command_dispatcher.mark_rendered()
+    frame_profiler.end_frame("commit")
+    root_after_id = root.after(frame_scheduler.next_delay_ms(), updater)
 
-                selected_lyric_line = None
-                rectangle_status = None
-                rectangle_created = False
 
-                lyrics_text_list.clear()
-
-                lyrics_height = 0
-
-                for i in range(len(lyrics["synced_lyrics"])):
-                    if i == 0 or i + 1 == len(lyrics["synced_lyrics"]):  # First and last item in list
-                        font_size = 1
-                    else:
-                        font_size = 9
-                    text = lyrics["synced_lyrics"][i][1]
-                    lyrics_text = canvas_synced_lyrics.create_text(5, lyrics_height, text=text, font=(tk.font.nametofont("TkDefaultFont").actual()["family"], font_size), anchor=tk.NW, justify=tk.LEFT, width=canvas_synced_lyrics.winfo_width() - 10)  # Max text width (-10 px for scroll bar)
-                    lyrics_text_list.append(lyrics_text)
-                    lyrics_height += canvas_synced_lyrics.bbox(lyrics_text)[3] - canvas_synced_lyrics.bbox(lyrics_text)[1]
-                    lyrics_height += 2  # 2 px line spacing
-                root.update()
-
-                # Set scroll region
-                canvas_synced_lyrics_bbox = list(canvas_synced_lyrics.bbox("all"))
-                canvas_synced_lyrics_bbox[0] = canvas_synced_lyrics_bbox[0] - 5  # 5 px margin left
-                canvas_synced_lyrics_bbox[1] = canvas_synced_lyrics_bbox[1] - 5  # 5 px margin top
-                canvas_synced_lyrics_bbox = tuple(canvas_synced_lyrics_bbox)  # Tuple needs to be converted to list then back to be edited
-                canvas_synced_lyrics.configure(scrollregion=canvas_synced_lyrics_bbox)
+def set_progress(track_progress, duration):  # Progress bar and progress texts, in ms
+    view_model.set(progress_bar, value=round(track_progress / duration * 100, 1))  # 0.1% steps, finer changes are not visible
+    view_model.set(text_progress_start, text=format_time(int(track_progress // 1000)))
+    view_model.set(text_progress_end, text=format_time(int(duration // 1000)))
 
-                synced_lyrics_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)  # Scrollbar must be packed before lyrics canvas
-                canvas_synced_lyrics.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
-            elif lyrics is not None and lyrics["lyrics"] is not None:
-                print("Creating scrollable lyrics")
-                scroll_lyrics_listbox.insert(tk.END, "These lyrics are not synced yet.")
-                scroll_lyrics_listbox.insert(tk.END, "-------------------------------------")
-                for line in lyrics["lyrics"]:
-                    scroll_lyrics_listbox.insert(tk.END, line)
-                scroll_lyrics_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(5, 0))
-                scroll_lyrics_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+def show_playback_controls():  # Play, shuffle and repeat buttons for the shown state
+    view_model.set(button_play, image=asset_manager.get("pause" if playing else "play", 35))
+    view_model.set(button_shuffle, image=asset_manager.get("shuffle_selected" if shuffle else "shuffle", 15))
+    view_model.set(button_repeat, image=asset_manager.get(f"repeat_{repeat}" if repeat is not None else "repeat_off", 15))
 
-            else:
-                print("No lyrics")
-                lyrics_center_text.config(text="Lyrics Unavailable")
-                frame_lyrics_info.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
 
-            root.update()
+def set_button_image(button, image):  # Hover images are set outside the view model, the next snapshot reapplies the state image
+    button.config(image=image)
+    view_model.invalidate(button)
+
+
+def show_skip():  # A skipped track starts at 0 until a poll shows the new one, committed by the frame the click wakes
+    if track_info is not None:
+        set_progress(0, track_info["duration_ms"])
+
+
+def wake_updater():  # Runs the updater right away instead of waiting for its next deadline, e.g. after user input
+    global root_after_id
+    if root_after_id is not None:
+        root.after_cancel(root_after_id)
+    root_after_id = root.after(0, updater)
+
+
+def when_done(future, callback):  # Runs callback(result) on the Tk thread once a background startup task has finished
+    if not future.done():
+        root.after(10, when_done, future, callback)
+        return
+    try:
+        result = future.result()
+    except Exception as exception:
+        print(f"Startup task failed: {exception}")
+        return
+    callback(result)
+
 
-    root_after_id = root.after(15, updater)
+def report_startup(event):  # Records a startup milestone, the first one prints the startup phases with --startup-trace
+    if startup_trace.reported:
+        return
+    root.update_idletasks()  # Paint what the updater just committed first
+    startup_trace.event(event)
+    if arguments.startup_trace:
+        startup_trace.report()
 
 
 if __name__ == "__main__":
     # Code start
     code_directory = os.path.dirname(os.path.realpath(__file__))
+    cache_directory = get_cache_directory()
+
+    parser = argparse.ArgumentParser(description="Spotify Surface")
+    parser.add_argument("--record-trace", metavar="PATH", help="Record Spotify polls and Musixmatch responses for core.replay, e.g. trace.jsonl.gz")
+    parser.add_argument("--startup-trace", action="store_true", help="Print the startup phases once the first playback poll is rendered")
+    arguments = parser.parse_args()
+    startup_trace = StartupTrace(startup_time)  # Main thread phases, and the token, monitor and asset loading running beside them
+    startup_trace.mark("imports")
+    trace_recorder = TraceRecorder(arguments.record_trace) if arguments.record_trace else None
 
     load_dotenv()
 
-    musixmatch_base_url = "https://apic-desktop.musixmatch.com/ws/1.1/macro.subtitles.get?format=json&namespace=lyrics_richsynched&subtitle_format=musixmatchm&app_id=web-desktop-app-v1.0&"
-    # noinspection SpellCheckingInspection
-    musixmatch_headers = {"authority": "apic-desktop.musixmatch.com", "cookie": "x-musixmatchm-token-guid="}
     custom_musixmatch_token = os.getenv("MUSIXMATCH_TOKEN")
-    # noinspection SpellCheckingInspection
-    # If you do not have a musixmatch token, then use the following public token. This may not work 100% of the time.
-    musixmatch_token = custom_musixmatch_token if custom_musixmatch_token else "2203269256ff7abcb649269df00e14c833dbf4ddfb5b36a1aae8b0"
+    musixmatch_token = custom_musixmatch_token if custom_musixmatch_token else musixmatch.public_token
+    lyrics_cache = LyricsCache(os.path.join(cache_directory, "lyrics_cache.sqlite3"), encode=encode_lyrics, decode=decode_lyrics)  # Persistent lyrics cache keyed by track URI
     spotify_refresh_token = os.getenv("SPOTIFY_REFRESH_TOKEN")
     spotify_base64_token = os.getenv("SPOTIFY_BASE64_TOKEN")
-    spotify_access_token = spotifyapi_refresh_token()
-    spotify_last_refresh_time = time.time()
+    request_policy = RequestPolicy()  # Circuit breakers and request budget shared by Spotify and Musixmatch
+    request_policy.configure("musixmatch", failure_threshold=1, base_delay=10)  # Back off from 10 s on the first rate limit
+    spotify_client = SpotifyClient(spotify_refresh_token, spotify_base64_token, token_path=os.path.join(cache_directory, "spotify_token.json"), policy=request_policy)  # Pooled keep-alive session shared by polling and controls
+    spotify_client.warm_up()
+    musixmatch_provider = MusixmatchProvider(musixmatch_token, requests.Session(), request_policy, trace_recorder)  # Lyric lookups and the 403 fallback, own keep-alive session
+    spotify_client.tokens.start()  # Refreshes in the background ahead of expiry, a saved token that is still valid is used right away
 
     track_info = None
     lyrics = None
     previous_track_info = None
     previous_not_playing = False
-    track_start_time = time.time()
+    playback_clock = PlaybackClock()  # Monotonic track progress between polls
     playing = None
     shuffle = None
     repeat = None
@@ -1021,30 +676,27 @@ if __name__ == "__main__":
     text_artists_slide_queued = False
     text_next_slide = None
 
-    last_api_call_time = 0
+    last_snapshot_version = None
 
-    lyric_fail_reattempt_time = 10  # Lyric failed reattempt time in seconds
-    schedule_retry_lyric_fetch_time = None  # None if retry not scheduled. Integer (time in epoch) if fetch is scheduled
-    lyric_fetch_attempt = None  # None if completed or not fetched. Integer if fetch needed
+    lyrics_retry_pending = False  # True if the lookup was rate limited, retried once the Musixmatch breaker allows it
+    request_notification_text = None  # Notification shown for open circuit breakers
+    notified_endpoints = ("GET /me/player", "GET /me/player/currently-playing", "POST /api/token")  # Playback polls and the token, a failing queue read or command does not make Spotify unavailable
 
     selected_lyric_line = None
+    lyrics_timeline = None
     rectangle_created = False
     rectangle_status = None
-    rectangle = None
-    original_rect = None
-    rect_x1, rect_y1, rect_x2, rect_y2 = 0, 0, 0, 0
     target_x1, target_y1, target_x2, target_y2 = 0, 0, 0, 0
     lyrics_height = None
 
     automatic_scroll = True
     previous_auto_scroll_fraction = None
     target_fraction = None
-    start_fraction = None
 
     # The speed of which animations play
     animation_acceleration = {
         # At x percent completed, the animation will move y percent.
-        # Values must add up to 100
+        # Values are normalized to the total
         # e.g. At 10% animation completed, the animation will move 6% of the total distance required.
         0: 4,
         10: 6,
@@ -1057,22 +709,33 @@ if __name__ == "__main__":
         80: 6,
         90: 4,
     }
-    if sum(dict.values(animation_acceleration)) != 100:
-        print("Animation acceleration invalid. Values do not add up to 100.")
-        if sum(dict.values(animation_acceleration)) < 100:
-            print("Acceleration will be slower than excepted. Values towards the end will be used more than expected.")
-        else:
-            print("Acceleration will be faster than excepted. Values towards the end will not be used.")
-
-    images = []
-    lyrics_text_list = []
-
-    root_after_id = None  # Unused
-    multiprocessing_process_id = None  # Ends multiprocessing thread on exit
+    animation_curve = AccelerationCurve(animation_acceleration)
+    animation_duration = 0.2  # Seconds, independent of the frame rate. The frame-stepped animation took about as long at 15 ms frames
+    tween_engine = TweenEngine()  # Rectangle and automatic scroll animations
+
+    root_after_id = None  # Pending updater call, cancelled by wake_updater()
+    frame_profiler = FrameProfiler()  # Per-section updater cost, printed on exit
+    frame_scheduler = FrameScheduler()  # Picks the next updater run from animation, lyric, progress and poll deadlines
+    lyrics_job_runner = JobRunner("LyricsJob")  # Lyric lookups for the current song, off the Tk thread
+    lyrics_loader = LyricsLoader(lyrics_cache, lyrics_job_runner, musixmatch_provider.get_lyrics)  # Cache first, then a lookup job
+    lyrics_prefetcher = LyricsPrefetcher(spotify_client, prefetch_lyrics, depth=3)  # Background lyric prefetch for the upcoming queue
+    poll_scheduler = PollScheduler()  # Picks the next poll time from the playback state
+    playback_poller = PlaybackPoller(functools.partial(fetch_playback_snapshot, spotify_client, trace_recorder), poll_scheduler)  # Background thread polling the Spotify API
+    playback_poller.start()  # The first poll runs while the window is built, the updater picks it up as soon as it starts
+    # Control buttons update right away, commands are coalesced and sent in the background, a poll shortly after confirms them
+    command_dispatcher = CommandDispatcher(functools.partial(send_playback_command, spotify_client, musixmatch_provider, on_success=playback_poller.poke))
+    media_session = media.MediaSession(on_media_session_change)  # Local track and playback changes without polling and media keys, started with the updater
     override_cancel = False  # Cancel updater if True
 
+    # Startup work that does not need Tk runs in the background while the window is built
+    startup_executor = concurrent.futures.ThreadPoolExecutor(max_workers=3, thread_name_prefix="Startup")
+    startup_executor.submit(startup_trace.timed, "token", spotify_client.tokens.get_token)  # Shared with the first poll, only one refresh is sent
+    monitors_future = startup_executor.submit(startup_trace.timed, "monitors", get_monitors)
+    startup_trace.mark("core")
+
     # GUI creation start
     root = tk.Tk()
+    view_model = ViewModel(root)  # Applies only the widget options that changed since the last frame
     root.overrideredirect(True)
     root.attributes("-topmost", True)
     root.resizable(True, True)
@@ -1083,14 +746,20 @@ if __name__ == "__main__":
     root.wm_attributes("-transparentcolor", "grey")
 
     sv_ttk.set_theme("light")
-
-    # Get monitor resolution
+    startup_trace.mark("window")
+
+    # Decode and resize every icon once in the background, hover swaps reuse the cached images. Buttons show placeholders until then
+    asset_manager = AssetManager.for_root(root, f"{code_directory}/assets")
+    startup_assets = ([(name, 15) for name in ["backward", "backward_hover", "forward", "forward_hover", "shuffle", "shuffle_hover", "shuffle_selected", "shuffle_selected_hover",
+                                               "repeat_off", "repeat_off_hover", "repeat_context", "repeat_context_hover", "repeat_track", "repeat_track_hover"]]
+                      + [(name, 35) for name in ["play", "play_hover", "pause", "pause_hover"]]
+                      + [(name, 25) for name in ["scroll", "scroll_hover"]])
+    assets_future = startup_executor.submit(startup_trace.timed, "assets", asset_manager.prepare, startup_assets)
+    startup_executor.shutdown(wait=False)
+
+    # Monitor resolution, until the monitors are found in the background
     monitor_width = 1920
     monitor_height = 1080
-    for monitor in get_monitors():
-        if monitor.is_primary:
-            monitor_width = monitor.width
-            monitor_height = monitor.height
 
     # Default window size
     geometry = (250, 325)
@@ -1100,14 +769,14 @@ if __name__ == "__main__":
     # Set window size and move to bottom right
     root.geometry(f"{geometry[0]}x{geometry[1]}+{monitor_width - geometry[0]}+{monitor_height - geometry[1] - taskbar_offset}")
     root.minsize(175, 225)
-    root.update()
+    root.update()  # Show the empty window right away, the widgets are laid out before the next paint
+    startup_trace.mark("first_paint")
 
     root.grid_columnconfigure(0, weight=1)  # Force whole column to be the same as root
 
     # Create top bar canvas
     canvas_topbar = tk.Canvas(root, bg="white", highlightthickness=0)
     canvas_topbar.grid(row=0, column=0, sticky="nsew")
-    root.update()
 
     # Create Track Title
     text_total_height = 0
@@ -1149,7 +818,6 @@ if __name__ == "__main__":
     minimize_button.bind("<Enter>", lambda event: minimize_button_on_hover())
     minimize_button.bind("<Leave>", lambda event: minimize_button_on_unhover())
     minimize_button.place(anchor=tk.NE, x=-16, y=6, rely=0, relx=1.0)
-    root.update()
 
     # Create Exit Button
     def exit_button_on_hover():
@@ -1163,14 +831,34 @@ if __name__ == "__main__":
     def exit_button_on_click():
         print("=======================")
         print("Started exit procedure")
-        if multiprocessing_process_id is not None:
-            # noinspection PyUnresolvedReferences
-            multiprocessing_process_id.terminate()
-            print("Terminated multiprocessing thread")
-        # Clear json file
-        print("Clearing API data file")
-        with open(f"{code_directory}\\api_data.json", "w+") as file:
-            json.dump({}, file, indent=4)
+        playback_poller.stop()
+        media_session.stop()
+        print("Stopped playback poller")
+        if trace_recorder is not None:
+            trace_recorder.close()
+        print(f"Spotify API latency: {spotify_client.get_latency_stats()}")
+        print(f"Spotify token: {spotify_client.tokens.get_stats()}")
+        print(f"Request policy: {request_policy.get_stats()}")
+        print(f"Updater frame cost: {frame_profiler.get_stats()}")
+        print(f"Poll scheduler: {poll_scheduler.get_stats()}")
+        print(f"Media session: {media_session.get_stats()}")
+        print(f"Playback commands: {command_dispatcher.get_stats()}")
+        print(f"Playback clock: {playback_clock.get_stats()}")
+        print(f"Lyrics cache: {lyrics_cache.get_stats()}")
+        print(f"Lyrics prefetcher: {lyrics_prefetcher.get_stats()}")
+        print(f"Lyrics jobs: {lyrics_job_runner.get_stats()}")
+        print(f"Assets: {asset_manager.get_stats()}")
+        print(f"Tweens: {tween_engine.get_stats()}")
+        print(f"Lyrics view: {lyrics_view.get_stats()}")
+        print(f"Text layout: {text_layout.get_stats()}")
+        print(f"Frame scheduler: {frame_scheduler.get_stats()}")
+        print(f"Widget updates: {view_model.get_stats()}")
+        command_dispatcher.close()
+        lyrics_job_runner.close()
+        lyrics_prefetcher.close()
+        lyrics_cache.close()
+        spotify_client.close()
+        musixmatch_provider.close()
         # Destroy root and exit
         print("Destroying root and exiting...")
         root.destroy()
@@ -1183,54 +871,46 @@ if __name__ == "__main__":
     exit_button.bind("<Enter>", lambda event: exit_button_on_hover())
     exit_button.bind("<Leave>", lambda event: exit_button_on_unhover())
     exit_button.place(anchor=tk.NE, x=0, y=6, rely=0, relx=1.0)
-    root.update()
 
     # Create middle canvas
     canvas_middle = tk.Canvas(root, bg="#f0f0f0", highlightthickness=0)
     canvas_middle.grid(row=1, column=0, sticky="nsew")
     root.grid_rowconfigure(1, weight=1)  # Expand row
-    root.update()
 
     # Create synced lyrics
     # noinspection PyUnusedLocal
     def resize(event):
-        global lyrics_height, rectangle_status
-        lyrics_height = 0
-
-        for text in lyrics_text_list:
-            canvas_synced_lyrics.itemconfig(text, width=canvas_synced_lyrics.winfo_width() - 10)  # Max text width (-10 px for scroll bar)
-            text_coordinates = canvas_synced_lyrics.bbox(text)
-            canvas_synced_lyrics.coords(text, 5, lyrics_height)
-            lyrics_height += canvas_synced_lyrics.bbox(text)[3] - canvas_synced_lyrics.bbox(text)[1]
-            lyrics_height += 2  # 2 px line spacing
-        root.update()
-
-        # Set scroll region
-        canvas_synced_lyrics_bbox = list(canvas_synced_lyrics.bbox("all"))
-        canvas_synced_lyrics_bbox[0] = canvas_synced_lyrics_bbox[0] - 5  # 5 px margin left
-        canvas_synced_lyrics_bbox[1] = canvas_synced_lyrics_bbox[1] - 5  # 5 px margin top
-        canvas_synced_lyrics_bbox = tuple(canvas_synced_lyrics_bbox)  # Tuple needs to be converted to list then back to be edited
-        canvas_synced_lyrics.configure(scrollregion=canvas_synced_lyrics_bbox)
-
-        # TODO Re-render rectangle
+        lyrics_view.schedule_resize(event.width)  # Coalesced, re-wraps the lines near the viewport
+        wake_updater()
 
     def on_mouse_wheel(event):
         canvas_synced_lyrics.yview_scroll(int(-1 * (event.delta / 120)), "units")
+        lyrics_view.render()
         cancel_automatic_scroll()
 
+    def on_synced_lyrics_scroll(*args):  # Scroll bar command
+        canvas_synced_lyrics.yview(*args)
+        lyrics_view.render()
+
     # noinspection PyUnusedLocal
     def cancel_automatic_scroll(event=None):
         global automatic_scroll
         if automatic_scroll:
             print("Cancelling automatic scroll")
             automatic_scroll = False
+            tween_engine.cancel("scroll")
+            wake_updater()
 
     canvas_synced_lyrics = tk.Canvas(canvas_middle, bg="#f0f0f0", highlightthickness=0)
     canvas_synced_lyrics.bind("<Configure>", resize)
+    highlight_rectangle = HighlightRectangle(canvas_synced_lyrics, "#000000", alpha=.3)  # Lyric highlight, reused every frame
+    lyrics_font_family = tk.font.nametofont("TkDefaultFont").actual()["family"]
+    text_layout = TextLayout(root)  # Wraps and measures lyric lines in Python, memoized across resizes and songs
+    lyrics_view = LyricsView(canvas_synced_lyrics, on_layout=on_lyrics_layout, measure=text_layout.measure)  # Canvas items only for lines near the viewport
     canvas_synced_lyrics.bind("<MouseWheel>", on_mouse_wheel)
 
     synced_lyrics_scrollbar = tk.Scrollbar(canvas_middle, orient=tk.VERTICAL)
-    synced_lyrics_scrollbar.config(command=canvas_synced_lyrics.yview)
+    synced_lyrics_scrollbar.config(command=on_synced_lyrics_scroll)
     canvas_synced_lyrics.config(yscrollcommand=synced_lyrics_scrollbar.set)
     synced_lyrics_scrollbar.bind("<Button-1>", cancel_automatic_scroll)
 
@@ -1251,27 +931,28 @@ if __name__ == "__main__":
     lyrics_center_subtitle.grid(row=1, column=0, sticky="nsew")
 
     def auto_scroll_button_on_hover():
-        image = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/scroll_hover.png").resize((25, 25), Image.Resampling.LANCZOS))
-        lyrics_enable_auto_scroll.config(image=image)
-        lyrics_enable_auto_scroll.photo = image
+        image = asset_manager.get("scroll_hover", 25)
+        set_button_image(lyrics_enable_auto_scroll, image)
         if lyrics_enable_auto_scroll["state"] == tk.DISABLED:
             canvas_middle.config(cursor="no")
         else:
             canvas_middle.config(cursor="hand2")
 
     def auto_scroll_button_on_unhover():
-        image = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/scroll.png").resize((25, 25), Image.Resampling.LANCZOS))
-        lyrics_enable_auto_scroll.config(image=image)
-        lyrics_enable_auto_scroll.photo = image
+        image = asset_manager.get("scroll", 25)
+        set_button_image(lyrics_enable_auto_scroll, image)
         canvas_middle.config(cursor="")
 
     def auto_scroll_button_on_click():
-        global automatic_scroll
+        global automatic_scroll, previous_auto_scroll_fraction, target_fraction
         print("Enabling automatic scroll")
         automatic_scroll = True
+        previous_auto_scroll_fraction = canvas_synced_lyrics.yview()[0]  # Scroll back from where the user left it
+        target_fraction = None
         lyrics_enable_auto_scroll.place_forget()
+        wake_updater()
 
-    temp_image = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/scroll.png").resize((25, 25), Image.Resampling.LANCZOS))
+    temp_image = asset_manager.get_placeholder(25)
     lyrics_enable_auto_scroll = tk.Button(canvas_middle, image=temp_image, borderwidth=0, bg="#ffffff", compound="center", command=auto_scroll_button_on_click)
     lyrics_enable_auto_scroll.bind("<Enter>", lambda event: auto_scroll_button_on_hover())
     lyrics_enable_auto_scroll.bind("<Leave>", lambda event: auto_scroll_button_on_unhover())
@@ -1280,16 +961,13 @@ if __name__ == "__main__":
     canvas_notification = tk.Canvas(root, bg="white", highlightthickness=0, height=0)
     canvas_notification.grid_forget()
     root.grid_rowconfigure(2, weight=0)  # Shrink if possible
-    root.update()
 
     notification_text = tk.Label(canvas_notification, text="", bg="white", anchor="w")
     # notification_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-    root.update()
 
     # Create bottom bar canvas
     canvas_bottompanel = tk.Canvas(root, bg="white", highlightthickness=0)
     canvas_bottompanel.grid(row=3, column=0, sticky="nsew")
-    root.update()
 
     progress_bar = ttk.Progressbar(canvas_bottompanel, value=0, mode="determinate")
     progress_bar.pack(side=tk.TOP, fill=tk.X, expand=True, padx=5, pady=1)
@@ -1299,49 +977,42 @@ if __name__ == "__main__":
     frame_controls.grid_columnconfigure(1, weight=0)
     frame_controls.grid_columnconfigure(2, weight=1)
     frame_controls.pack(fill=tk.X, expand=True, padx=5)
-    root.update()
 
     # Create a frame for 3 playback buttons: backward, play, forward. A grid is placed into this frame.
     frame_playbackbuttons = tk.Frame(frame_controls, bg="white")
     frame_playbackbuttons.grid(row=0, column=1, sticky=tk.N)
-    root.update()
 
     # Backward button
     def backward_button_on_hover():
-        image = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/backward_hover.png").resize((15, 15), Image.Resampling.LANCZOS))
-        button_backward.config(image=image)
-        button_backward.photo = image
+        image = asset_manager.get("backward_hover", 15)
+        set_button_image(button_backward, image)
         if button_backward["state"] == tk.DISABLED:
             frame_playbackbuttons.config(cursor="no")
         else:
             frame_playbackbuttons.config(cursor="hand2")
 
     def backward_button_on_unhover():
-        image = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/backward.png").resize((15, 15), Image.Resampling.LANCZOS))
-        button_backward.config(image=image)
-        button_backward.photo = image
+        image = asset_manager.get("backward", 15)
+        set_button_image(button_backward, image)
         frame_playbackbuttons.config(cursor="")
 
     def backward_button_on_click():
+        click_time = time.perf_counter()
         # Playing on current device
-        current_media_info = asyncio.run(get_media_info())
+        current_media_info = media_session.get_media_info()  # Cached, refreshed on every media session change
         print(f"Reading current media info: {current_media_info}")
         # noinspection PyUnresolvedReferences
-        if current_media_info is not None and track_info is not None and current_media_info["title"] == track_info["track_name"]:
-            print("Sending previous track keypress directly from device...")
-            win32api.keybd_event(win32con.VK_MEDIA_PREV_TRACK, 0, win32con.KEYEVENTF_EXTENDEDKEY, 0)  # Next track button, from numerical keypad
+        if current_media_info is not None and track_info is not None and current_media_info["title"] == track_info["track_name"] and media_session.send_media_key("previous", click_time):
+            print("Sent previous track keypress directly from device")
+            playback_poller.poke()  # Poll shortly after to reflect the change
         # Not playing on current device
         else:
-            print("Sending request to play previous song...")
-            response = requests.post("https://api.spotify.com/v1/me/player/previous",
-                                     headers={"Authorization": f"Bearer {spotify_access_token}"})
-            print("Posted request with response:")
-            print(f"\033[90mCode {response.status_code}: {response.reason}\033[0m")
-            with contextlib.suppress(json.decoder.JSONDecodeError):
-                print(f"\033[90m{response.json()}\033[0m")
-            # Success code 204
-
-    image_backward = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/backward.png").resize((15, 15), Image.Resampling.LANCZOS))
+            print("Requesting to play previous song...")
+            command_dispatcher.skip(-1, track_info["uri"] if track_info is not None else None, click_time)  # Sent in the background, rapid clicks as one burst
+            show_skip()
+        wake_updater()
+
+    image_backward = asset_manager.get_placeholder(15)
     button_backward = tk.Button(frame_playbackbuttons, image=image_backward, borderwidth=0, bg="white", compound="center", command=backward_button_on_click)
     button_backward.bind("<Enter>", lambda event: backward_button_on_hover())
     button_backward.bind("<Leave>", lambda event: backward_button_on_unhover())
@@ -1350,11 +1021,10 @@ if __name__ == "__main__":
     # Play button
     def play_button_on_hover():
         if playing:
-            image = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/pause_hover.png").resize((35, 35), Image.Resampling.LANCZOS))
+            image = asset_manager.get("pause_hover", 35)
         else:
-            image = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/play_hover.png").resize((35, 35), Image.Resampling.LANCZOS))
-        button_play.config(image=image)
-        button_play.photo = image
+            image = asset_manager.get("play_hover", 35)
+        set_button_image(button_play, image)
         if button_play["state"] == tk.DISABLED:
             frame_playbackbuttons.config(cursor="no")
         else:
@@ -1362,55 +1032,31 @@ if __name__ == "__main__":
 
     def play_button_on_unhover():
         if playing:
-            image = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/pause.png").resize((35, 35), Image.Resampling.LANCZOS))
+            image = asset_manager.get("pause", 35)
         else:
-            image = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/play.png").resize((35, 35), Image.Resampling.LANCZOS))
-        button_play.config(image=image)
-        button_play.photo = image
+            image = asset_manager.get("play", 35)
+        set_button_image(button_play, image)
         frame_playbackbuttons.config(cursor="")
 
     def play_button_on_click():
+        global playing
+        click_time = time.perf_counter()
         # Playing on current device
-        current_media_info = asyncio.run(get_media_info())
+        current_media_info = media_session.get_media_info()  # Cached, refreshed on every media session change
         print(f"Reading current media info: {current_media_info}")
         # noinspection PyUnresolvedReferences
-        if current_media_info is not None and track_info is not None and current_media_info["title"] == track_info["track_name"]:
-            print("Sending play/pause track keypress directly from device...")
-            win32api.keybd_event(win32con.VK_MEDIA_PLAY_PAUSE, 0, win32con.KEYEVENTF_EXTENDEDKEY, 0)  # Play/Pause button, from numerical keypad
+        if current_media_info is not None and track_info is not None and current_media_info["title"] == track_info["track_name"] and media_session.send_media_key("play_pause", click_time):
+            print("Sent play/pause track keypress directly from device")
+            playback_poller.poke()  # Poll shortly after to reflect the change
         # Not playing on current device
         else:
-            if playing:  # Currently playing, pause playback
-                print("Currently playing, pausing playback...")
-                response = requests.put("https://api.spotify.com/v1/me/player/pause",
-                                        headers={"Authorization": f"Bearer {spotify_access_token}"})
-            else:  # Currently paused, start playback
-                print("Currently paused, starting playback...")
-                response = requests.put("https://api.spotify.com/v1/me/player/play",
-                                        headers={"Authorization": f"Bearer {spotify_access_token}"})
-            print("Posted request with response:")
-            print(f"\033[90mCode {response.status_code}: {response.reason}\033[0m")
-            with contextlib.suppress(json.decoder.JSONDecodeError):
-                print(f"\033[90m{response.json()}\033[0m")
-            # Success code 204
-
-            if response.status_code == 403:
-                print("403 Forbidden, attempting to retry using Musixmatch API")
-                if playing:  # Currently playing, pause playback
-                    print("Currently playing, pausing playback...")
-                    # noinspection SpellCheckingInspection
-                    response = requests.put(f"https://apic-desktop.musixmatch.com/ws/1.1/spotify.resource?app_id=web-desktop-app-v1.0&usertoken={musixmatch_token}&resource=me%2Fplayer%2Fpause",
-                                            headers=musixmatch_headers)
-                else:  # Currently paused, start playback
-                    print("Currently paused, starting playback...")
-                    # noinspection SpellCheckingInspection
-                    response = requests.put(f"https://apic-desktop.musixmatch.com/ws/1.1/spotify.resource?app_id=web-desktop-app-v1.0&usertoken={musixmatch_token}&resource=me%2Fplayer%2Fplay",
-                                            headers=musixmatch_headers)
-                print("Posted request with response:")
-                print(f"\033[90mCode {response.status_code}: {response.reason}\033[0m")
-                with contextlib.suppress(json.decoder.JSONDecodeError):
-                    print(f"\033[90m{response.json()}\033[0m")
-
-    image_play = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/play.png").resize((35, 35), Image.Resampling.LANCZOS))
+            print("Currently playing, pausing playback..." if playing else "Currently paused, starting playback...")
+            command_dispatcher.set("playing", not playing, playing, click_time)  # Sent in the background, reconciled with the next polls
+            playing = not playing
+            play_button_on_hover()  # Hover image of the new state, the frame the click wakes marks it rendered
+        wake_updater()
+
+    image_play = asset_manager.get_placeholder(35)
     button_play = tk.Button(frame_playbackbuttons, image=image_play, borderwidth=0, bg="white", compound="center", command=play_button_on_click)
     button_play.bind("<Enter>", lambda event: play_button_on_hover())
     button_play.bind("<Leave>", lambda event: play_button_on_unhover())
@@ -1418,40 +1064,35 @@ if __name__ == "__main__":
 
     # Forward button
     def forward_button_on_hover():
-        image = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/forward_hover.png").resize((15, 15), Image.Resampling.LANCZOS))
-        button_forward.config(image=image)
-        button_forward.photo = image
+        image = asset_manager.get("forward_hover", 15)
+        set_button_image(button_forward, image)
         if button_forward["state"] == tk.DISABLED:
             frame_playbackbuttons.config(cursor="no")
         else:
             frame_playbackbuttons.config(cursor="hand2")
 
     def forward_button_on_unhover():
-        image = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/forward.png").resize((15, 15), Image.Resampling.LANCZOS))
-        button_forward.config(image=image)
-        button_forward.photo = image
+        image = asset_manager.get("forward", 15)
+        set_button_image(button_forward, image)
         frame_playbackbuttons.config(cursor="")
 
     def forward_button_on_click():
+        click_time = time.perf_counter()
         # Playing on current device
-        current_media_info = asyncio.run(get_media_info())
+        current_media_info = media_session.get_media_info()  # Cached, refreshed on every media session change
         print(f"Reading current media info: {current_media_info}")
         # noinspection PyUnresolvedReferences
-        if current_media_info is not None and track_info is not None and current_media_info["title"] == track_info["track_name"]:
-            print("Sending next track keypress directly from device...")
-            win32api.keybd_event(win32con.VK_MEDIA_NEXT_TRACK, 0, win32con.KEYEVENTF_EXTENDEDKEY, 0)  # Next track button, from numerical keypad
+        if current_media_info is not None and track_info is not None and current_media_info["title"] == track_info["track_name"] and media_session.send_media_key("next", click_time):
+            print("Sent next track keypress directly from device")
+            playback_poller.poke()  # Poll shortly after to reflect the change
         # Not playing on current device
         else:
-            print("Sending request to play next song...")
-            response = requests.post("https://api.spotify.com/v1/me/player/next",
-                                     headers={"Authorization": f"Bearer {spotify_access_token}"})
-            print("Posted request with response:")
-            print(f"\033[90mCode {response.status_code}: {response.reason}\033[0m")
-            with contextlib.suppress(json.decoder.JSONDecodeError):
-                print(f"\033[90m{response.json()}\033[0m")
-            # Success code 204
-
-    image_forward = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/forward.png").resize((15, 15), Image.Resampling.LANCZOS))
+            print("Requesting to play next song...")
+            command_dispatcher.skip(1, track_info["uri"] if track_info is not None else None, click_time)  # Sent in the background, rapid clicks as one burst
+            show_skip()
+        wake_updater()
+
+    image_forward = asset_manager.get_placeholder(15)
     button_forward = tk.Button(frame_playbackbuttons, image=image_forward, borderwidth=0, bg="white", compound="center", command=forward_button_on_click)
     button_forward.bind("<Enter>", lambda event: forward_button_on_hover())
     button_forward.bind("<Leave>", lambda event: forward_button_on_unhover())
@@ -1466,11 +1107,10 @@ if __name__ == "__main__":
 
     def shuffle_button_on_hover():
         if shuffle:
-            image = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/shuffle_selected_hover.png").resize((15, 15), Image.Resampling.LANCZOS))
+            image = asset_manager.get("shuffle_selected_hover", 15)
         else:
-            image = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/shuffle_hover.png").resize((15, 15), Image.Resampling.LANCZOS))
-        button_shuffle.config(image=image)
-        button_shuffle.photo = image
+            image = asset_manager.get("shuffle_hover", 15)
+        set_button_image(button_shuffle, image)
         if button_shuffle["state"] == tk.DISABLED:
             frame_controls_left.config(cursor="no")
         else:
@@ -1478,31 +1118,22 @@ if __name__ == "__main__":
 
     def shuffle_button_on_unhover():
         if shuffle:
-            image = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/shuffle_selected.png").resize((15, 15), Image.Resampling.LANCZOS))
+            image = asset_manager.get("shuffle_selected", 15)
         else:
-            image = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/shuffle.png").resize((15, 15), Image.Resampling.LANCZOS))
-        button_shuffle.config(image=image)
-        button_shuffle.photo = image
+            image = asset_manager.get("shuffle", 15)
+        set_button_image(button_shuffle, image)
         frame_playbackbuttons.config(cursor="")
 
     def shuffle_button_on_click():
-        if shuffle:  # Currently shuffle enabled, disable shuffle
-            print("Currently shuffle enabled, disabling shuffle...")
-            response = requests.put("https://api.spotify.com/v1/me/player/shuffle",
-                                    headers={"Authorization": f"Bearer {spotify_access_token}"},
-                                    params={"state": False})
-        else:  # Currently shuffle disabled, enabled shuffle
-            print("Currently shuffle disabled, enabling shuffle...")
-            response = requests.put("https://api.spotify.com/v1/me/player/shuffle",
-                                    headers={"Authorization": f"Bearer {spotify_access_token}"},
-                                    params={"state": True})
-        print("Posted request with response:")
-        print(f"\033[90mCode {response.status_code}: {response.reason}\033[0m")
-        with contextlib.suppress(json.decoder.JSONDecodeError):
-            print(f"\033[90m{response.json()}\033[0m")
-        # Success code 204
-
-    image_shuffle = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/shuffle.png").resize((15, 15), Image.Resampling.LANCZOS))
+        global shuffle
+        click_time = time.perf_counter()
+        print("Currently shuffle enabled, disabling shuffle..." if shuffle else "Currently shuffle disabled, enabling shuffle...")
+        command_dispatcher.set("shuffle", not shuffle, shuffle, click_time)  # Sent in the background, reconciled with the next polls
+        shuffle = not shuffle
+        shuffle_button_on_hover()  # Hover image of the new state, the frame the click wakes marks it rendered
+        wake_updater()
+
+    image_shuffle = asset_manager.get_placeholder(15)
     button_shuffle = tk.Button(frame_controls_left, image=image_shuffle, borderwidth=0, bg="white", compound="center", command=shuffle_button_on_click)
     button_shuffle.bind("<Enter>", lambda event: shuffle_button_on_hover())
     button_shuffle.bind("<Leave>", lambda event: shuffle_button_on_unhover())
@@ -1517,11 +1148,10 @@ if __name__ == "__main__":
 
     def repeat_button_on_hover():
         if repeat is not None:
-            image = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/repeat_{repeat}_hover.png").resize((15, 15), Image.Resampling.LANCZOS))
+            image = asset_manager.get(f"repeat_{repeat}_hover", 15)
         else:
-            image = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/repeat_off_hover.png").resize((15, 15), Image.Resampling.LANCZOS))
-        button_repeat.config(image=image)
-        button_repeat.photo = image
+            image = asset_manager.get("repeat_off_hover", 15)
+        set_button_image(button_repeat, image)
         if button_repeat["state"] == tk.DISABLED:
             frame_controls_right.config(cursor="no")
         else:
@@ -1529,36 +1159,30 @@ if __name__ == "__main__":
 
     def repeat_button_on_unhover():
         if repeat is not None:
-            image = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/repeat_{repeat}_hover.png").resize((15, 15), Image.Resampling.LANCZOS))
+            image = asset_manager.get(f"repeat_{repeat}", 15)
         else:
-            image = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/repeat_off_hover.png").resize((15, 15), Image.Resampling.LANCZOS))
-        button_repeat.config(image=image)
-        button_repeat.photo = image
+            image = asset_manager.get("repeat_off", 15)
+        set_button_image(button_repeat, image)
         frame_controls_right.config(cursor="")
 
     def repeat_button_on_click():
+        global repeat
+        click_time = time.perf_counter()
         if repeat == "off":  # Currently repeat off, set repeat to context
             print("Currently repeat off, setting repeat to context...")
-            response = requests.put("https://api.spotify.com/v1/me/player/repeat",
-                                    headers={"Authorization": f"Bearer {spotify_access_token}"},
-                                    params={"state": "context"})
+            target_repeat = "context"
         elif repeat == "context":  # Currently repeat context, set repeat to track
             print("Currently repeat context, set repeat to track...")
-            response = requests.put("https://api.spotify.com/v1/me/player/repeat",
-                                    headers={"Authorization": f"Bearer {spotify_access_token}"},
-                                    params={"state": "track"})
+            target_repeat = "track"
         else:  # Currently repeat track, set repeat to off
             print("Currently repeat track, setting repeat to off...")
-            response = requests.put("https://api.spotify.com/v1/me/player/repeat",
-                                    headers={"Authorization": f"Bearer {spotify_access_token}"},
-                                    params={"state": "off"})
-        print("Posted request with response:")
-        print(f"\033[90mCode {response.status_code}: {response.reason}\033[0m")
-        with contextlib.suppress(json.decoder.JSONDecodeError):
-            print(f"\033[90m{response.json()}\033[0m")
-        # Success code 204
-
-    image_repeat = ImageTk.PhotoImage(Image.open(f"{code_directory}/assets/repeat_off.png").resize((15, 15), Image.Resampling.LANCZOS))
+            target_repeat = "off"
+        command_dispatcher.set("repeat", target_repeat, repeat, click_time)  # Cycling quickly sends only the final state
+        repeat = target_repeat
+        repeat_button_on_hover()  # Hover image of the new state, the frame the click wakes marks it rendered
+        wake_updater()
+
+    image_repeat = asset_manager.get_placeholder(15)
     button_repeat = tk.Button(frame_controls_right, image=image_repeat, borderwidth=0, bg="white", compound="center", command=repeat_button_on_click)
     button_repeat.bind("<Enter>", lambda event: repeat_button_on_hover())
     button_repeat.bind("<Leave>", lambda event: repeat_button_on_unhover())
@@ -1624,8 +1248,35 @@ if __name__ == "__main__":
     def on_window_restore(event):
         if str(event) == "<Map event>":
             root.overrideredirect(True)
+            wake_updater()  # Deadlines were ignored while minimized
     root.bind("<Map>", on_window_restore)
-
+    root.bind("<<MediaSessionChanged>>", lambda event: wake_updater())
+    startup_trace.mark("widgets")
+
+    # Apply the background startup work once it finishes
+    def on_monitors_found(monitors):  # Move to the bottom right of the primary monitor
+        global monitor_width, monitor_height
+        for monitor in monitors:
+            if monitor.is_primary:
+                monitor_width = monitor.width
+                monitor_height = monitor.height
+        root.geometry(f"+{monitor_width - root.winfo_width()}+{monitor_height - root.winfo_height() - taskbar_offset}")
+        startup_trace.event("monitors_applied")
+
+    def on_assets_prepared(_):  # Swap the placeholders for the icons
+        asset_manager.preload(startup_assets)  # Only creates the PhotoImages, the decoding already ran in the background
+        set_button_image(button_backward, asset_manager.get("backward", 15))
+        set_button_image(button_forward, asset_manager.get("forward", 15))
+        set_button_image(lyrics_enable_auto_scroll, asset_manager.get("scroll", 25))
+        show_playback_controls()
+        startup_trace.event("assets_applied")
+        wake_updater()  # Commits the button images
+
+    when_done(monitors_future, on_monitors_found)
+    when_done(assets_future, on_assets_prepared)
+    root.after(15000, report_startup, "startup_timeout")  # Report anyway if Spotify does not answer
+
+    media_session.start()
     root_after_id = root.after(0, updater)
 
     root.mainloop()
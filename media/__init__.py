@@ -0,0 +1,135 @@
+# Platform media session backends. The backend is imported on first use, so the core and the Tk front end load
+# without winsdk, pywin32 or dbus-next, and platforms without one fall back to the Spotify Web API.
+# A backend module provides async connect(), returning a session that stays open with:
+#   async get_media_info()   Media info of the current session, None if there is none
+#   async send_media_key(key)   key: "previous" / "play_pause" / "next"
+#   async watch(on_change)   Calls on_change(info) with the current state and on every change until cancelled
+#   close()
+# Media info: {"title", "artist", "artists", "album_title", "art_url", "url", "uri", "duration_ms", "position_ms",
+#              "playing", "shuffle", "repeat", "event_time"}, uri is None if the session does not expose the Spotify URI.
+import asyncio
+import collections
+import importlib
+import sys
+import threading
+import time
+
+backends = {"win32": "media.windows", "linux": "media.mpris"}
+backend = None  # Platform module, False if the platform has none
+
+
+def get_backend():
+    global backend
+    if backend is None:
+        backend = False
+        if sys.platform in backends:
+            try:
+                backend = importlib.import_module(backends[sys.platform])
+            except ImportError as e:
+                print(f"\033[91m[ERROR] Media session unavailable: {e!r}\033[0m")
+    return backend
+
+
+def same_session_state(info, other):  # Equal apart from the position and the time it was read at
+    if info is None or other is None:
+        return info is other
+    return all(info[key] == other[key] for key in info if key not in ("position_ms", "event_time"))
+
+
+class MediaSession(object):
+    # Long-lived asyncio loop on a background thread holding the platform media session. The connection (session manager or
+    # session bus) stays open, the media info is cached and refreshed on every change notification, and media keys are sent
+    # on the loop, so the Tk thread only does non-blocking lookups.
+    # on_change(info) runs on the loop thread. The session is reconnected after retry_delay if the backend fails, e.g. before the bus is up.
+    def __init__(self, on_change=None, backend_module=None, retry_delay=5):
+        self.on_change = on_change
+        self.backend = backend_module  # Module with an async connect(), the platform backend if None
+        self.retry_delay = retry_delay
+        self.session = None  # Connected backend session, None while connecting
+        self.info = None  # Latest media info
+        self.event_count = 0
+        self.failures = 0
+        self.callback_durations = collections.deque(maxlen=1000)  # Seconds spent in on_change
+        self.key_latencies = collections.deque(maxlen=1000)  # Seconds from the click to the media key being sent
+        self._loop = None
+        self._task = None
+        self._thread = None
+
+    def start(self):  # Returns False if there is no media session backend
+        if self.backend is None:
+            self.backend = get_backend()
+        if not self.backend:
+            return False
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=asyncio.run, args=(self._run(),), name="MediaSession", daemon=True)
+            self._thread.start()
+        return True
+
+    def stop(self):
+        loop, task = self._loop, self._task
+        if loop is not None and task is not None:
+            loop.call_soon_threadsafe(task.cancel)
+
+    def get_media_info(self):  # Cached media info of the current session, None if there is none. Does not block
+        return self.info
+
+    def send_media_key(self, key, click_time=None):
+        # Sends the key on the loop without waiting for it. Returns False if the session is not connected.
+        # click_time: time.perf_counter() of the click, the click to key latency is measured from it
+        loop, session = self._loop, self.session
+        if loop is None or session is None:
+            return False
+        asyncio.run_coroutine_threadsafe(self._send_media_key(session, key, click_time if click_time is not None else time.perf_counter()), loop)
+        return True
+
+    def get_stats(self):
+        return {
+            "events": self.event_count,
+            "failures": self.failures,
+            "mean_callback_ms": sum(self.callback_durations) / len(self.callback_durations) * 1000 if self.callback_durations else None,
+            "keys_sent": len(self.key_latencies),
+            "mean_key_latency_ms": sum(self.key_latencies) / len(self.key_latencies) * 1000 if self.key_latencies else None,
+            "max_key_latency_ms": max(self.key_latencies) * 1000 if self.key_latencies else None
+        }
+
+    async def _run(self):
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+        try:
+            while True:
+                try:
+                    self.session = await self.backend.connect()
+                    try:
+                        await self.session.watch(self._handle_change)
+                    finally:
+                        session, self.session = self.session, None
+                        session.close()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:  # Keep watching, the session may come back
+                    self.failures += 1
+                    print(f"\033[91m[ERROR] Media session failed: {e!r}\033[0m")
+                self._handle_change(None)  # Unknown until the session is back, polls take over
+                await asyncio.sleep(self.retry_delay)
+        except asyncio.CancelledError:
+            pass
+
+    async def _send_media_key(self, session, key, click_time):
+        try:
+            await session.send_media_key(key)
+        except Exception as e:
+            print(f"\033[91m[ERROR] Sending media key failed: {e!r}\033[0m")
+            return
+        self.key_latencies.append(time.perf_counter() - click_time)
+
+    def _handle_change(self, info):
+        self.info = info
+        self.event_count += 1
+        if self.on_change is None:
+            return
+        start_time = time.perf_counter()
+        try:
+            self.on_change(info)
+        except Exception as e:
+            print(f"\033[91m[ERROR] Media session change failed: {e!r}\033[0m")
+        self.callback_durations.append(time.perf_counter() - start_time)
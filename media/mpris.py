@@ -0,0 +1,166 @@
+# MPRIS media session backend for Linux, over the D-Bus session bus with dbus-next.
+# The Spotify desktop client registers as org.mpris.MediaPlayer2.spotify and signals every change with PropertiesChanged.
+import asyncio
+import time
+
+from dbus_next import BusType, Message, MessageType, Variant
+from dbus_next.aio import MessageBus
+from dbus_next.errors import DBusError
+
+from . import same_session_state
+
+player_name = "org.mpris.MediaPlayer2.spotify"
+player_path = "/org/mpris/MediaPlayer2"
+player_interface = "org.mpris.MediaPlayer2.Player"
+
+media_methods = {
+    "previous": "Previous",
+    "play_pause": "PlayPause",
+    "next": "Next"
+}
+loop_statuses = {"None": "off", "Track": "track", "Playlist": "context"}  # MPRIS LoopStatus to Web API repeat_state
+
+
+def unpack(value):  # Plain Python values from dbus-next Variants
+    if isinstance(value, Variant):
+        return unpack(value.value)
+    if isinstance(value, dict):
+        return {key: unpack(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [unpack(item) for item in value]
+    return value
+
+
+def get_track_uri(track_id):  # Spotify URI from mpris:trackid, "/com/spotify/track/<id>" or "spotify:track:<id>" depending on the client version
+    if track_id.startswith("spotify:track:"):
+        return track_id
+    if track_id.startswith("/com/spotify/track/"):
+        return f"spotify:track:{track_id.rsplit('/', 1)[1]}"
+    return None
+
+
+def read_properties(properties, event_time):  # MPRIS player properties to media info, None if nothing is loaded
+    metadata = properties.get("Metadata")
+    if not metadata:
+        return None
+    artists = metadata.get("xesam:artist", [])
+    length = metadata.get("mpris:length")
+    position = properties.get("Position")
+    return {
+        "title": metadata.get("xesam:title", ""),
+        "artist": ", ".join(artists),
+        "artists": artists,
+        "album_title": metadata.get("xesam:album", ""),
+        "art_url": metadata.get("mpris:artUrl"),
+        "url": metadata.get("xesam:url"),
+        "uri": get_track_uri(str(metadata.get("mpris:trackid", ""))),
+        "duration_ms": length // 1000 if length else None,
+        "position_ms": position // 1000 if position is not None else None,
+        "playing": properties.get("PlaybackStatus") == "Playing",
+        "shuffle": properties.get("Shuffle"),
+        "repeat": loop_statuses.get(properties.get("LoopStatus")),
+        "event_time": event_time  # Monotonic time the properties were read
+    }
+
+
+async def call(bus, destination, path, interface, member, signature="", body=None):  # Returns the reply body, raises DBusError on an error reply
+    reply = await bus.call(Message(destination=destination, path=path, interface=interface, member=member, signature=signature, body=body or []))
+    if reply.message_type == MessageType.ERROR:
+        raise DBusError(reply.error_name, reply.body[0] if reply.body else "", reply)
+    return reply.body
+
+
+class MprisPlayer(object):
+    # Properties of one MPRIS player, refreshed in full when the player starts and kept up to date from its change signals
+    def __init__(self, bus, name=player_name):
+        self.bus = bus
+        self.name = name
+        self.owner = None  # Unique bus name of the player, signals are sent from it. None while the player is not running
+        self.properties = {}
+
+    async def refresh(self):
+        try:
+            self.owner = (await call(self.bus, "org.freedesktop.DBus", "/org/freedesktop/DBus", "org.freedesktop.DBus", "GetNameOwner", "s", [self.name]))[0]
+            self.properties = unpack((await call(self.bus, self.name, player_path, "org.freedesktop.DBus.Properties", "GetAll", "s", [player_interface]))[0])
+        except DBusError:  # Not running
+            self.owner = None
+            self.properties = {}
+
+    async def refresh_position(self):  # Position is not signalled by PropertiesChanged
+        try:
+            self.properties["Position"] = unpack((await call(self.bus, self.name, player_path, "org.freedesktop.DBus.Properties", "Get", "ss", [player_interface, "Position"]))[0])
+        except DBusError:
+            self.properties.pop("Position", None)
+
+    def get_info(self):
+        return read_properties(self.properties, time.monotonic()) if self.owner is not None else None
+
+
+class MprisSession(object):
+    # Session bus connection kept open for the lifetime of the media session
+    def __init__(self, bus):
+        self.bus = bus
+        self.player = MprisPlayer(bus)
+
+    async def get_media_info(self):
+        await self.player.refresh()
+        return self.player.get_info()
+
+    async def send_media_key(self, key):  # key: "previous" / "play_pause" / "next"
+        await call(self.bus, player_name, player_path, player_interface, media_methods[key])
+
+    async def watch(self, on_change):
+        # Calls on_change(info) with the current state, then on every track, playback, shuffle, repeat or seek change until cancelled.
+        # info is None while the player is closed or has nothing loaded.
+        player = self.player
+        changes = asyncio.Queue()
+
+        def on_message(message):
+            if message.message_type != MessageType.SIGNAL:
+                return
+            if message.member == "NameOwnerChanged" and message.body[0] == player.name:
+                changes.put_nowait(("owner", message.body[2]))
+            elif message.sender == player.owner and message.path == player_path:
+                if message.member == "PropertiesChanged" and message.body[0] == player_interface:
+                    changes.put_nowait(("properties", unpack(message.body[1])))
+                elif message.member == "Seeked":
+                    changes.put_nowait(("seeked", message.body[0]))
+
+        self.bus.add_message_handler(on_message)
+        try:
+            for rule in [f"type='signal',sender='org.freedesktop.DBus',member='NameOwnerChanged',arg0='{player.name}'",
+                         f"type='signal',interface='org.freedesktop.DBus.Properties',member='PropertiesChanged',path='{player_path}',arg0='{player_interface}'",
+                         f"type='signal',interface='{player_interface}',member='Seeked',path='{player_path}'"]:
+                await call(self.bus, "org.freedesktop.DBus", "/org/freedesktop/DBus", "org.freedesktop.DBus", "AddMatch", "s", [rule])
+
+            await player.refresh()  # After subscribing, so no change is missed in between
+            info = player.get_info()
+            on_change(info)
+            while True:
+                kind, value = await changes.get()
+                if kind == "owner":
+                    if value:
+                        await player.refresh()
+                    else:
+                        player.owner = None
+                        player.properties = {}
+                elif kind == "properties":
+                    player.properties.update(value)
+                    if "Metadata" in value or "PlaybackStatus" in value:
+                        await player.refresh_position()
+                else:
+                    player.properties["Position"] = value
+
+                previous_info, info = info, player.get_info()
+                # Volume and rate changes leave the media info as it was, only seeks report a new position alone
+                if kind == "seeked" or not same_session_state(previous_info, info):
+                    on_change(info)
+        finally:
+            self.bus.remove_message_handler(on_message)
+
+    def close(self):
+        self.bus.disconnect()
+
+
+async def connect():
+    return MprisSession(await MessageBus(bus_type=BusType.SESSION).connect())
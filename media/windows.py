@@ -0,0 +1,106 @@
+import asyncio
+import time
+
+import win32api
+import win32con
+from winsdk.windows.media import MediaPlaybackAutoRepeatMode
+from winsdk.windows.media.control import GlobalSystemMediaTransportControlsSessionManager as MediaManager
+from winsdk.windows.media.control import GlobalSystemMediaTransportControlsSessionPlaybackStatus as PlaybackStatus
+
+from . import same_session_state
+
+media_keys = {
+    "previous": win32con.VK_MEDIA_PREV_TRACK,
+    "play_pause": win32con.VK_MEDIA_PLAY_PAUSE,
+    "next": win32con.VK_MEDIA_NEXT_TRACK
+}
+media_apps = ["Chrome", "Spotify.exe"]
+repeat_modes = {
+    MediaPlaybackAutoRepeatMode.NONE: "off",
+    MediaPlaybackAutoRepeatMode.TRACK: "track",
+    MediaPlaybackAutoRepeatMode.LIST: "context"
+}
+
+
+async def read_session(session):  # Media info of a Spotify or Chrome session, None for other apps
+    if session is None or session.source_app_user_model_id not in media_apps:
+        return None
+    info = await session.try_get_media_properties_async()
+    playback_info = session.get_playback_info()
+    timeline = session.get_timeline_properties()
+    return {
+        "title": info.title,
+        "artist": info.artist,
+        "artists": [info.artist],
+        "album_title": info.album_title,
+        "art_url": None,
+        "url": None,
+        "uri": None,  # Sessions do not expose the Spotify URI, a poll resolves the track
+        "duration_ms": round(timeline.end_time.total_seconds() * 1000),
+        "position_ms": round(timeline.position.total_seconds() * 1000),
+        "playing": playback_info.playback_status == PlaybackStatus.PLAYING,
+        "shuffle": playback_info.is_shuffle_active,
+        "repeat": repeat_modes.get(playback_info.auto_repeat_mode),
+        "event_time": time.monotonic()
+    }
+
+
+class WindowsSession(object):
+    # Session manager kept for the lifetime of the media session
+    def __init__(self, manager):
+        self.manager = manager
+
+    async def get_media_info(self):
+        return await read_session(self.manager.get_current_session())
+
+    async def send_media_key(self, key):  # key: "previous" / "play_pause" / "next"
+        win32api.keybd_event(media_keys[key], 0, win32con.KEYEVENTF_EXTENDEDKEY, 0)  # Media button, from numerical keypad
+
+    async def watch(self, on_change):
+        # Calls on_change(info) with the current state, then on every change of the current session until cancelled.
+        # Session events arrive on winsdk threads and are handed to the loop.
+        manager = self.manager
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+
+        def notify(sender, args):
+            loop.call_soon_threadsafe(changed.set)
+
+        manager_token = manager.add_current_session_changed(notify)
+        session = None
+        session_id = None  # App of the followed session, winsdk returns a new wrapper on every call
+        session_tokens = []
+        info = None
+        reported = False
+        try:
+            while True:
+                current_session = manager.get_current_session()
+                current_session_id = current_session.source_app_user_model_id if current_session is not None else None
+                if current_session_id != session_id:  # Follow the current session
+                    if session is not None:
+                        session.remove_media_properties_changed(session_tokens[0])
+                        session.remove_playback_info_changed(session_tokens[1])
+                        session.remove_timeline_properties_changed(session_tokens[2])
+                    session, session_id = current_session, current_session_id
+                    if session is not None:
+                        session_tokens = [session.add_media_properties_changed(notify), session.add_playback_info_changed(notify), session.add_timeline_properties_changed(notify)]
+                previous_info, info = info, await read_session(session)
+                # Timeline events arrive every few seconds during playback, only changes of the track or playback state are passed on
+                if not reported or not same_session_state(previous_info, info):
+                    on_change(info)
+                    reported = True
+                await changed.wait()
+                changed.clear()
+        finally:
+            manager.remove_current_session_changed(manager_token)
+            if session is not None:
+                session.remove_media_properties_changed(session_tokens[0])
+                session.remove_playback_info_changed(session_tokens[1])
+                session.remove_timeline_properties_changed(session_tokens[2])
+
+    def close(self):
+        pass
+
+
+async def connect():
+    return WindowsSession(await MediaManager.request_async())
@@ -0,0 +1 @@
+# Tk front end components, imported by main.py
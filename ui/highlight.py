@@ -0,0 +1,58 @@
+import tkinter as tk
+
+from PIL import Image, ImageTk
+
+
+class HighlightRectangle(object):
+    # Translucent lyric highlight kept as one persistent canvas image item.
+    # Moving only changes its coords. Resizing tiles a single pre-rendered translucent pixel over the new size of the
+    # same PhotoImage, so a frame allocates no images and creates no canvas items.
+    def __init__(self, canvas, color="#000000", alpha=0.3, tag="rectangle"):
+        self.canvas = canvas
+        self.fill = canvas.winfo_rgb(color)
+        self.fill = tuple(channel // 256 for channel in self.fill) + (int(alpha * 255),)
+        self.tag = tag
+        self.tile = ImageTk.PhotoImage(Image.new("RGBA", (1, 1), self.fill), master=canvas)  # "copy -to" repeats it over any size
+        # Persistent image shown by the canvas item. Created without a size: Tk only grows and shrinks a photo to the copied region
+        # while it has no user size, which ImageTk.PhotoImage always sets
+        self.image = tk.PhotoImage(master=canvas)
+        self.item = None
+        self.size = None  # (width, height) currently copied into self.image
+        self.position = None  # (x1, y1) of the canvas item
+        self.bounds = None  # (x1, y1, x2, y2) last drawn, avoids reading back from the canvas
+        self.counters = {"frames": 0, "moves": 0, "resizes": 0}
+
+    def draw(self, x1, y1, x2, y2):
+        x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
+        width = max(x2 - x1, 1)
+        height = max(y2 - y1, 1)
+        self.counters["frames"] += 1
+
+        if (width, height) != self.size:
+            # A -to region larger than the source is filled by repeating it, -shrink drops the rest of a larger previous size
+            # and -compositingrule set replaces the old pixels instead of blending over them
+            self.image.tk.call(str(self.image), "copy", str(self.tile), "-to", 0, 0, width, height, "-shrink", "-compositingrule", "set")
+            self.size = (width, height)
+            self.counters["resizes"] += 1
+
+        if self.item is None:
+            self.item = self.canvas.create_image(x1, y1, image=self.image, anchor="nw", tags=self.tag)
+            self.position = (x1, y1)
+        elif (x1, y1) != self.position:
+            self.canvas.coords(self.item, x1, y1)
+            self.position = (x1, y1)
+            self.counters["moves"] += 1
+
+        self.bounds = (x1, y1, x1 + width, y1 + height)
+        return self.item
+
+    def delete(self):
+        if self.item is not None:
+            self.canvas.delete(self.item)
+        self.reset()
+
+    def reset(self):
+        # Call after the canvas item was deleted elsewhere, e.g. canvas.delete("all")
+        self.item = None
+        self.position = None
+        self.bounds = None
@@ -0,0 +1,170 @@
+import bisect
+
+
+class LyricsView(object):
+    # Virtualized synced lyrics on a canvas. Line offsets are kept in Python, canvas text items only exist for lines
+    # in and near the viewport and are recycled while scrolling.
+    # Resizes are coalesced to one re-layout per resize_delay, and only lines near the viewport are re-measured at the
+    # new width. Other lines keep their last height as an estimate until they come into view.
+    # measure(text, font, width) -> (width, height) measures lines without the canvas, e.g. TextLayout.measure. With it the
+    # whole sheet is measured up front, without it lines are measured on a hidden canvas item when they come into view.
+    def __init__(self, canvas, line_spacing=2, margin=5, resize_delay=50, on_layout=None, measure=None):
+        self.canvas = canvas
+        self.measure = measure
+        self.line_spacing = line_spacing  # px between lines
+        self.margin = margin  # px left of the text and right for the scroll bar
+        self.resize_delay = resize_delay  # ms
+        self.on_layout = on_layout  # Called after line offsets changed
+
+        self.texts = []
+        self.fonts = []
+        self.heights = []  # Height of every line, measured or estimated
+        self.widths = []  # Width of the wrapped text of every line, measured or estimated
+        self.offsets = [0]  # Top of every line, and the total height at the end
+        self.measured = []  # True if the height of the line was measured at the current wrap width
+        self.wrap_width = max(canvas.winfo_width() - 2 * margin, 0)  # 0 disables wrapping, e.g. before the canvas is mapped
+
+        self.items = {}  # Line index: canvas text item
+        self.spare_items = []  # Hidden canvas text items ready to be reused
+        self.visible_range = (0, 0)  # Lines with an item, [start, end)
+        self.scratch_item = None  # Hidden text item used for measuring
+        self.resize_after_id = None
+        self.pending_width = None
+
+        self.counters = {"measures": 0, "items_created": 0, "items_reused": 0, "layouts": 0, "resize_events": 0}
+
+    @property
+    def total_height(self):
+        return self.offsets[-1]
+
+    def set_lines(self, texts, fonts):  # fonts: Font of every line
+        self.canvas.delete("lyrics", "lyrics_scratch")
+        self.reset()
+        self.texts = list(texts)
+        self.fonts = list(fonts)
+        self.wrap_width = max(self.canvas.winfo_width() - 2 * self.margin, 0)
+        if self.measure is not None:  # Whole sheet laid out in Python before anything is drawn
+            self.widths, self.heights = [], []
+            for text, font in zip(self.texts, self.fonts):
+                width, height = self._measure(text, font)
+                self.widths.append(width)
+                self.heights.append(height)
+            self.measured = [True] * len(self.texts)
+        else:
+            single_line_heights = {font: self._measure("Ag", font)[1] for font in set(self.fonts)}  # Estimate until measured
+            self.heights = [single_line_heights[font] for font in self.fonts]
+            self.widths = [0] * len(self.texts)
+            self.measured = [False] * len(self.texts)
+        self._update_offsets()
+        self.render()
+
+    def reset(self):
+        # Call after the canvas items were deleted elsewhere, e.g. canvas.delete("all")
+        self.texts, self.fonts, self.heights, self.widths, self.measured = [], [], [], [], []
+        self.offsets = [0]
+        self.items.clear()
+        self.spare_items.clear()
+        self.visible_range = (0, 0)
+        self.scratch_item = None
+
+    def get_line_bounds(self, index):  # (x1, y1, x2, y2) of the wrapped text of a line, from the layout
+        self._measure_range(index, index + 1)
+        return self.margin, self.offsets[index], self.margin + self.widths[index], self.offsets[index] + self.heights[index]
+
+    def schedule_resize(self, width):  # Canvas <Configure>, width in px
+        self.counters["resize_events"] += 1
+        self.pending_width = width
+        if self.resize_after_id is None:  # Coalesce the events until the delayed re-layout runs
+            self.resize_after_id = self.canvas.after(self.resize_delay, self._apply_resize)
+
+    def render(self):
+        # Materializes items for the lines within one viewport above and below the visible area
+        if not self.texts:
+            return
+        viewport_top = self.canvas.canvasy(0)
+        viewport_height = self.canvas.winfo_height()
+        start = max(bisect.bisect_right(self.offsets, viewport_top - viewport_height) - 1, 0)
+        end = min(bisect.bisect_left(self.offsets, viewport_top + 2 * viewport_height) + 1, len(self.texts))
+        if self._measure_range(start, end):  # Measured heights moved the lines, find the range again
+            start = max(bisect.bisect_right(self.offsets, viewport_top - viewport_height) - 1, 0)
+            end = min(bisect.bisect_left(self.offsets, viewport_top + 2 * viewport_height) + 1, len(self.texts))
+        if (start, end) == self.visible_range and len(self.items) == end - start:
+            return
+
+        for index in [index for index in self.items if not start <= index < end]:
+            item = self.items.pop(index)
+            self.canvas.itemconfig(item, state="hidden")
+            self.spare_items.append(item)
+
+        for index in range(start, end):
+            if index in self.items:
+                continue
+            if self.spare_items:
+                item = self.spare_items.pop()
+                self.canvas.coords(item, self.margin, self.offsets[index])
+                self.canvas.itemconfig(item, text=self.texts[index], font=self.fonts[index], width=self.wrap_width, state="normal")
+                self.counters["items_reused"] += 1
+            else:
+                item = self.canvas.create_text(self.margin, self.offsets[index], text=self.texts[index], font=self.fonts[index], anchor="nw", justify="left", width=self.wrap_width, tags="lyrics")
+                self.canvas.tag_lower(item)  # Keep the highlight above the text
+                self.counters["items_created"] += 1
+            self.items[index] = item
+        self.visible_range = (start, end)
+
+    def get_stats(self):
+        return {**self.counters, "lines": len(self.texts), "items": len(self.items) + len(self.spare_items)}
+
+    def _apply_resize(self):
+        self.resize_after_id = None
+        wrap_width = max(self.pending_width - 2 * self.margin, 0)
+        if wrap_width == self.wrap_width or not self.texts:
+            self.wrap_width = wrap_width
+            return
+        self.wrap_width = wrap_width
+        self.measured = [False] * len(self.texts)  # Heights stay as estimates until the lines are measured again
+        for item in list(self.items.values()) + self.spare_items:
+            self.canvas.itemconfig(item, width=self.wrap_width)
+        self.render()
+
+    def _measure_range(self, start, end):
+        # Measures the lines in [start, end) that have no height at the current wrap width, returns True if offsets changed
+        changed = False
+        for index in range(start, end):
+            if self.measured[index]:
+                continue
+            width, height = self._measure(self.texts[index], self.fonts[index])
+            self.widths[index] = width
+            self.measured[index] = True
+            if height != self.heights[index]:
+                self.heights[index] = height
+                changed = True
+        if changed:
+            self._update_offsets()
+            self._position_items()
+        return changed
+
+    def _measure(self, text, font):
+        self.counters["measures"] += 1
+        if self.measure is not None:
+            return self.measure(text, font, self.wrap_width)
+        if self.scratch_item is None:
+            self.scratch_item = self.canvas.create_text(-10000, -10000, anchor="nw", state="normal", tags="lyrics_scratch")
+        self.canvas.itemconfig(self.scratch_item, text=text, font=font, width=self.wrap_width)
+        bbox = self.canvas.bbox(self.scratch_item)
+        if bbox is None:
+            return 0, 0
+        return bbox[2] - bbox[0], bbox[3] - bbox[1]
+
+    def _update_offsets(self):
+        offsets = [0]
+        for height in self.heights:
+            offsets.append(offsets[-1] + height + self.line_spacing)
+        self.offsets = offsets
+        self.counters["layouts"] += 1
+        self.canvas.configure(scrollregion=(0, -self.margin, self.wrap_width + self.margin, self.total_height))
+        if self.on_layout is not None:
+            self.on_layout()
+
+    def _position_items(self):
+        for index, item in self.items.items():
+            self.canvas.coords(item, self.margin, self.offsets[index])
@@ -0,0 +1,109 @@
+import collections
+import tkinter.font as tk_font
+
+
+class TextLayout(object):
+    # Wraps text the way a canvas text item does (at spaces, words wider than the line are broken), measured in Python
+    # with Font.measure and the font's linespace instead of creating items and reading their bbox.
+    # Word widths are cached per font, wrapped layouts are memoized by (text, width, font) with LRU eviction.
+    def __init__(self, root=None, max_entries=8192, max_words=32768):
+        self.root = root
+        self.max_entries = max_entries
+        self.max_words = max_words
+        self.fonts = {}  # Font description: (tk_font.Font, linespace, space width)
+        self.layouts = collections.OrderedDict()  # (text, width, font): (text width, height, lines)
+        self.word_widths = collections.OrderedDict()  # (word, font): width
+        self.counters = {"hits": 0, "misses": 0, "word_hits": 0, "word_misses": 0, "evictions": 0}
+
+    def measure(self, text, font, width):
+        # Returns (width, height) of text wrapped at width px, width 0 disables wrapping
+        text_width, height, _ = self.layout(text, font, width)
+        return text_width, height
+
+    def wrap(self, text, font, width):
+        return self.layout(text, font, width)[2]
+
+    def layout(self, text, font, width):
+        key = (text, width, font)
+        layout = self.layouts.get(key)
+        if layout is not None:
+            self.layouts.move_to_end(key)
+            self.counters["hits"] += 1
+            return layout
+
+        self.counters["misses"] += 1
+        _, linespace, space_width = self._get_font(font)
+        lines = []
+        line_widths = []
+        for paragraph in text.split("\n"):
+            line = []
+            line_width = 0
+            for word in paragraph.split(" "):
+                word_width = self._get_word_width(word, font)
+                added_width = word_width + (space_width if line else 0)
+                if line and width > 0 and line_width + added_width > width:  # Word does not fit, start a new line
+                    lines.append(" ".join(line))
+                    line_widths.append(line_width)
+                    line, line_width, added_width = [], 0, word_width
+                if not line and width > 0 and word_width > width:  # Word wider than a line, break it between characters
+                    for part, part_width in self._break_word(word, font, width):
+                        lines.append(part)
+                        line_widths.append(part_width)
+                    word, added_width = lines.pop(), line_widths.pop()  # The last part continues the line
+                line.append(word)
+                line_width += added_width
+            lines.append(" ".join(line))
+            line_widths.append(line_width)
+
+        layout = (max(line_widths), linespace * len(lines), tuple(lines))
+        self.layouts[key] = layout
+        if len(self.layouts) > self.max_entries:
+            self.layouts.popitem(last=False)
+            self.counters["evictions"] += 1
+        return layout
+
+    def get_stats(self):
+        lookups = self.counters["hits"] + self.counters["misses"]
+        word_lookups = self.counters["word_hits"] + self.counters["word_misses"]
+        return {
+            **self.counters,
+            "hit_ratio": self.counters["hits"] / lookups if lookups else None,
+            "word_hit_ratio": self.counters["word_hits"] / word_lookups if word_lookups else None,
+            "entries": len(self.layouts)
+        }
+
+    def _get_font(self, font):
+        cached_font = self.fonts.get(font)
+        if cached_font is None:
+            tk_font_object = tk_font.Font(root=self.root, font=font)
+            cached_font = (tk_font_object, tk_font_object.metrics("linespace"), tk_font_object.measure(" "))
+            self.fonts[font] = cached_font
+        return cached_font
+
+    def _get_word_width(self, word, font):
+        key = (word, font)
+        word_width = self.word_widths.get(key)
+        if word_width is not None:
+            self.word_widths.move_to_end(key)
+            self.counters["word_hits"] += 1
+            return word_width
+
+        self.counters["word_misses"] += 1
+        word_width = self._get_font(font)[0].measure(word) if word else 0
+        self.word_widths[key] = word_width
+        if len(self.word_widths) > self.max_words:
+            self.word_widths.popitem(last=False)
+        return word_width
+
+    def _break_word(self, word, font, width):
+        # Splits a word wider than width into parts that fit, returns [(part, part width), ...]
+        tk_font_object = self._get_font(font)[0]
+        parts = []
+        part = ""
+        for character in word:
+            if part and tk_font_object.measure(part + character) > width:
+                parts.append((part, tk_font_object.measure(part)))
+                part = ""
+            part += character
+        parts.append((part, tk_font_object.measure(part)))
+        return parts
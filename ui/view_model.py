@@ -0,0 +1,61 @@
+import collections
+import time
+
+
+class ViewModel(object):
+    # Retained UI state. The updater sets the desired widget options every frame, commit() compares them with the
+    # last committed options and applies only the changed ones, one configure/place call per widget, followed by a
+    # single update_idletasks().
+    def __init__(self, root):
+        self.root = root
+        self.committed = {}  # (widget, method, option): value last applied to the widget
+        self.pending = {}  # (widget, method): {option: value} waiting for commit()
+        self.flush_requested = False  # Widgets were packed or filled outside the view model this frame
+        self.mutations = collections.deque(maxlen=5000)  # Time of every applied widget call
+        self.counters = {"sets": 0, "skipped": 0, "mutations": 0, "commits": 0}
+
+    def set(self, widget, **options):  # Widget options, e.g. text, image, value
+        self._stage(widget, "configure", options)
+
+    def place(self, widget, **options):  # Place geometry options, e.g. x, y
+        self._stage(widget, "place", options)
+
+    def invalidate(self, widget):
+        # Forget what was applied to widget, call after changing it outside the view model
+        for key in [key for key in self.committed if key[0] is widget]:
+            del self.committed[key]
+
+    def request_flush(self):  # Call after packing or filling widgets directly, the next commit() flushes them too
+        self.flush_requested = True
+
+    def commit(self):
+        if not self.pending and not self.flush_requested:
+            return False
+        now = time.time()
+        for (widget, method), options in self.pending.items():
+            if method == "place":
+                widget.place_configure(**options)
+            else:
+                widget.configure(**options)
+            for option, value in options.items():
+                self.committed[(widget, method, option)] = value
+            self.mutations.append(now)
+            self.counters["mutations"] += 1
+        self.pending.clear()
+        self.flush_requested = False
+        self.counters["commits"] += 1
+        self.root.update_idletasks()  # Geometry of the changed widgets is read back by the next frame
+        return True
+
+    def get_stats(self):
+        recent_mutations = [mutation for mutation in self.mutations if mutation >= time.time() - 10]
+        return {**self.counters, "mutations_per_second": len(recent_mutations) / 10}
+
+    def _stage(self, widget, method, options):
+        for option, value in options.items():
+            self.counters["sets"] += 1
+            key = (widget, method, option)
+            if key in self.committed and self.committed[key] == value and option not in self.pending.get((widget, method), {}):
+                self.counters["skipped"] += 1
+                continue
+            self.pending.setdefault((widget, method), {})[option] = value